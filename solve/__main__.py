@@ -1,12 +1,23 @@
+import sys
 from argparse import ArgumentParser, RawTextHelpFormatter
+from collections.abc import Iterable
+from concurrent.futures import Future
+from contextlib import nullcontext
 from enum import StrEnum
+from time import monotonic
 from typing import assert_never
 
 import solve
-from .combo import get_best_double_key
-from .config import KeySetName, read_config
-from .key_sets import *
+from .batch import *
+from .api import EncounterSolution
+from .config import read_config, read_partial_config
+from .engines import *
+from .key_sets import KSMixed
+from .metrics import serve_metrics, write_metrics_at_exit
+from .planner import *
 from .printer import *
+from .speculation import Speculator
+from .states import ALL_POSITIONS, SearchCancelled, SearchResult, StateWithAllPositions
 
 
 class EncounterParts(StrEnum):
@@ -14,54 +25,208 @@ class EncounterParts(StrEnum):
     DISSECTION = 'dissection'
     BOTH = 'both'
 
+    @property
+    def parts_to_solve(self, /) -> tuple[bool, bool]:
+        """
+        Whether solo rooms are solved and whether dissection is solved.
+        """
+        match self:
+            case EncounterParts.SOLO_ROOMS:
+                return True, False
+            case EncounterParts.DISSECTION:
+                return False, True
+            case EncounterParts.BOTH:
+                return True, True
+            case unknown:
+                assert_never(unknown)
+
+
+NOT_OPTIMAL_MSG = '--- THE SOLUTION ABOVE MAY BE NOT THE SHORTEST ---'
+
 
 def main(
         config_filepath: str,
         encounter_part: EncounterParts,
         /,
         interactive: bool,
+        max_frontier: int | None = None,
+        time_limit: float | None = None,
+        workers: int = 1,
+        engine_name: str | None = None,
+        show_stats: bool = False,
         ) -> None:
     config = read_config(config_filepath)
+    engine = get_engine(config.engine if engine_name is None else engine_name)
 
-    match encounter_part:
-        case EncounterParts.SOLO_ROOMS:
-            do_rooms = True
-            do_dissect = False
-        case EncounterParts.DISSECTION:
-            do_rooms = False
-            do_dissect = True
-        case EncounterParts.BOTH:
-            do_rooms = True
-            do_dissect = True
-        case unknown:
-            assert_never(unknown)
+    do_rooms, do_dissect = encounter_part.parts_to_solve
 
     with_triumph = config.is_doing_triumph
     last_position = config.last_position
     rooms, statues, aliases = config.encounter_data()
-    match config.key_set_name:
-        case KeySetName.MIXED:
-            key_set = KSMixed
-        case KeySetName.DOUBLE:
-            key_set = get_best_double_key(
-                rooms=rooms if do_rooms else None,
-                statues=statues if do_dissect else None,
+    key_set = config.key_set(
+        rooms=rooms if do_rooms else None,
+        statues=statues if do_dissect else None,
+        )
+
+    if do_dissect:
+        # With triumph, dissection depends on rooms only via the last position,
+        # which is one of three positions. Dissection is solved for all of them before rooms,
+        # so its plan is ready as soon as the plan for rooms.
+        handoffs = tuple(ALL_POSITIONS) if do_rooms and with_triumph else (last_position,)
+        statues_searches = _search_each(
+            engine,
+            statues.to_statue_state(key_set),
+            with_triumph,
+            handoffs,
+            max_frontier=max_frontier,
+            deadline=_deadline(time_limit),
+            workers=workers,
+            )
+
+    try:
+        if do_rooms:
+            rooms_result, rooms_stats = engine.search(
+                rooms.to_room_state(key_set),
+                with_triumph,
+                last_position,
+                max_frontier=max_frontier,
+                deadline=_deadline(time_limit),
+                workers=workers,
                 )
-        case unknown:
-            assert_never(unknown)
+            rooms_solved = rooms_result.state
+
+        if do_dissect:
+            handoff = rooms_solved.last_position if len(handoffs) > 1 else last_position
+            statues_result, statues_stats = statues_searches[handoff].result()
+    except TimeoutError:
+        sys.exit(f'No solution was found within {time_limit} seconds, increase --time-limit')
+    except SearchCancelled:
+        sys.exit('The search was cancelled before any solution was found')
 
     if do_rooms:
-        room_state = rooms.to_room_state(key_set)
-        rooms_solved = room_state.solve(with_triumph, last_position)
         print_pass_moves(rooms_solved, aliases, interactive)
-        last_position = rooms_solved.last_position
+        if not rooms_result.is_optimal: print(NOT_OPTIMAL_MSG)
+        if show_stats: print_stats('solo rooms', rooms_stats)
 
     if do_dissect:
         if do_rooms: print('\n')
 
-        statue_state = statues.to_statue_state(key_set)
-        statues_solved = statue_state.solve(with_triumph, last_position)
-        print_dissect_moves(statues_solved, interactive)
+        print_dissect_moves(statues_result.state, interactive)
+        if not statues_result.is_optimal: print(NOT_OPTIMAL_MSG)
+        if show_stats: print_stats('dissection', statues_stats)
+
+
+def _search_each[T: StateWithAllPositions](
+        engine: Engine,
+        state: T,
+        is_doing_triumph: bool,
+        positions: Iterable[str | None],
+        /,
+        **options,
+        ) -> dict[str | None, Future[tuple[SearchResult[T], SearchStats]]]:
+    """
+    Searches the state once for every last position touched before it.
+    Returns done futures by positions, so errors are raised only for results which are used.
+    """
+    futures = {}
+    for position in positions:
+        future = futures[position] = Future()
+        try:
+            future.set_result(engine.search(state, is_doing_triumph, position, **options))
+        except (TimeoutError, ValueError) as e:
+            future.set_exception(e)
+
+    return futures
+
+
+def _deadline(time_limit: float | None, /) -> float | None:
+    """
+    Returns the deadline of a search starting now,
+    every encounter part gets the whole time limit.
+    """
+    return None if time_limit is None else monotonic() + time_limit
+
+
+def print_stats(part: str, stats: SearchStats, /) -> None:
+    print(
+        f'--- STATISTICS ---\n'
+        f'Engine {stats.engine} found {stats.moves} moves for {part} '
+        f'in {stats.seconds:.3f} seconds',
+        file=sys.stderr,
+        )
+
+
+def main_batch(
+        records_filepath: str,
+        encounter_part: EncounterParts,
+        /,
+        workers: int,
+        ) -> None:
+    do_rooms, do_dissect = encounter_part.parts_to_solve
+
+    read = read_csv if records_filepath.endswith('.csv') else read_jsonl
+    with nullcontext(sys.stdin) if records_filepath == '-' else open(records_filepath) as f:
+        results = solve_batch(read(f), do_rooms, do_dissect, workers=workers)
+        write_ndjson(results, sys.stdout)
+
+
+def main_challenge(challenge_filepath: str, /, interactive: bool) -> None:
+    config = read_challenge_config(challenge_filepath)
+    plan = plan_encounter(
+        config.phases,
+        config.patterns,
+        is_doing_triumph=config.is_doing_triumph,
+        last_position=config.last_position,
+        )
+
+    print(f'--- PATTERN: {plan.pattern.value.upper()} ---')
+    for i, phase in enumerate(plan.phases, 1):
+        key_set_name = 'mixed' if phase.key_set is KSMixed else 'double'
+        print(f'\n\n=== PHASE {i}: {key_set_name.upper()} KEY SET ===')
+        print_pass_moves(phase.rooms, phase.aliases, interactive)
+        print('\n')
+        print_dissect_moves(phase.statues, interactive)
+
+
+def main_speculate(
+        config_filepath: str,
+        encounter_part: EncounterParts,
+        /,
+        interactive: bool,
+        workers: int,
+        ) -> None:
+    do_rooms, do_dissect = encounter_part.parts_to_solve
+
+    with Speculator(do_rooms, do_dissect, workers=workers) as speculator:
+        while True:
+            partial = read_partial_config(config_filepath)
+            count = speculator.submit(partial)
+            missing = partial.missing_fields
+            if not missing:
+                solution = speculator.solution(partial.to_config())
+                break
+
+            print(f'--- {count} POSSIBLE ENCOUNTERS, WAITING FOR {', '.join(missing).upper()} ---')
+            if speculator.is_ready(partial):
+                tree = speculator.decision_tree(partial)
+                if isinstance(tree, EncounterSolution):
+                    # Remaining callouts do not change the solution.
+                    solution = tree
+                    break
+
+                print(f'Callouts which change the solution: {', '.join(tree.fields)}')
+
+            input('Update the configuration file and press Enter')
+
+    if solution.rooms is not None:
+        print_rooms_plan(solution.rooms, interactive)
+        if not solution.rooms.is_optimal: print(NOT_OPTIMAL_MSG)
+
+    if solution.dissection is not None:
+        if solution.rooms is not None: print('\n')
+
+        print_dissection_plan(solution.dissection, interactive)
+        if not solution.dissection.is_optimal: print(NOT_OPTIMAL_MSG)
 
 
 def define_parser() -> ArgumentParser:
@@ -111,9 +276,149 @@ def define_parser() -> ArgumentParser:
              'Defaults to "config.toml".',
         )
 
+    parser.add_argument(
+        '--max-frontier',
+        type=int,
+        metavar='N',
+        help='If specified, the script keeps at most N states on every step of the search, '
+             'preferring states closer to the solution.\n'
+             'This limits memory usage, but the solution found may be not the shortest. '
+             'By default, the number of states is not limited.',
+        )
+
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        metavar='SECONDS',
+        help='If specified, the script searches for the solution of every encounter part '
+             'at most for this number of seconds. '
+             'If the shortest solution is not found in time, '
+             'the script prints the best solution found so far.\n'
+             'By default, the time is not limited.',
+        )
+
+    parser.add_argument(
+        '--engine',
+        choices=(AUTO_ENGINE, *engine_names()),
+        help='If specified, overrides the engine from the configuration file.\n'
+             f'  - "{AUTO_ENGINE}" - "{TableEngine.name}" '
+             f'if file "{DEFAULT_DATABASE_FILEPATH}" is present and up to date, '
+             f'otherwise "{ReferenceEngine.name}".\n'
+             f'  - "{ReferenceEngine.name}" - breadth-first search.\n'
+             f'  - "{DeduplicatedEngine.name}" - breadth-first search '
+             f'which drops duplicate states on every step.\n'
+             f'  - "{TableEngine.name}" - lookup in file "{DEFAULT_DATABASE_FILEPATH}".\n'
+             f'  - "{GraphEngine.name}" - breadth-first search over transitions '
+             f'stored in file "{DEFAULT_DATABASE_FILEPATH}".',
+        )
+
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='If specified, the script prints the engine used and time spent on every search '
+             'to the standard error.',
+        )
+
+    parser.add_argument(
+        '-b',
+        '--batch',
+        metavar='FILE',
+        help='If specified, the script solves all encounters from this file '
+             'instead of the configuration file and prints solutions as JSON objects, '
+             'one per line, in the same order.\n'
+             'If the file ends with ".csv", it must be a CSV file with a header, '
+             'otherwise it must have a JSON object on every line. '
+             'Use "-" to read JSON objects from the standard input.',
+        )
+
+    parser.add_argument(
+        '--challenge',
+        metavar='FILE',
+        help='If specified, the script plans all three phases of the challenge '
+             'from this file instead of the configuration file '
+             'and prints solutions for every phase.\n'
+             'You can create one from file "challenge-template.toml". '
+             'ENCOUNTER-PART is ignored in this mode.',
+        )
+
+    parser.add_argument(
+        '--speculate',
+        action='store_true',
+        help='If specified, the configuration file may miss callouts which are not made yet, '
+             'they are absent or empty lists for shapes and players with only an alias.\n'
+             'The script solves all encounters which are still possible in the background '
+             'and prints callouts which change the solution. '
+             'Update the file after every callout and press Enter; '
+             'the solution is printed as soon as it is known.',
+        )
+
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=1,
+        help='The number of processes used to solve different encounters '
+             'with options "--batch" and "--speculate". '
+             'Defaults to 1.',
+        )
+
+    parser.add_argument(
+        '--search-workers',
+        type=int,
+        default=1,
+        metavar='N',
+        help='The number of processes used to expand states of a single search '
+             'without options "--batch", "--challenge" and "--speculate".\n'
+             'It speeds up only long searches, e.g., of solo rooms with double key set. '
+             'Defaults to 1.',
+        )
+
+    parser.add_argument(
+        '--metrics-file',
+        metavar='FILE',
+        help='If specified, metrics of solving are written to this file on exit '
+             'in the Prometheus text format.',
+        )
+
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        metavar='PORT',
+        help='If specified, metrics of solving are served at '
+             'http://127.0.0.1:PORT/metrics while the script is running.',
+        )
+
     return parser
 
 
 if __name__ == '__main__':
     args = define_parser().parse_args()
-    main(args.config, args.encounter_part, args.interactive)
+    encounter_part = EncounterParts(args.encounter_part)
+    if args.metrics_file is not None:
+        write_metrics_at_exit(args.metrics_file)
+
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port)
+
+    if args.batch is not None:
+        main_batch(args.batch, encounter_part, args.workers)
+        sys.exit()
+
+    if args.challenge is not None:
+        main_challenge(args.challenge, args.interactive)
+        sys.exit()
+
+    if args.speculate:
+        main_speculate(args.config, encounter_part, args.interactive, args.workers)
+        sys.exit()
+
+    main(
+        args.config,
+        encounter_part,
+        args.interactive,
+        args.max_frontier,
+        args.time_limit,
+        args.search_workers,
+        args.engine,
+        args.stats,
+        )
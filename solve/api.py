@@ -0,0 +1,139 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from time import monotonic
+
+from .config import Config, KeySetName, validate_config
+from .engines import AUTO_ENGINE, get_engine
+from .key_sets import KeySetType
+from .plans import *
+from .players import Player
+from .shapes import Shape2D, Shape3D
+from .states import PositionsType
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class EncounterSolution:
+    key_set: KeySetType
+    rooms: RoomsPlan | None
+    """
+    Plan for solo rooms, ``None`` if solo rooms were not requested.
+    """
+    dissection: DissectionPlan | None
+    """
+    Plan for dissection, ``None`` if dissection was not requested.
+    """
+
+
+def solve_encounter(
+        *,
+        inner_shapes: Sequence[Shape2D],
+        held_shapes: Sequence[Shape3D],
+        players: Sequence[Player],
+        key_set: KeySetName | str = KeySetName.MIXED,
+        is_doing_triumph: bool = False,
+        last_position: PositionsType | None = None,
+        engine: str = AUTO_ENGINE,
+        rooms: bool = True,
+        dissection: bool = True,
+        max_frontier: int | None = None,
+        time_limit: float | None = None,
+        workers: int = 1,
+        ) -> EncounterSolution:
+    """
+    Solves the encounter without reading files or writing to the console.
+    Arguments have the same meaning as fields of the configuration file,
+    but shapes and players are passed as objects;
+    ``rooms`` and ``dissection`` select encounter parts to solve.
+    Like in the configuration file, the engine is selected automatically by default,
+    see :func:`solve.engines.select_engine`.
+
+    Raises :class:`AssertionError` if arguments do not describe a possible encounter
+    and :class:`ValueError` if the encounter cannot be solved.
+    """
+    assert key_set in KeySetName, \
+        f'key_set must be either {KeySetName.MIXED.value!r} or {KeySetName.DOUBLE.value!r}'
+
+    config = Config(
+        key_set_name=KeySetName(key_set),
+        inner_shapes=tuple(inner_shapes),
+        held_shapes=tuple(held_shapes),
+        players=tuple(players),
+        is_doing_triumph=is_doing_triumph,
+        last_position=last_position,
+        engine=engine,
+        )
+    return solve_encounter_config(
+        config,
+        rooms=rooms,
+        dissection=dissection,
+        max_frontier=max_frontier,
+        time_limit=time_limit,
+        workers=workers,
+        )
+
+
+def solve_encounter_config(
+        config: Config,
+        /,
+        *,
+        rooms: bool = True,
+        dissection: bool = True,
+        max_frontier: int | None = None,
+        time_limit: float | None = None,
+        workers: int = 1,
+        ) -> EncounterSolution:
+    """
+    Solves the encounter specified by the config,
+    see :func:`solve_encounter` for details.
+    """
+    validate_config(config)
+    assert rooms or dissection, 'at least one encounter part must be requested'
+
+    deadline = None if time_limit is None else monotonic() + time_limit
+    engine = get_engine(config.engine)
+    room_combination, statue_combination, aliases = config.encounter_data()
+    key_set = config.key_set(
+        rooms=room_combination if rooms else None,
+        statues=statue_combination if dissection else None,
+        )
+
+    with_triumph = config.is_doing_triumph
+    last_position = config.last_position
+    rooms_plan = None
+    if rooms:
+        result, _ = engine.search(
+            room_combination.to_room_state(key_set),
+            with_triumph,
+            last_position,
+            max_frontier=max_frontier,
+            deadline=deadline,
+            workers=workers,
+            )
+        rooms_plan = make_rooms_plan(result.state, aliases, result.is_optimal)
+        last_position = rooms_plan.last_position
+
+    dissection_plan = None
+    if dissection:
+        result, _ = engine.search(
+            statue_combination.to_statue_state(key_set),
+            with_triumph,
+            last_position,
+            max_frontier=max_frontier,
+            deadline=deadline,
+            workers=workers,
+            )
+        dissection_plan = make_dissection_plan(result.state, result.is_optimal)
+
+    return EncounterSolution(key_set=key_set, rooms=rooms_plan, dissection=dissection_plan)
+
+
+__all__ = (
+    'EncounterSolution',
+    'solve_encounter',
+    'solve_encounter_config',
+    'CollectStep',
+    'PassStep',
+    'RoomStepType',
+    'RoomsPlan',
+    'DissectionPlan',
+    )
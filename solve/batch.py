@@ -0,0 +1,261 @@
+import csv
+import json
+from collections import deque
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, TextIO
+
+from .config import Config, parse_config
+from .engines import get_engine
+from .metrics import submit_with_metrics
+from .states import InfeasibleStateError, StateOfAllRooms, StateOfAllStatues
+
+type RecordType = dict[str, Any]
+
+_LIST_FIELDS = 'inner_shapes', 'held_shapes'
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class InvalidRecord:
+    """
+    Stands for a record which cannot be read,
+    so the rest of the file is still solved.
+    """
+    line: int
+    """
+    Number of the line where the record ends, the first line is 1.
+    """
+    error: str
+
+
+class InvalidRecordError(ValueError):
+    """
+    Raised when a record does not describe a possible encounter.
+    """
+
+
+def _error_message(error: Exception, /) -> str:
+    return f'{error.__class__.__name__}: {error}'
+
+
+def read_jsonl(file: TextIO, /) -> Iterator[RecordType | InvalidRecord]:
+    """
+    Lazily reads encounter records from a file with a JSON object on every line.
+    Each object must have the same structure as the configuration file.
+    Empty lines are skipped, lines which are not valid JSON give :class:`InvalidRecord`.
+    """
+    for line_number, line in enumerate(file, 1):
+        if not line.strip(): continue
+
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield InvalidRecord(line=line_number, error=_error_message(e))
+
+
+def _parse_csv_row(row: dict[str, str | None], /) -> RecordType:
+    record = {}
+    for name, value in row.items():
+        if value is None or value == '': continue
+
+        if name in _LIST_FIELDS:
+            record[name] = [int(v) for v in value.split()]
+        elif name == 'is_doing_triumph':
+            value = value.lower()
+            if value not in ('true', 'false'):
+                raise ValueError(f'{name} must be either true or false, got {value!r}')
+
+            record[name] = value == 'true'
+        elif name.startswith('player') and '_' in name:
+            player, field = name.split('_', 1)
+            record.setdefault(player, {})[field] = int(value) if field != 'alias' else value
+        else:
+            record[name] = value
+
+    return record
+
+
+def read_csv(file: TextIO, /) -> Iterator[RecordType | InvalidRecord]:
+    """
+    Lazily reads encounter records from a CSV file with a header.
+
+    Columns are named as fields of the configuration file.
+    Fields of players are prefixed with player's key, e.g., ``player1_alias``.
+    Numbers in columns ``inner_shapes`` and ``held_shapes`` are separated by spaces.
+    Empty values are treated as absent.
+    Column ``is_doing_triumph`` must be ``true`` or ``false`` in any case.
+    Rows with values which cannot be parsed give :class:`InvalidRecord`.
+    """
+    reader = csv.DictReader(file)
+    for row in reader:
+        try:
+            yield _parse_csv_row(row)
+        except ValueError as e:
+            yield InvalidRecord(line=reader.line_num, error=_error_message(e))
+
+
+def rooms_to_dict(state: StateOfAllRooms, /) -> RecordType:
+    """
+    Converts solved rooms to a JSON-compatible dictionary.
+    """
+    return {
+        'final_shapes':  [str(s.current_key) for s in (state.left, state.middle, state.right)],
+        'moves':         [
+            {'departure': m.departure, 'shape': str(m.shape), 'destination': m.destination}
+            for m in state.moves_made
+            ],
+        'last_position': state.last_position,
+        }
+
+
+def statues_to_dict(state: StateOfAllStatues, /) -> RecordType:
+    """
+    Converts solved statues to a JSON-compatible dictionary.
+    """
+    return {
+        'final_shapes':  [str(s.shape_held) for s in (state.left, state.middle, state.right)],
+        'moves':         [
+            {'shape': str(m.shape), 'destination': m.destination}
+            for m in state.moves_made
+            ],
+        'last_position': state.last_position,
+        }
+
+
+def solve_config(config: Config, /, do_rooms: bool, do_dissect: bool) -> RecordType:
+    """
+    Solves the encounter specified by the config
+    and returns the solution as a JSON-compatible dictionary.
+    """
+    rooms, statues, _ = config.encounter_data()
+    key_set = config.key_set(
+        rooms=rooms if do_rooms else None,
+        statues=statues if do_dissect else None,
+        )
+
+    engine = get_engine(config.engine)
+    with_triumph = config.is_doing_triumph
+    last_position = config.last_position
+    result = {}
+    if do_rooms:
+        rooms_result, _ = engine.search(rooms.to_room_state(key_set), with_triumph, last_position)
+        rooms_solved = rooms_result.state
+        result['rooms'] = rooms_to_dict(rooms_solved)
+        last_position = rooms_solved.last_position
+
+    if do_dissect:
+        statues_result, _ = engine.search(statues.to_statue_state(key_set), with_triumph, last_position)
+        result['dissection'] = statues_to_dict(statues_result.state)
+
+    return result
+
+
+def parse_record(record: RecordType, /) -> Config:
+    """
+    Creates a config from the record.
+    Raises :class:`InvalidRecordError` if the record does not describe a possible encounter
+    or specifies an engine which cannot be used.
+    """
+    if not isinstance(record, Mapping):
+        raise InvalidRecordError(f'record must be an object, got {type(record).__name__}')
+
+    try:
+        config = parse_config(record)
+        get_engine(config.engine)
+    except (AssertionError, KeyError, TypeError, ValueError) as e:
+        raise InvalidRecordError(_error_message(e)) from e
+
+    return config
+
+
+def solve_record(
+        record: RecordType | InvalidRecord,
+        /,
+        do_rooms: bool,
+        do_dissect: bool,
+        ) -> RecordType:
+    """
+    Solves the encounter specified by the record.
+    If the record is invalid, see :func:`parse_record`, or the encounter is infeasible,
+    the result contains key ``error`` with the description of the problem.
+    Other errors are raised, since they are not caused by the record.
+    """
+    if isinstance(record, InvalidRecord):
+        return {'error': f'line {record.line}: {record.error}'}
+
+    try:
+        config = parse_record(record)
+    except InvalidRecordError as e:
+        return {'error': str(e)}
+
+    try:
+        return solve_config(config, do_rooms, do_dissect)
+    except InfeasibleStateError as e:
+        return {'error': _error_message(e)}
+
+
+def solve_batch(
+        records: Iterable[RecordType | InvalidRecord],
+        /,
+        do_rooms: bool,
+        do_dissect: bool,
+        *,
+        workers: int = 1,
+        ) -> Iterator[RecordType]:
+    """
+    Lazily solves encounter records yielding results in the same order.
+    Every result has key ``index`` with the index of the respective record.
+
+    If ``workers`` is greater than 1, records are solved in this number of processes.
+    At most ``2 * workers`` records are being solved at any moment,
+    so the memory used does not depend on the number of records.
+    """
+    assert workers > 0, f'workers must be a positive integer, got {workers!r}'
+    solve_ = partial(solve_record, do_rooms=do_rooms, do_dissect=do_dissect)
+    if workers == 1:
+        for index, record in enumerate(records):
+            yield {'index': index} | solve_(record)
+
+        return
+
+    with ProcessPoolExecutor(workers) as executor:
+        pending: deque[tuple[int, Future[RecordType]]] = deque()
+        for index, record in enumerate(records):
+            if len(pending) == 2 * workers:
+                done_index, future = pending.popleft()
+                yield {'index': done_index} | future.result()
+
+            pending.append((index, submit_with_metrics(executor, solve_, record)))
+
+        while pending:
+            done_index, future = pending.popleft()
+            yield {'index': done_index} | future.result()
+
+
+def write_ndjson(results: Iterable[RecordType], file: TextIO, /) -> None:
+    """
+    Writes results to a file as JSON objects, one per line.
+    The file is flushed after every line.
+    """
+    for result in results:
+        file.write(json.dumps(result))
+        file.write('\n')
+        file.flush()
+
+
+__all__ = (
+    'RecordType',
+    'InvalidRecord',
+    'InvalidRecordError',
+    'read_jsonl',
+    'read_csv',
+    'rooms_to_dict',
+    'statues_to_dict',
+    'solve_config',
+    'parse_record',
+    'solve_record',
+    'solve_batch',
+    'write_ndjson',
+    )
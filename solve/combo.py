@@ -1,22 +1,34 @@
-from dataclasses import dataclass
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from itertools import permutations
 from typing import Self
 
 from .key_sets import *
-from .shapes import Shape2D
+from .shapes import Shape2D, circle, square, triangle
 from .states import StateOfAllRooms, StateOfAllStatues, init_rooms, init_statues
 
 
+_PERMUTATIONS = tuple(permutations((circle, triangle, square)))
+_PERMUTATION_TO_RANK = {p: i for i, p in enumerate(_PERMUTATIONS)}
+
+COMBINATION_COUNT = len(_PERMUTATIONS) ** 2
+"""
+The number of valid combinations.
+"""
+
+
 @dataclass(frozen=True, slots=True)
 class Node:
     inner: Shape2D
     available: tuple[Shape2D, Shape2D]
+    code: str = field(init=False, repr=False, compare=False)
+    """
+    Numeric code for this node.
+    """
 
-    @property
-    def code(self, /) -> str:
-        """
-        Numeric code for this node.
-        """
-        return f'{self.inner.code}[{self.available[0].code}{self.available[1].code}]'
+    def __post_init__(self, /) -> None:
+        code = f'{self.inner.code}[{self.available[0].code}{self.available[1].code}]'
+        object.__setattr__(self, 'code', code)
 
     @classmethod
     def from_inner_and_other(cls, inner: Shape2D, other: Shape2D, /) -> Self:
@@ -32,37 +44,93 @@ class Combination:
     left: Node
     middle: Node
     right: Node
+    code: str = field(init=False, repr=False, compare=False)
+    """
+    Numeric code for this combination.
+    """
+    index: int | None = field(init=False, repr=False, compare=False)
+    """
+    Unique index of this combination from 0 to ``COMBINATION_COUNT - 1``
+    or ``None`` if this combination is not valid.
+    """
+
+    def __post_init__(self, /) -> None:
+        nodes = self.left, self.middle, self.right
+        object.__setattr__(self, 'code', f'{self.left.code}-{self.middle.code}-{self.right.code}')
 
-    @property
-    def code(self, /) -> str:
+        index = None
+        if all(n.available[0] == n.inner for n in nodes):
+            inner_rank = _PERMUTATION_TO_RANK.get(tuple(n.inner for n in nodes))
+            other_rank = _PERMUTATION_TO_RANK.get(tuple(n.available[1] for n in nodes))
+            if inner_rank is not None and other_rank is not None:
+                index = inner_rank * len(_PERMUTATIONS) + other_rank
+
+        object.__setattr__(self, 'index', index)
+
+    @classmethod
+    def from_index(cls, index: int, /) -> Self:
         """
-        Numeric code for this combination.
+        Creates a valid combination from its index.
         """
-        return f'{self.left.code}-{self.middle.code}-{self.right.code}'
+        assert 0 <= index < COMBINATION_COUNT, \
+            f'index must be in range from 0 to {COMBINATION_COUNT - 1}, got {index!r}'
+
+        inner_rank, other_rank = divmod(index, len(_PERMUTATIONS))
+        left, middle, right = map(
+            Node.from_inner_and_other,
+            _PERMUTATIONS[inner_rank],
+            _PERMUTATIONS[other_rank],
+            )
+        return cls(left=left, middle=middle, right=right)
 
     def to_room_state(self, key_set: KeySetType, /) -> StateOfAllRooms:
-        return init_rooms(
-            left_inner_shape=self.left.inner,
-            left_other_shape=self.left.available[1],
-            middle_inner_shape=self.middle.inner,
-            middle_other_shape=self.middle.available[1],
-            right_inner_shape=self.right.inner,
-            right_other_shape=self.right.available[1],
-            key_set=key_set,
+        if self.index is None:
+            return init_rooms(
+                left_inner_shape=self.left.inner,
+                left_other_shape=self.left.available[1],
+                middle_inner_shape=self.middle.inner,
+                middle_other_shape=self.middle.available[1],
+                right_inner_shape=self.right.inner,
+                right_other_shape=self.right.available[1],
+                key_set=key_set,
+                )
+
+        # Combinations with an index are valid, so validation is skipped.
+        return StateOfAllRooms.from_shapes(
+            (self.left.inner, self.middle.inner, self.right.inner),
+            (self.left.available[1], self.middle.available[1], self.right.available[1]),
+            key_set,
             )
 
     def to_statue_state(self, key_set: KeySetType, /) -> StateOfAllStatues:
-        return init_statues(
-            left_inner_shape=self.left.inner,
-            left_held_shape=self.left.available[0] + self.left.available[1],
-            middle_inner_shape=self.middle.inner,
-            middle_held_shape=self.middle.available[0] + self.middle.available[1],
-            right_inner_shape=self.right.inner,
-            right_held_shape=self.right.available[0] + self.right.available[1],
-            key_set=key_set,
+        held = tuple(n.available[0] + n.available[1] for n in (self.left, self.middle, self.right))
+        if self.index is None:
+            return init_statues(
+                left_inner_shape=self.left.inner,
+                left_held_shape=held[0],
+                middle_inner_shape=self.middle.inner,
+                middle_held_shape=held[1],
+                right_inner_shape=self.right.inner,
+                right_held_shape=held[2],
+                key_set=key_set,
+                )
+
+        # Combinations with an index are valid, so validation is skipped.
+        return StateOfAllStatues.from_shapes(
+            (self.left.inner, self.middle.inner, self.right.inner),
+            held,
+            key_set,
             )
 
 
+def iter_combinations() -> Iterator[Combination]:
+    """
+    Yields all valid combinations in the order of their indexes.
+    """
+    for index in range(COMBINATION_COUNT):
+        yield Combination.from_index(index)
+
+
 code_to_best_ks = {
     '0[03]-3[34]-4[40]': KSDouble2,
     '0[04]-3[30]-4[43]': KSDouble1,
@@ -78,6 +146,63 @@ code_to_best_ks = {
     '4[43]-3[30]-0[04]': KSDouble1,
     }
 
+index_to_best_ks: tuple[KeySetType | None, ...] = tuple(
+    code_to_best_ks.get(c.code)
+    for c in iter_combinations()
+    )
+"""
+Values of :data:`code_to_best_ks` by indexes of combinations.
+"""
+
+
+def solve_key_sets(
+        combination: Combination,
+        key_sets: Sequence[KeySetType],
+        /,
+        *,
+        rooms: bool,
+        is_doing_triumph: bool = False,
+        last_position: str | None = None,
+        ) -> list[StateOfAllRooms | StateOfAllStatues]:
+    """
+    Solves rooms or statues of the combination for every key set in one search
+    and returns solutions in the same order as key sets.
+    """
+    create_state = Combination.to_room_state if rooms else Combination.to_statue_state
+    problems = {
+        i: (create_state(combination, key_set), is_doing_triumph, last_position)
+        for i, key_set in enumerate(key_sets)
+        }
+    state_type = StateOfAllRooms if rooms else StateOfAllStatues
+    solutions = state_type.solve_many(problems)
+    return [solutions[i] for i in range(len(key_sets))]
+
+
+def find_best_double_key(
+        *,
+        rooms: Combination | None,
+        statues: Combination | None,
+        ) -> KeySetType:
+    """
+    Determines the best double key set for provided combinations via search.
+
+    At first compares the number of moves in solo rooms for both double key sets.
+    If they are equal or the combination is not provided,
+    then it compares the number of moves in dissection.
+    If either comparison is indifferent, returns ``KSDouble1``.
+    """
+    key_sets = KSDouble1, KSDouble2
+    for combination, is_rooms in ((rooms, True), (statues, False)):
+        if combination is None: continue
+
+        solution1, solution2 = solve_key_sets(combination, key_sets, rooms=is_rooms)
+        count1 = len(solution1.moves_made)
+        count2 = len(solution2.moves_made)
+        if count1 != count2:
+            return KSDouble1 if count1 < count2 else KSDouble2
+
+    return KSDouble1
+
 
 def get_best_double_key(*, rooms: Combination | None, statues: Combination | None) -> KeySetType:
     """
@@ -87,18 +212,27 @@ def get_best_double_key(*, rooms: Combination | None, statues: Combination | Non
     If there is no best key or the combination is not provided,
     then it uses statue combination for evaluation.
     If either evaluation is indifferent, returns ``KSDouble1``.
+    The table of best key sets matches :func:`find_best_double_key`.
     """
-    if rooms is not None:
-        best_ks = code_to_best_ks.get(rooms.code)
+    if rooms is not None and rooms.index is not None:
+        best_ks = index_to_best_ks[rooms.index]
         if best_ks is not None:
             return best_ks
 
-    if statues is not None:
-        best_ks = code_to_best_ks.get(statues.code)
+    if statues is not None and statues.index is not None:
+        best_ks = index_to_best_ks[statues.index]
         if best_ks is not None:
             return best_ks
 
     return KSDouble1
 
 
-__all__ = 'Node', 'Combination', 'get_best_double_key'
+__all__ = (
+    'COMBINATION_COUNT',
+    'Node',
+    'Combination',
+    'iter_combinations',
+    'solve_key_sets',
+    'find_best_double_key',
+    'get_best_double_key',
+    )
@@ -1,8 +1,14 @@
 import tomllib
+from collections import Counter
+from collections.abc import Iterator, Mapping
 from dataclasses import dataclass
 from enum import Enum
+from itertools import chain, permutations
+from typing import assert_never
 
-from .combo import Combination, Node
+from .combo import Combination, Node, get_best_double_key
+from .engines import AUTO_ENGINE
+from .key_sets import KSMixed, KeySetType
 from .players import *
 from .shapes import *
 from .states import *
@@ -24,6 +30,9 @@ number2shape = {
     43:            prism,
     }
 
+# Numbers are iterated in reverse, so the first number of every shape is used.
+shape2number = {shape: number for number, shape in reversed(number2shape.items())}
+
 
 class KeySetName(Enum):
     MIXED = 'mixed'
@@ -38,6 +47,7 @@ class Config:
     players: tuple[Player, Player, Player]
     is_doing_triumph: bool
     last_position: PositionsType | None
+    engine: str
 
     def encounter_data(self, /) -> tuple[Combination, Combination, AliasMappingType]:
         """
@@ -68,6 +78,53 @@ class Config:
 
         return rooms, statues, aliases
 
+    def key_set(self, /, *, rooms: Combination | None, statues: Combination | None) -> KeySetType:
+        """
+        Returns the key set specified by this config.
+        If it is double, the best one is determined for provided combinations.
+        """
+        match self.key_set_name:
+            case KeySetName.MIXED:
+                return KSMixed
+            case KeySetName.DOUBLE:
+                return get_best_double_key(rooms=rooms, statues=statues)
+            case unknown:
+                assert_never(unknown)
+
+
+def validate_config(config: Config, /) -> None:
+    """
+    Checks that the config describes a possible encounter.
+    Raises :class:`AssertionError` describing the first problem found.
+    """
+    assert isinstance(config.key_set_name, KeySetName), 'key_set_name must be KeySetName'
+    assert isinstance(config.is_doing_triumph, bool), 'is_doing_triumph must be a boolean'
+    assert config.last_position is None or is_position(config.last_position), \
+        f'last_position must be None, {LEFT!r}, {MIDDLE!r} or {RIGHT!r}'
+    assert isinstance(config.engine, str), 'engine must be a string'
+
+    inner = config.inner_shapes
+    assert len(inner) == 3 and set(inner) == {circle, triangle, square}, \
+        f'inner_shapes must be a permutation of {circle}, {triangle} and {square}, got {inner}'
+
+    held = config.held_shapes
+    assert len(held) == 3 and all(isinstance(s, Shape3D) for s in held), \
+        f'held_shapes must be three 3D shapes, got {held}'
+    assert all(i in h.terms for i, h in zip(inner, held)), \
+        'every held shape must contain the respective inner shape'
+    terms = Counter(chain.from_iterable(h.terms.elements() for h in held))
+    assert all(v == 2 for v in terms.values()), \
+        f'the number of all 2D terms of held shapes must be 2, got {dict(terms)}'
+
+    players = config.players
+    assert len(players) == 3 and all(isinstance(p, Player) for p in players), \
+        'players must be three instances of Player'
+    assert {p.their_shape for p in players} == set(inner), \
+        'their_shape of players must be a permutation of inner_shapes'
+    shapes = Counter(chain.from_iterable((p.their_shape, p.other_shape) for p in players))
+    assert all(v == 2 for v in shapes.values()), \
+        f'every 2D shape must be present twice among shapes of players, got {dict(shapes)}'
+
 
 def read_config(filepath: str, /) -> Config:
     """
@@ -77,6 +134,153 @@ def read_config(filepath: str, /) -> Config:
     with open(filepath, 'rb') as f:
         data = tomllib.load(f)
 
+    return parse_config(data)
+
+
+def parse_config(data: Mapping, /) -> Config:
+    """
+    Creates an instance of :class:`Config` from a mapping
+    with the same structure as the configuration file.
+    """
+    partial = parse_partial_config(data)
+    missing = partial.missing_fields
+    assert not missing, f'{', '.join(missing)} must be present'
+
+    return partial.to_config()
+
+
+def config_to_dict(config: Config, /) -> dict:
+    """
+    Converts the config to a dictionary with the same structure as the configuration file,
+    so :func:`parse_config` creates an equal config from it.
+    """
+    data = {
+        'key_set':          config.key_set_name.value,
+        'is_doing_triumph': config.is_doing_triumph,
+        'last_position':    config.last_position or '',
+        'engine':           config.engine,
+        'inner_shapes':     [shape2number[s] for s in config.inner_shapes],
+        'held_shapes':      [shape2number[s] for s in config.held_shapes],
+        }
+    for i, p in enumerate(config.players, 1):
+        data[f'player{i}'] = {
+            'alias':       p.alias,
+            'their_shape': shape2number[p.their_shape],
+            'other_shape': shape2number[p.other_shape],
+            }
+
+    return data
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class PartialConfig:
+    """
+    Config of the encounter where some callouts are not known yet.
+    Unknown fields are ``None``.
+    """
+    key_set_name: KeySetName
+    inner_shapes: tuple[Shape2D, Shape2D, Shape2D] | None
+    held_shapes: tuple[Shape3D, Shape3D, Shape3D] | None
+    aliases: tuple[str, str, str]
+    """
+    Aliases of players, they are known before the encounter starts.
+    """
+    players: tuple[Player | None, Player | None, Player | None]
+    is_doing_triumph: bool
+    last_position: PositionsType | None
+    engine: str
+
+    @property
+    def missing_fields(self, /) -> tuple[str, ...]:
+        """
+        Names of unknown fields in the order they are called out.
+        """
+        fields = []
+        if self.inner_shapes is None: fields.append('inner_shapes')
+        fields.extend(f'player{i}' for i, p in enumerate(self.players, 1) if p is None)
+        if self.held_shapes is None: fields.append('held_shapes')
+        return tuple(fields)
+
+    def to_config(self, /) -> Config:
+        """
+        Returns the complete config.
+        All fields must be known.
+        """
+        assert not self.missing_fields, f'config is not complete, missing {self.missing_fields}'
+        config = Config(
+            key_set_name=self.key_set_name,
+            inner_shapes=self.inner_shapes,
+            held_shapes=self.held_shapes,
+            players=self.players,
+            is_doing_triumph=self.is_doing_triumph,
+            last_position=self.last_position,
+            engine=self.engine,
+            )
+        validate_config(config)
+        return config
+
+    def completions(self, /) -> Iterator[Config]:
+        """
+        Yields all complete configs consistent with known fields.
+        """
+        shapes = circle, triangle, square
+        inner_options = permutations(shapes) if self.inner_shapes is None else (self.inner_shapes,)
+        for inner in inner_options:
+            if self.held_shapes is None:
+                held_options = [
+                    tuple(i + o for i, o in zip(inner, other))
+                    for other in permutations(shapes)
+                    ]
+            else:
+                held_options = self.held_shapes,
+
+            # Other shape of the player with i-th inner shape and
+            # the inner shape of the player with i-th alias.
+            for other in permutations(shapes):
+                for their in permutations(shapes):
+                    players = tuple(
+                        Player(alias=alias, their_shape=t, other_shape=other[inner.index(t)])
+                        for alias, t in zip(self.aliases, their)
+                        )
+                    if any(p is not None and p != c for p, c in zip(self.players, players)):
+                        continue
+
+                    for held in held_options:
+                        config = Config(
+                            key_set_name=self.key_set_name,
+                            inner_shapes=inner,
+                            held_shapes=held,
+                            players=players,
+                            is_doing_triumph=self.is_doing_triumph,
+                            last_position=self.last_position,
+                            engine=self.engine,
+                            )
+                        try:
+                            validate_config(config)
+                        except AssertionError:
+                            continue
+
+                        yield config
+
+
+def read_partial_config(filepath: str, /) -> PartialConfig:
+    """
+    Reads configuration file where some callouts may be absent
+    and returns an instance of :class:`PartialConfig`.
+    """
+    with open(filepath, 'rb') as f:
+        data = tomllib.load(f)
+
+    return parse_partial_config(data)
+
+
+def parse_partial_config(data: Mapping, /) -> PartialConfig:
+    """
+    Creates an instance of :class:`PartialConfig` from a mapping
+    with the same structure as the configuration file.
+    Shapes which are not called out yet are absent or empty lists,
+    players which are not called out yet have only an alias.
+    """
     key_set_name = data.get('key_set', KeySetName.MIXED.value)
     assert key_set_name in KeySetName, \
         f'key_set must be either {KeySetName.MIXED.value!r} or {KeySetName.DOUBLE.value!r}'
@@ -91,39 +295,70 @@ def read_config(filepath: str, /) -> Config:
     assert last_position is None or is_position(last_position), \
         f'last_position must be \'\', {LEFT!r}, {MIDDLE!r} or {RIGHT!r}'
 
-    inner_shapes = data['inner_shapes']
-    assert isinstance(inner_shapes, list) and len(inner_shapes) == 3, \
+    engine = data.get('engine', AUTO_ENGINE)
+    assert isinstance(engine, str), 'engine must be a string'
+
+    inner_shapes = data.get('inner_shapes', [])
+    assert isinstance(inner_shapes, list) and len(inner_shapes) in (0, 3), \
         f'inner_shapes must be a permutation of [0, 3, 4]'
 
-    held_shapes = data['held_shapes']
-    assert isinstance(held_shapes, list) and len(held_shapes) == 3, \
+    held_shapes = data.get('held_shapes', [])
+    assert isinstance(held_shapes, list) and len(held_shapes) in (0, 3), \
         f'held_shapes must be a list of three numbers representing 3D shapes'
 
-    inner: list[Shape2D] = [number2shape[i] for i in inner_shapes]
-    held: list[Shape3D] = [number2shape[i] for i in held_shapes]
+    inner = None
+    if inner_shapes:
+        inner = tuple(number2shape[i] for i in inner_shapes)
+
+    held = None
+    if held_shapes:
+        held = tuple(number2shape[i] for i in held_shapes)
 
     player1_kw = data['player1']
     player2_kw = data['player2']
     player3_kw = data['player3']
+    aliases = []
     players = []
     for i, p in enumerate((player1_kw, player2_kw, player3_kw), 1):
-        cond = isinstance(p, dict) and p.keys() == Player.__annotations__.keys()
+        cond = isinstance(p, Mapping) and (
+            p.keys() == Player.__annotations__.keys() or p.keys() == {'alias'}
+        )
         assert cond, (
             f'player{i} must be a mapping '
             f'and have values for fields {', '.join(Player.__annotations__)}'
         )
-        p['their_shape'] = number2shape[p['their_shape']]
-        p['other_shape'] = number2shape[p['other_shape']]
-        players.append(Player(**p))
+        aliases.append(p['alias'])
+        if p.keys() == {'alias'}:
+            players.append(None)
+        else:
+            players.append(
+                Player(
+                    alias=p['alias'],
+                    their_shape=number2shape[p['their_shape']],
+                    other_shape=number2shape[p['other_shape']],
+                    )
+                )
 
-    return Config(
+    return PartialConfig(
         key_set_name=KeySetName(key_set_name),
-        inner_shapes=(inner[0], inner[1], inner[2]),
-        held_shapes=(held[0], held[1], held[2]),
+        inner_shapes=inner,
+        held_shapes=held,
+        aliases=(aliases[0], aliases[1], aliases[2]),
         players=(players[0], players[1], players[2]),
         is_doing_triumph=is_doing_triumph,
         last_position=last_position,
+        engine=engine,
         )
 
 
-__all__ = 'KeySetName', 'Config', 'read_config'
+__all__ = (
+    'KeySetName',
+    'Config',
+    'validate_config',
+    'read_config',
+    'parse_config',
+    'config_to_dict',
+    'PartialConfig',
+    'read_partial_config',
+    'parse_partial_config',
+    )
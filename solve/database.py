@@ -0,0 +1,535 @@
+import mmap
+import os
+import struct
+from array import array
+from collections import deque
+from collections.abc import Iterator
+from hashlib import blake2b
+from pathlib import Path
+from time import monotonic
+
+from . import key_sets, shapes
+from .combo import iter_combinations
+from .key_sets import *
+from .states import *
+from .states.codec import POSITION_TO_CODE
+
+FORMAT_VERSION = 2
+MAGIC = b'VSDB'
+
+_HEADER = struct.Struct('<4sH16s')
+_SECTION_HEADER = struct.Struct('<II')
+_NODE_SIZE = 12
+UNREACHABLE = 0xFF
+"""
+Distance value stored for states from which the goal cannot be reached.
+"""
+
+_DISTANCE_COLUMNS = 5
+# Column 0 - without triumph.
+# Columns 1-3 - with triumph when the last position is left, middle or right respectively.
+# Column 4 - with triumph when there is no last position.
+_NO_LAST_POSITION = 3
+
+
+def source_digest() -> bytes:
+    """
+    Returns the digest of definitions of shapes and key sets.
+    A database built with different definitions must not be used.
+    """
+    h = blake2b(digest_size=16)
+    h.update(Path(shapes.__file__).read_bytes())
+    h.update(Path(key_sets.__file__).read_bytes())
+    return h.digest()
+
+
+class DatabaseVersionError(ValueError):
+    """
+    Raised when a database file has unknown format
+    or was built with different definitions of shapes or key sets.
+    """
+
+
+type _NodeType = tuple[State, State, State]
+type _EdgeType = tuple[int, _NodeType, int, int]
+
+
+def _room_edges(node: _NodeType, /) -> Iterator[_EdgeType]:
+    # Label is the code of the pass move.
+    # Triumph forbids to pass to the room which received shape in the last move.
+    table = StateOfAllRooms.transition_table
+    for i1, i2, i3, (j1, j2, j3) in POSITION_ORDERS:
+        for move, new_s1, new_s2 in table[node[i1], node[i2]]:
+            new_node = new_s1, new_s2, node[i3]
+            yield move.code, (new_node[j1], new_node[j2], new_node[j3]), i2, i2
+
+
+def _statue_edges(node: _NodeType, /) -> Iterator[_EdgeType]:
+    # Label is the pair of codes of dissect moves.
+    # Triumph forbids to start with the statue dissected last in the last move.
+    table = StateOfAllStatues.transition_table
+    for i1, i2, i3, (j1, j2, j3) in POSITION_ORDERS:
+        for move1, move2, new_s1, new_s2, _, _ in table[node[i1], node[i2]]:
+            new_node = new_s1, new_s2, node[i3]
+            label = move1.code * 9 + move2.code
+            yield label, (new_node[j1], new_node[j2], new_node[j3]), i1, i2
+
+
+def _compute_distances(
+        done: list[bool],
+        edges: list[list[tuple[int, int, int, int]]],
+        /,
+        ) -> bytearray:
+    """
+    Computes distances from every node to the nearest done node via backward BFS.
+    """
+    n = len(done)
+    reversed_edges = [[] for _ in range(n)]
+    for source, node_edges in enumerate(edges):
+        for _, target, entry, exit_ in node_edges:
+            reversed_edges[target].append((source, entry, exit_))
+
+    distances = bytearray([UNREACHABLE]) * (n * _DISTANCE_COLUMNS)
+
+    # Without triumph
+    queue = deque()
+    for node, is_done in enumerate(done):
+        if is_done:
+            distances[node * _DISTANCE_COLUMNS] = 0
+            queue.append(node)
+
+    while queue:
+        node = queue.popleft()
+        distance = distances[node * _DISTANCE_COLUMNS] + 1
+        for source, _, _ in reversed_edges[node]:
+            i = source * _DISTANCE_COLUMNS
+            if distances[i] == UNREACHABLE:
+                distances[i] = min(distance, UNREACHABLE - 1)
+                queue.append(source)
+
+    # With triumph nodes are extended with the last position.
+    # Move with given entry is allowed only if the last position is different.
+    queue = deque()
+    for node, is_done in enumerate(done):
+        if is_done:
+            for last in range(_NO_LAST_POSITION + 1):
+                distances[node * _DISTANCE_COLUMNS + 1 + last] = 0
+
+            for last in range(_NO_LAST_POSITION):
+                queue.append((node, last))
+
+    while queue:
+        node, last = queue.popleft()
+        distance = distances[node * _DISTANCE_COLUMNS + 1 + last] + 1
+        for source, entry, exit_ in reversed_edges[node]:
+            if exit_ != last: continue
+
+            for source_last in range(_NO_LAST_POSITION + 1):
+                if source_last == entry: continue
+
+                i = source * _DISTANCE_COLUMNS + 1 + source_last
+                if distances[i] == UNREACHABLE:
+                    distances[i] = min(distance, UNREACHABLE - 1)
+                    if source_last != _NO_LAST_POSITION:
+                        queue.append((source, source_last))
+
+    return distances
+
+
+def _build_section(
+        cls: type[StateWithAllPositions],
+        initial_states: list[StateWithAllPositions],
+        edges_of,
+        /,
+        ) -> bytes:
+    """
+    Enumerates all states reachable from initial ones and serializes them.
+    """
+    reachable = set()
+    stack = [(s.left, s.middle, s.right) for s in initial_states]
+    while stack:
+        node = stack.pop()
+        if node in reachable: continue
+
+        reachable.add(node)
+        stack.extend(new_node for _, new_node, _, _ in edges_of(node))
+
+    # Sort nodes by their binary representation to find them via binary search.
+    codes = {node: cls(*node).to_bytes() for node in reachable}
+    nodes = sorted(reachable, key=codes.__getitem__)
+    node2id = {node: i for i, node in enumerate(nodes)}
+
+    edges = [
+        [(label, node2id[new_node], entry, exit_) for label, new_node, entry, exit_ in edges_of(node)]
+        for node in nodes
+        ]
+
+    # Transitions are stored in compressed sparse row format:
+    # transitions of the i-th node are in range [offsets[i], offsets[i + 1]) of other arrays.
+    offsets = array('I', [0])
+    targets = array('I')
+    labels = bytearray()
+    positions = bytearray()
+    for node_edges in edges:
+        for label, target, entry, exit_ in node_edges:
+            targets.append(target)
+            labels.append(label)
+            positions.append(entry * 3 + exit_)
+
+        offsets.append(len(targets))
+
+    done = [cls(*node).is_done for node in nodes]
+    distances = _compute_distances(done, edges)
+
+    return b''.join((
+        _SECTION_HEADER.pack(len(nodes), len(targets)),
+        b''.join(codes[node] for node in nodes),
+        offsets.tobytes(),
+        targets.tobytes(),
+        labels,
+        positions,
+        distances,
+        ))
+
+
+def build_database(filepath: str, /) -> None:
+    """
+    Enumerates all states of rooms and statues reachable from any valid initial state
+    and writes them with transitions and distances to the goal to the given file.
+    The file is replaced atomically.
+    """
+    all_key_sets = KSMixed, KSDouble1, KSDouble2
+    combinations = list(iter_combinations())
+    rooms = _build_section(
+        StateOfAllRooms,
+        [c.to_room_state(ks) for c in combinations for ks in all_key_sets],
+        _room_edges,
+        )
+    statues = _build_section(
+        StateOfAllStatues,
+        [c.to_statue_state(ks) for c in combinations for ks in all_key_sets],
+        _statue_edges,
+        )
+
+    tmp_filepath = f'{filepath}.{os.getpid()}.tmp'
+    with open(tmp_filepath, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, source_digest()))
+        f.write(rooms)
+        f.write(statues)
+
+    os.replace(tmp_filepath, filepath)
+
+
+class StateSpaceSection[T: StateWithAllPositions]:
+    """
+    A view of states of one kind stored in a database.
+    All data is read directly from the memory-mapped file.
+    """
+    __slots__ = (
+        'state_type',
+        'node_count',
+        'edge_count',
+        'size',
+        '_nodes',
+        '_offsets',
+        '_targets',
+        '_labels',
+        '_positions',
+        '_distances',
+        )
+
+    def __init__(self, state_type: type[T], buffer: memoryview, offset: int, /) -> None:
+        self.state_type = state_type
+        self.node_count, self.edge_count = n, e = _SECTION_HEADER.unpack_from(buffer, offset)
+        offset += _SECTION_HEADER.size
+
+        sizes = _NODE_SIZE * n, 4 * (n + 1), 4 * e, e, e, _DISTANCE_COLUMNS * n
+        views = []
+        for size in sizes:
+            views.append(buffer[offset:offset + size])
+            offset += size
+
+        self._nodes, offsets, targets, self._labels, self._positions, self._distances = views
+        self._offsets = offsets.cast('I')
+        self._targets = targets.cast('I')
+        offsets.release()
+        targets.release()
+        self.size = _SECTION_HEADER.size + sum(sizes)
+
+    def release(self, /) -> None:
+        """
+        Releases views of the file.
+        The section must not be used after that.
+        """
+        for view in (
+                self._nodes,
+                self._offsets,
+                self._targets,
+                self._labels,
+                self._positions,
+                self._distances,
+                ):
+            view.release()
+
+    def find(self, state: StateWithAllPositions, /) -> int | None:
+        """
+        Returns the ID of the given state ignoring moves made
+        or ``None`` if the state is not present.
+        """
+        code = (state.left.to_bytes() + state.middle.to_bytes() + state.right.to_bytes())
+        nodes = self._nodes
+        lo = 0
+        hi = self.node_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mid * _NODE_SIZE
+            mid_code = nodes[start:start + _NODE_SIZE].tobytes()
+            if mid_code < code:
+                lo = mid + 1
+            elif mid_code > code:
+                hi = mid
+            else:
+                return mid
+
+        return None
+
+    def state(self, node_id: int, /) -> T:
+        """
+        Returns the state with the given ID without moves made.
+        """
+        start = node_id * _NODE_SIZE
+        return self.state_type.from_bytes(self._nodes[start:start + _NODE_SIZE].tobytes())
+
+    def edges(self, node_id: int, /) -> Iterator[tuple[int, int, int, int]]:
+        """
+        Yields label, target ID, entry position index and exit position index
+        for every transition from the state with the given ID.
+        """
+        for i in range(self._offsets[node_id], self._offsets[node_id + 1]):
+            entry, exit_ = divmod(self._positions[i], 3)
+            yield self._labels[i], self._targets[i], entry, exit_
+
+    def label_moves(self, label: int, /) -> tuple[PMove, ...]:
+        """
+        Returns moves of one cycle denoted by the label of a transition.
+        """
+        if issubclass(self.state_type, StateOfAllRooms):
+            return PassMove.from_code(label),
+
+        code1, code2 = divmod(label, 9)
+        return DissectMove.from_code(code1), DissectMove.from_code(code2)
+
+    def distance(
+            self,
+            node_id: int,
+            /,
+            is_doing_triumph: bool,
+            last_position: PositionsType | None,
+            ) -> int | None:
+        """
+        Returns the minimal number of cycles required to solve the state with the given ID
+        or ``None`` if it cannot be solved.
+        """
+        column = 0
+        if is_doing_triumph:
+            column = 1 + (_NO_LAST_POSITION if last_position is None else POSITION_TO_CODE[last_position])
+
+        distance = self._distances[node_id * _DISTANCE_COLUMNS + column]
+        return None if distance == UNREACHABLE else distance
+
+    def shortest_path(
+            self,
+            node_id: int,
+            /,
+            is_doing_triumph: bool,
+            last_position: PositionsType | None,
+            *,
+            deadline: float | None = None,
+            cancellation: CancellationToken | None = None,
+            ) -> tuple[tuple[int, ...], int] | None:
+        """
+        Searches transitions breadth-first from the state with the given ID
+        to the nearest done state.
+        Returns labels of transitions on the way alongside the number of expanded nodes
+        or ``None`` if no done state can be reached within ``state_type.max_cycles`` cycles.
+
+        Precomputed distances are used only to recognize done states, which have zero distance,
+        they do not guide the search.
+        While doing triumph, nodes are extended with the last position,
+        so a transition is skipped if it starts at the position touched last.
+        """
+        offsets = self._offsets
+        targets = self._targets
+        positions = self._positions
+        distances = self._distances
+        last = _NO_LAST_POSITION
+        if is_doing_triumph and last_position is not None:
+            last = POSITION_TO_CODE[last_position]
+
+        # Maps every visited node to the previous node and the index of the transition to it.
+        start = node_id, last
+        parents: dict[tuple[int, int], tuple[tuple[int, int], int] | None] = {start: None}
+        frontier = [start]
+        expanded = 0
+        max_cycles = self.state_type.max_cycles
+        for cycle in range(max_cycles + 1):
+            if cancellation is not None and cancellation.is_cancelled:
+                raise SearchCancelled(f'search from node {node_id} is cancelled')
+
+            if deadline is not None and monotonic() >= deadline:
+                raise TimeoutError(f'search from node {node_id} reached the deadline')
+
+            next_frontier = []
+            for node in frontier:
+                source, last = node
+                # Only done states have zero distance.
+                if distances[source * _DISTANCE_COLUMNS] == 0:
+                    labels = []
+                    while (parent := parents[node]) is not None:
+                        node, i = parent
+                        labels.append(self._labels[i])
+
+                    return tuple(reversed(labels)), expanded
+
+                # Every transition is one cycle, so nodes of the last level are not expanded.
+                if cycle == max_cycles: continue
+
+                expanded += 1
+                for i in range(offsets[source], offsets[source + 1]):
+                    entry, exit_ = divmod(positions[i], 3)
+                    if is_doing_triumph:
+                        if entry == last: continue
+
+                        next_node = targets[i], exit_
+                    else:
+                        next_node = targets[i], _NO_LAST_POSITION
+
+                    if next_node in parents: continue
+
+                    parents[next_node] = node, i
+                    next_frontier.append(next_node)
+
+            frontier = next_frontier
+
+        return None
+
+
+class StateSpaceDatabase:
+    """
+    A read-only database of all reachable states of rooms and statues.
+    The file is memory-mapped, so all processes opening the same file share its memory.
+    """
+    __slots__ = '_file', '_mmap', '_buffer', 'rooms', 'statues'
+
+    def __init__(self, filepath: str, /) -> None:
+        """
+        Opens the database file.
+        Raises :class:`DatabaseVersionError` if the file is not compatible with this version.
+        """
+        self._file = open(filepath, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        self._buffer = buffer = memoryview(self._mmap)
+        try:
+            magic, version, digest = _HEADER.unpack_from(buffer)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise DatabaseVersionError(
+                    f'file {filepath!r} is not a state space database '
+                    f'of format version {FORMAT_VERSION}'
+                    )
+
+            if digest != source_digest():
+                raise DatabaseVersionError(
+                    f'database {filepath!r} was built with different shapes or key sets'
+                    )
+
+            offset = _HEADER.size
+            self.rooms = StateSpaceSection(StateOfAllRooms, buffer, offset)
+            offset += self.rooms.size
+            self.statues = StateSpaceSection(StateOfAllStatues, buffer, offset)
+        except BaseException:
+            self.close()
+            raise
+
+    def section[T: StateWithAllPositions](self, state_type: type[T], /) -> StateSpaceSection[T]:
+        """
+        Returns the section which stores states of the given type.
+        """
+        if issubclass(state_type, StateOfAllRooms):
+            return self.rooms
+
+        if issubclass(state_type, StateOfAllStatues):
+            return self.statues
+
+        raise TypeError(f'no section for states of type {state_type.__name__!r}')
+
+    def close(self, /) -> None:
+        """
+        Closes the database.
+        Views of sections must not be used after that.
+        """
+        for attr in ('rooms', 'statues'):
+            if hasattr(self, attr):
+                getattr(self, attr).release()
+                delattr(self, attr)
+
+        if hasattr(self, '_buffer'):
+            self._buffer.release()
+            del self._buffer
+
+        if hasattr(self, '_mmap'):
+            self._mmap.close()
+
+        self._file.close()
+
+    def __enter__(self, /) -> 'StateSpaceDatabase':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb, /) -> None:
+        self.close()
+
+
+def open_database(filepath: str, /, *, rebuild: bool = True) -> StateSpaceDatabase:
+    """
+    Opens the database file.
+    If the file is absent or incompatible and ``rebuild`` is ``True``, builds it at first.
+    """
+    if rebuild:
+        try:
+            return StateSpaceDatabase(filepath)
+        except (FileNotFoundError, DatabaseVersionError):
+            build_database(filepath)
+
+    return StateSpaceDatabase(filepath)
+
+
+__all__ = (
+    'FORMAT_VERSION',
+    'UNREACHABLE',
+    'DatabaseVersionError',
+    'source_digest',
+    'build_database',
+    'StateSpaceSection',
+    'StateSpaceDatabase',
+    'open_database',
+    )
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+        prog=f'python -m {__spec__.name}',
+        description='Builds the database of all reachable states of rooms and statues',
+        )
+    parser.add_argument(
+        'filepath',
+        nargs='?',
+        default='state-space.db',
+        help='Path to the database file. Defaults to "state-space.db".',
+        )
+    args = parser.parse_args()
+    build_database(args.filepath)
@@ -0,0 +1,474 @@
+import os
+import warnings
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from time import monotonic, perf_counter
+from typing import ClassVar
+
+from .database import DatabaseVersionError, StateSpaceDatabase
+from .key_sets import *
+from .metrics import CACHE_LOOKUPS, INFEASIBLE_INPUTS, NODES_EXPANDED, SOLVE_SECONDS, UNSOLVED
+from .retrograde import solve_by_table
+from .states import *
+
+AUTO_ENGINE = 'auto'
+"""
+Name which selects an engine automatically, see :func:`select_engine`.
+"""
+
+DEFAULT_DATABASE_FILEPATH = 'state-space.db'
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class SearchStats:
+    engine: str
+    """
+    Name of the engine which made the search.
+    """
+    seconds: float
+    """
+    Time spent on the search.
+    """
+    moves: int
+    """
+    The number of moves made during the search.
+    """
+    is_optimal: bool
+    """
+    Whether the solution is proven to be the shortest.
+    """
+    expanded: int = 0
+    """
+    The number of states whose next states were generated during the search.
+    """
+
+
+_KEY_SET_LABELS = {'mixed': KSMixed, 'double1': KSDouble1, 'double2': KSDouble2}
+
+
+def _part_label(state: StateWithAllPositions, /) -> str:
+    return 'rooms' if isinstance(state, StateOfAllRooms) else 'dissection'
+
+
+def _key_set_label(state: StateWithAllPositions, /) -> str:
+    s = state.left
+    for label, key_set in _KEY_SET_LABELS.items():
+        if key_set[s.own_shape].terms == s.final_shapes:
+            return label
+
+    return 'unknown'
+
+
+class Engine:
+    """
+    Base class for search engines.
+    Engines are created via :func:`get_engine`.
+    """
+    __slots__ = ()
+
+    name: ClassVar[str]
+    """
+    Name of the engine in the registry.
+    """
+
+    @classmethod
+    def is_available(cls, /) -> bool:
+        """
+        Whether the engine can be used in the current environment.
+        """
+        return True
+
+    def search[T: StateWithAllPositions](
+            self,
+            state: T,
+            /,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            *,
+            max_frontier: int | None = None,
+            deadline: float | None = None,
+            cancellation: CancellationToken | None = None,
+            workers: int = 1,
+            ) -> tuple[SearchResult[T], SearchStats]:
+        """
+        Makes moves starting from the given state until it is done,
+        then returns that done state alongside search statistics.
+        Arguments have the same meaning as in :meth:`StateWithAllPositions.search`,
+        engines ignore those they do not support.
+
+        Every search is recorded in metrics of module :mod:`solve.metrics`.
+        """
+        part = _part_label(state)
+        table = state.transition_table
+        lookups = table.lookups
+        misses = table.misses
+        start = perf_counter()
+        try:
+            result = self._search(
+                state,
+                is_doing_triumph,
+                last_position_touched,
+                max_frontier,
+                deadline,
+                cancellation,
+                workers,
+                )
+        except InfeasibleStateError:
+            INFEASIBLE_INPUTS.inc(part)
+            raise
+        except ValueError:
+            UNSOLVED.inc(part)
+            raise
+        finally:
+            misses = table.misses - misses
+            CACHE_LOOKUPS.inc('transitions', 'hit', amount=table.lookups - lookups - misses)
+            CACHE_LOOKUPS.inc('transitions', 'miss', amount=misses)
+
+        stats = SearchStats(
+            engine=self.name,
+            seconds=perf_counter() - start,
+            moves=len(result.state.moves_made) - len(state.moves_made),
+            is_optimal=result.is_optimal,
+            expanded=result.expanded,
+            )
+        SOLVE_SECONDS.observe(stats.seconds, part, _key_set_label(state), self.name)
+        NODES_EXPANDED.inc(part, amount=stats.expanded)
+        return result, stats
+
+    def _search[T: StateWithAllPositions](
+            self,
+            state: T,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            max_frontier: int | None,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            workers: int,
+            /,
+            ) -> SearchResult[T]:
+        raise NotImplementedError
+
+    def __reduce__(self, /) -> tuple[Callable[[str], 'Engine'], tuple[str]]:
+        # Engines may hold resources which cannot be sent to other processes,
+        # so every process gets its own engine.
+        return get_engine, (self.name,)
+
+
+_registry: dict[str, type[Engine]] = {}
+
+
+def register_engine[E: type[Engine]](cls: E, /) -> E:
+    """
+    Registers an engine class under its name.
+    Can be used as a class decorator.
+    """
+    name = cls.name
+    assert name != AUTO_ENGINE, f'engine name {AUTO_ENGINE!r} is reserved'
+    assert name not in _registry, f'engine {name!r} is already registered'
+    _registry[name] = cls
+    return cls
+
+
+def engine_names() -> tuple[str, ...]:
+    """
+    Returns names of all registered engines.
+    """
+    return tuple(_registry)
+
+
+@cache
+def get_engine(name: str = AUTO_ENGINE, /) -> Engine:
+    """
+    Returns the engine with the given name.
+    If the name is ``'auto'``, the engine is selected via :func:`select_engine`.
+    Engines are created once per process.
+    """
+    if name == AUTO_ENGINE:
+        return select_engine()
+
+    cls = _registry.get(name)
+    if cls is None:
+        raise ValueError(
+            f'unknown engine {name!r}, '
+            f'available engines are {', '.join(map(repr, (AUTO_ENGINE, *_registry)))}'
+            )
+
+    if not cls.is_available():
+        raise ValueError(f'engine {name!r} is not available')
+
+    return cls()
+
+
+def select_engine() -> Engine:
+    """
+    Returns the table engine if the state-space database is available,
+    otherwise returns the reference engine.
+    If the database gives invalid plans, warns and returns the reference engine.
+    """
+    if TableEngine.is_available():
+        try:
+            return get_engine(TableEngine.name)
+        except DatabaseVersionError as e:
+            warnings.warn(f'{e}, engine {ReferenceEngine.name!r} is used instead', stacklevel=2)
+
+    return get_engine(ReferenceEngine.name)
+
+
+@register_engine
+class ReferenceEngine(Engine):
+    """
+    Breadth-first search implemented by :meth:`StateWithAllPositions.search`.
+    Supports all search options.
+    """
+    __slots__ = ()
+
+    name = 'bfs'
+
+    def _search[T: StateWithAllPositions](
+            self,
+            state: T,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            max_frontier: int | None,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            workers: int,
+            /,
+            ) -> SearchResult[T]:
+        return state.search(
+            is_doing_triumph,
+            last_position_touched,
+            max_frontier=max_frontier,
+            deadline=deadline,
+            cancellation=cancellation,
+            workers=workers,
+            )
+
+
+@register_engine
+class DeduplicatedEngine(Engine):
+    """
+    Breadth-first search which keeps only one state
+    among states with the same future on every cycle.
+    Supports deadline and cancellation.
+    """
+    __slots__ = ()
+
+    name = 'dedup-bfs'
+
+    def _search[T: StateWithAllPositions](
+            self,
+            state: T,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            max_frontier: int | None,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            workers: int,
+            /,
+            ) -> SearchResult[T]:
+        check_first_position = is_doing_triumph and last_position_touched
+        states = [state]
+        expanded = 0
+        for cycle in range(state.max_cycles):
+            unique_states = {}
+            expanded += len(states)
+            for s in states:
+                if cancellation is not None and cancellation.is_cancelled:
+                    raise SearchCancelled(f'search from initial {state} is cancelled')
+
+                if deadline is not None and monotonic() >= deadline:
+                    raise TimeoutError(f'search from initial {state} reached the deadline')
+
+                for next_state in s.next_states(is_doing_triumph):
+                    if cycle == 0 and check_first_position \
+                            and last_position_touched == next_state.first_position:
+                        continue
+
+                    if next_state.is_done:
+                        return SearchResult(state=next_state, is_optimal=True, expanded=expanded)
+
+                    unique_states.setdefault(next_state.frontier_key(is_doing_triumph), next_state)
+
+            states = list(unique_states.values())
+
+        raise ValueError(
+            f'cannot solve encounter with initial {state} '
+            f'within {state.max_cycles} cycles'
+            )
+
+
+@register_engine
+class TableEngine(Engine):
+    """
+    Follows optimal moves stored in the state-space database, no search is made.
+    Available only if the database file exists in the current working directory
+    and matches the current version.
+
+    Plans are replayed before being returned.
+    If the database gives an invalid plan on loading, :class:`DatabaseVersionError` is raised
+    and the file is left as is, run ``python -m solve.database`` to rebuild it.
+    If it gives an invalid plan later, the state is searched instead.
+    """
+    __slots__ = 'database',
+
+    name = 'table'
+
+    def __init__(self, /) -> None:
+        self.database = StateSpaceDatabase(DEFAULT_DATABASE_FILEPATH)
+        if not self._is_consistent():
+            # The file is corrupted or was built by a different version of moves.
+            self.database.close()
+            raise DatabaseVersionError(
+                f'database {DEFAULT_DATABASE_FILEPATH!r} gives invalid plans, '
+                f'rebuild it with "python -m solve.database"'
+                )
+
+    def _is_consistent(self, /) -> bool:
+        """
+        Checks that plans from all initial states found in the database are valid.
+        """
+        for cls in (StateOfAllRooms, StateOfAllStatues):
+            for state in cls.initial_states():
+                try:
+                    solved = solve_by_table(self.database, state, False, None)
+                    state.replay(solved.moves_made, False, None)
+                except ValueError:
+                    return False
+
+        return True
+
+    @classmethod
+    def is_available(cls, /) -> bool:
+        if not os.path.exists(DEFAULT_DATABASE_FILEPATH):
+            return False
+
+        try:
+            StateSpaceDatabase(DEFAULT_DATABASE_FILEPATH).close()
+        except (OSError, DatabaseVersionError):
+            return False
+
+        return True
+
+    def _search[T: StateWithAllPositions](
+            self,
+            state: T,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            max_frontier: int | None,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            workers: int,
+            /,
+            ) -> SearchResult[T]:
+        try:
+            solved = solve_by_table(self.database, state, is_doing_triumph, last_position_touched)
+            state.replay(
+                solved.moves_made[len(state.moves_made):],
+                is_doing_triumph,
+                last_position_touched,
+                )
+        except ValueError:
+            # The state is absent or its entry is stale.
+            CACHE_LOOKUPS.inc('table', 'miss')
+            return state.search(
+                is_doing_triumph,
+                last_position_touched,
+                max_frontier=max_frontier,
+                deadline=deadline,
+                cancellation=cancellation,
+                workers=workers,
+                )
+
+        CACHE_LOOKUPS.inc('table', 'hit')
+        return SearchResult(state=solved, is_optimal=True)
+
+
+@register_engine
+class GraphEngine(Engine):
+    """
+    Breadth-first search over transitions compiled into the state-space database,
+    see :meth:`StateSpaceSection.shortest_path`.
+    States are integer IDs during the search, so no state objects are created
+    until the found plan is replayed.
+    Supports deadline and cancellation.
+    Available under the same conditions as the table engine.
+
+    If the state is absent in the database or the found plan is invalid,
+    the state is searched instead.
+    """
+    __slots__ = 'database',
+
+    name = 'graph-bfs'
+
+    def __init__(self, /) -> None:
+        self.database = StateSpaceDatabase(DEFAULT_DATABASE_FILEPATH)
+
+    @classmethod
+    def is_available(cls, /) -> bool:
+        return TableEngine.is_available()
+
+    def _search[T: StateWithAllPositions](
+            self,
+            state: T,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            max_frontier: int | None,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            workers: int,
+            /,
+            ) -> SearchResult[T]:
+        section = self.database.section(type(state))
+        node_id = section.find(state)
+        if node_id is not None:
+            path = section.shortest_path(
+                node_id,
+                is_doing_triumph,
+                state.last_position if state.moves_made else last_position_touched,
+                deadline=deadline,
+                cancellation=cancellation,
+                )
+            if path is None:
+                raise ValueError(
+                    f'cannot solve encounter with initial {state} '
+                    f'within {state.max_cycles} cycles'
+                    )
+
+            labels, expanded = path
+            moves = [m for label in labels for m in section.label_moves(label)]
+            try:
+                solved = state.replay(moves, is_doing_triumph, last_position_touched)
+            except InvalidPlanError:
+                pass
+            else:
+                CACHE_LOOKUPS.inc('graph', 'hit')
+                return SearchResult(state=solved, is_optimal=True, expanded=expanded)
+
+        # The state is absent or the database is stale.
+        CACHE_LOOKUPS.inc('graph', 'miss')
+        return state.search(
+            is_doing_triumph,
+            last_position_touched,
+            max_frontier=max_frontier,
+            deadline=deadline,
+            cancellation=cancellation,
+            workers=workers,
+            )
+
+
+__all__ = (
+    'AUTO_ENGINE',
+    'DEFAULT_DATABASE_FILEPATH',
+    'SearchStats',
+    'Engine',
+    'register_engine',
+    'engine_names',
+    'get_engine',
+    'select_engine',
+    'ReferenceEngine',
+    'DeduplicatedEngine',
+    'TableEngine',
+    'GraphEngine',
+    )
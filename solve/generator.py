@@ -0,0 +1,204 @@
+import json
+import os
+from collections.abc import Iterator
+from itertools import permutations
+from random import Random
+from typing import TextIO
+
+from .config import *
+from .engines import AUTO_ENGINE
+from .players import Player
+from .shapes import circle, square, triangle
+from .states import ALL_POSITIONS, PositionsType
+
+_PERMUTATIONS = tuple(permutations((circle, triangle, square)))
+
+DEFAULT_ALIASES = 'A', 'B', 'C'
+
+ENCOUNTER_COUNT = len(_PERMUTATIONS) ** 4
+"""
+The number of distinct encounters for fixed aliases, key set and triumph settings.
+"""
+
+
+def random_config(
+        rng: Random,
+        /,
+        *,
+        key_set_name: KeySetName | None = None,
+        is_doing_triumph: bool | None = None,
+        aliases: tuple[str, str, str] = DEFAULT_ALIASES,
+        engine: str = AUTO_ENGINE,
+        ) -> Config:
+    """
+    Draws a valid encounter uniformly at random.
+
+    The encounter is determined by four independent permutations of 2D shapes:
+    inner shapes, other shapes in solo rooms, other terms of held shapes
+    and the order of players.
+    If the key set or triumph setting is ``None``, it is drawn at random as well;
+    with triumph the last position is drawn among all positions and no position.
+    """
+    choice = rng.choice
+    inner = choice(_PERMUTATIONS)
+    other = choice(_PERMUTATIONS)
+    held_other = choice(_PERMUTATIONS)
+    order = choice(_PERMUTATIONS)
+
+    if key_set_name is None:
+        key_set_name = choice(tuple(KeySetName))
+
+    if is_doing_triumph is None:
+        is_doing_triumph = choice((False, True))
+
+    last_position: PositionsType | None = None
+    if is_doing_triumph:
+        last_position = choice((None, *ALL_POSITIONS))
+
+    # Player with i-th alias is in the room with inner shape order[i].
+    players = tuple(
+        Player(alias=alias, their_shape=their, other_shape=other[inner.index(their)])
+        for alias, their in zip(aliases, order)
+        )
+
+    return Config(
+        key_set_name=key_set_name,
+        inner_shapes=inner,
+        held_shapes=tuple(i + o for i, o in zip(inner, held_other)),
+        players=players,
+        is_doing_triumph=is_doing_triumph,
+        last_position=last_position,
+        engine=engine,
+        )
+
+
+def generate_configs(
+        count: int | None,
+        /,
+        seed: int | None = None,
+        *,
+        key_set_name: KeySetName | None = None,
+        is_doing_triumph: bool | None = None,
+        aliases: tuple[str, str, str] = DEFAULT_ALIASES,
+        engine: str = AUTO_ENGINE,
+        ) -> Iterator[Config]:
+    """
+    Lazily yields the given number of random encounters, see :func:`random_config`.
+    If ``count`` is ``None``, yields encounters infinitely.
+    The same seed always gives the same encounters.
+    """
+    rng = Random(seed)
+    index = 0
+    while count is None or index < count:
+        yield random_config(
+            rng,
+            key_set_name=key_set_name,
+            is_doing_triumph=is_doing_triumph,
+            aliases=aliases,
+            engine=engine,
+            )
+        index += 1
+
+
+def config_to_toml(config: Config, /) -> str:
+    """
+    Returns the config in the format of the configuration file.
+    """
+    data = config_to_dict(config)
+    lines = []
+    tables = []
+    for name, value in data.items():
+        if isinstance(value, dict):
+            tables.append('')
+            tables.append(f'[{name}]')
+            tables.extend(f'{k} = {json.dumps(v)}' for k, v in value.items())
+        else:
+            # JSON literals of strings, numbers, booleans and lists are valid in TOML.
+            lines.append(f'{name} = {json.dumps(value)}')
+
+    return '\n'.join(lines + tables) + '\n'
+
+
+def write_ndjson_configs(configs: Iterator[Config], file: TextIO, /) -> None:
+    """
+    Writes configs to a file as JSON objects, one per line,
+    which can be solved in batch mode.
+    """
+    dumps = json.dumps
+    write = file.write
+    for config in configs:
+        write(dumps(config_to_dict(config)))
+        write('\n')
+
+
+def write_toml_configs(configs: Iterator[Config], directory: str, /) -> None:
+    """
+    Writes every config to a separate configuration file in the directory.
+    Files are named ``encounter-<index>.toml``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for index, config in enumerate(configs):
+        with open(os.path.join(directory, f'encounter-{index}.toml'), 'w') as f:
+            f.write(config_to_toml(config))
+
+
+__all__ = (
+    'DEFAULT_ALIASES',
+    'ENCOUNTER_COUNT',
+    'random_config',
+    'generate_configs',
+    'config_to_toml',
+    'write_ndjson_configs',
+    'write_toml_configs',
+    )
+
+
+if __name__ == '__main__':
+    import sys
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(
+        prog=f'python -m {__spec__.name}',
+        description='Generates random valid encounters for stress testing',
+        )
+    parser.add_argument(
+        '-n',
+        '--count',
+        type=int,
+        default=1,
+        help='The number of encounters to generate. Defaults to 1.',
+        )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='Seed of the random generator. By default, encounters differ on every run.',
+        )
+    parser.add_argument(
+        '--key-set',
+        choices=[n.value for n in KeySetName],
+        help='Key set of all encounters. By default, it is random for every encounter.',
+        )
+    parser.add_argument(
+        '--triumph',
+        choices=('true', 'false'),
+        help='Whether all encounters are done with triumph. '
+             'By default, it is random for every encounter.',
+        )
+    parser.add_argument(
+        '--toml',
+        metavar='DIRECTORY',
+        help='If specified, every encounter is written to a separate configuration file '
+             'in this directory. By default, encounters are printed as JSON objects, one per line.',
+        )
+    args = parser.parse_args()
+
+    configs = generate_configs(
+        args.count,
+        args.seed,
+        key_set_name=None if args.key_set is None else KeySetName(args.key_set),
+        is_doing_triumph=None if args.triumph is None else args.triumph == 'true',
+        )
+    if args.toml is None:
+        write_ndjson_configs(configs, sys.stdout)
+    else:
+        write_toml_configs(configs, args.toml)
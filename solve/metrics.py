@@ -0,0 +1,363 @@
+import atexit
+from bisect import bisect_left
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, InvalidStateError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any
+
+type _LabelsType = tuple[str, ...]
+type SnapshotType = dict[str, dict[_LabelsType, Any]]
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+"""
+Content type of the Prometheus text exposition format.
+"""
+
+
+def _format_labels(names: _LabelsType, values: _LabelsType, /, **extra: str) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+
+    escaped = (
+        (name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+        )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    """
+    A counter with labels which only increases.
+    """
+    __slots__ = 'name', 'help', 'label_names', '_values', '_lock'
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_: str, label_names: _LabelsType = (), /) -> None:
+        self.name = name
+        self.help = help_
+        self.label_names = label_names
+        self._values: dict[_LabelsType, float] = {}
+        self._lock = Lock()
+
+    def inc(self, /, *labels: str, amount: float = 1) -> None:
+        """
+        Increases the counter with given label values.
+        """
+        assert len(labels) == len(self.label_names), \
+            f'{self.name} requires labels {self.label_names}, got {labels}'
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, /, *labels: str) -> float:
+        """
+        Returns the value of the counter with given label values.
+        """
+        return self._values.get(labels, 0)
+
+    def snapshot(self, /) -> dict[_LabelsType, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def merge(self, snapshot: dict[_LabelsType, float], /) -> None:
+        for labels, value in snapshot.items():
+            self.inc(*labels, amount=value)
+
+    def render(self, /) -> list[str]:
+        return [
+            f'{self.name}{_format_labels(self.label_names, labels)} {value}'
+            for labels, value in self.snapshot().items()
+            ]
+
+
+DEFAULT_BUCKETS = 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300
+
+
+class Histogram:
+    """
+    A histogram with labels which counts observed values in cumulative buckets.
+    """
+    __slots__ = 'name', 'help', 'label_names', 'buckets', '_values', '_lock'
+
+    type_name = 'histogram'
+
+    def __init__(
+            self,
+            name: str,
+            help_: str,
+            label_names: _LabelsType = (),
+            /,
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+            ) -> None:
+        assert list(buckets) == sorted(buckets), 'buckets must be sorted'
+        self.name = name
+        self.help = help_
+        self.label_names = label_names
+        self.buckets = buckets
+        # Maps labels to counts in buckets (the last is +Inf), the sum and the count.
+        self._values: dict[_LabelsType, tuple[list[int], float, int]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, /, *labels: str) -> None:
+        """
+        Records the value with given label values.
+        """
+        assert len(labels) == len(self.label_names), \
+            f'{self.name} requires labels {self.label_names}, got {labels}'
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                counts, total, count = [0] * (len(self.buckets) + 1), 0, 0
+            else:
+                counts, total, count = values
+
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[labels] = counts, total + value, count + 1
+
+    def count(self, /, *labels: str) -> int:
+        """
+        Returns the number of values observed with given label values.
+        """
+        values = self._values.get(labels)
+        return 0 if values is None else values[2]
+
+    def snapshot(self, /) -> dict[_LabelsType, tuple[list[int], float, int]]:
+        with self._lock:
+            return {
+                labels: (list(counts), total, count)
+                for labels, (counts, total, count) in self._values.items()
+                }
+
+    def merge(self, snapshot: dict[_LabelsType, tuple[list[int], float, int]], /) -> None:
+        with self._lock:
+            for labels, (counts, total, count) in snapshot.items():
+                current = self._values.get(labels)
+                if current is not None:
+                    counts = [a + b for a, b in zip(current[0], counts)]
+                    total += current[1]
+                    count += current[2]
+
+                self._values[labels] = counts, total, count
+
+    def render(self, /) -> list[str]:
+        lines = []
+        for labels, (counts, total, count) in self.snapshot().items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, labels, le=str(bound))
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+
+            formatted = _format_labels(self.label_names, labels)
+            lines.append(f'{self.name}_sum{formatted} {total}')
+            lines.append(f'{self.name}_count{formatted} {count}')
+
+        return lines
+
+
+class Registry:
+    """
+    A collection of metrics which are rendered together.
+    """
+    __slots__ = '_metrics',
+
+    def __init__(self, /) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def register[M: Counter | Histogram](self, metric: M, /) -> M:
+        assert metric.name not in self._metrics, f'metric {metric.name!r} is already registered'
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self, /) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.render())
+
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self, /) -> SnapshotType:
+        """
+        Returns values of all metrics which can be sent to another process.
+        """
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def merge(self, snapshot: SnapshotType, /) -> None:
+        """
+        Adds values from the snapshot of a registry in another process.
+        """
+        for name, values in snapshot.items():
+            self._metrics[name].merge(values)
+
+    def reset(self, /) -> None:
+        """
+        Drops values of all metrics.
+        """
+        for metric in self._metrics.values():
+            with metric._lock:
+                metric._values.clear()
+
+
+REGISTRY = Registry()
+
+SOLVE_SECONDS = REGISTRY.register(Histogram(
+    'solve_seconds',
+    'Time spent on solving one encounter part.',
+    ('part', 'key_set', 'engine'),
+    ))
+NODES_EXPANDED = REGISTRY.register(Counter(
+    'solve_nodes_expanded_total',
+    'States whose next states were generated during searches.',
+    ('part',),
+    ))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'solve_cache_lookups_total',
+    'Lookups in caches by result, either hit or miss.',
+    ('cache', 'result'),
+    ))
+INFEASIBLE_INPUTS = REGISTRY.register(Counter(
+    'solve_infeasible_inputs_total',
+    'Searches rejected without searching because the input cannot be solved.',
+    ('part',),
+    ))
+UNSOLVED = REGISTRY.register(Counter(
+    'solve_unsolved_total',
+    'Searches which found no solution within the maximum number of cycles.',
+    ('part',),
+    ))
+
+
+class _FailureWithMetrics(Exception):
+    """
+    Carries an exception raised in another process alongside metrics recorded before it.
+    """
+
+
+def _call_with_metrics(
+        function: Callable,
+        args: tuple,
+        kwargs: dict,
+        /,
+        ) -> tuple[Any, SnapshotType]:
+    # Worker processes are reused, so only metrics of this call are sent.
+    REGISTRY.reset()
+    try:
+        return function(*args, **kwargs), REGISTRY.snapshot()
+    except Exception as e:
+        raise _FailureWithMetrics(e, REGISTRY.snapshot()) from None
+
+
+def submit_with_metrics(executor: Executor, function: Callable, /, *args, **kwargs) -> Future:
+    """
+    Submits the function to the executor running it in another process
+    and merges metrics recorded during the call into :data:`REGISTRY` when it is done.
+    The returned future has the result or the exception of the function.
+    Cancelling it cancels the submitted call if it has not started yet,
+    otherwise the result of the call is dropped, but its metrics are still merged.
+    The executor must run functions in processes, because metrics of workers are reset.
+    """
+    inner = executor.submit(_call_with_metrics, function, args, kwargs)
+    outer = Future()
+
+    def on_outer_done(future: Future, /) -> None:
+        if future.cancelled():
+            inner.cancel()
+            # Notifies functions waiting for the future, e.g., concurrent.futures.wait.
+            future.set_running_or_notify_cancel()
+
+    def on_done(future: Future, /) -> None:
+        if future.cancelled():
+            outer.cancel()
+            return
+
+        try:
+            result, snapshot = future.result()
+        except _FailureWithMetrics as failure:
+            error, snapshot = failure.args
+            REGISTRY.merge(snapshot)
+            settle, value = outer.set_exception, error
+        except BaseException as e:
+            settle, value = outer.set_exception, e
+        else:
+            REGISTRY.merge(snapshot)
+            settle, value = outer.set_result, result
+
+        try:
+            settle(value)
+        except InvalidStateError:
+            # The outer future was cancelled while the call was running.
+            pass
+
+    outer.add_done_callback(on_outer_done)
+    inner.add_done_callback(on_done)
+    return outer
+
+
+def write_metrics(filepath: str, /) -> None:
+    """
+    Writes all metrics to the file in the Prometheus text exposition format.
+    """
+    with open(filepath, 'w') as f:
+        f.write(REGISTRY.render())
+
+
+def write_metrics_at_exit(filepath: str, /) -> None:
+    """
+    Writes all metrics to the file when the interpreter exits.
+    """
+    atexit.register(write_metrics, filepath)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self, /) -> None:
+        if self.path not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format_: str, /, *args) -> None:
+        # Scrapes must not pollute the output of the solver.
+        pass
+
+
+def serve_metrics(port: int, /, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serves all metrics at ``http://<host>:<port>/metrics`` from a daemon thread
+    and returns the server, call its ``shutdown`` method to stop it.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+__all__ = (
+    'CONTENT_TYPE',
+    'SnapshotType',
+    'Counter',
+    'DEFAULT_BUCKETS',
+    'Histogram',
+    'Registry',
+    'REGISTRY',
+    'SOLVE_SECONDS',
+    'NODES_EXPANDED',
+    'CACHE_LOOKUPS',
+    'INFEASIBLE_INPUTS',
+    'UNSOLVED',
+    'submit_with_metrics',
+    'write_metrics',
+    'write_metrics_at_exit',
+    'serve_metrics',
+    )
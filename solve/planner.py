@@ -0,0 +1,259 @@
+import tomllib
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from enum import Enum
+from typing import assert_never
+
+from .combo import Combination
+from .config import Config, parse_config
+from .key_sets import *
+from .metrics import CACHE_LOOKUPS
+from .players import AliasMappingType
+from .states import *
+
+
+class ChallengePattern(Enum):
+    MIXED_DOUBLE_MIXED = 'mixed-double-mixed'
+    DOUBLE_MIXED_DOUBLE = 'double-mixed-double'
+
+    @property
+    def key_set_options(self, /) -> tuple[tuple[KeySetType, ...], ...]:
+        """
+        Key sets which can be used in every phase of this pattern.
+        """
+        mixed = KSMixed,
+        double = KSDouble1, KSDouble2
+        match self:
+            case ChallengePattern.MIXED_DOUBLE_MIXED:
+                return mixed, double, mixed
+            case ChallengePattern.DOUBLE_MIXED_DOUBLE:
+                return double, mixed, double
+            case unknown:
+                assert_never(unknown)
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class PhasePlan:
+    key_set: KeySetType
+    rooms: StateOfAllRooms
+    statues: StateOfAllStatues
+    aliases: AliasMappingType
+
+    @property
+    def move_count(self, /) -> int:
+        """
+        The total number of moves in solo rooms and dissection.
+        """
+        return len(self.rooms.moves_made) + len(self.statues.moves_made)
+
+    @property
+    def last_position(self, /) -> PositionsType:
+        """
+        Last position touched in this phase.
+        """
+        return self.statues.last_position
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class EncounterPlan:
+    pattern: ChallengePattern
+    phases: tuple[PhasePlan, ...]
+
+    @property
+    def move_count(self, /) -> int:
+        """
+        The total number of moves in all phases.
+        """
+        return sum(p.move_count for p in self.phases)
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class ChallengeConfig:
+    phases: tuple[Config, Config, Config]
+    patterns: tuple[ChallengePattern, ...]
+    is_doing_triumph: bool
+    last_position: PositionsType | None
+
+
+_KEY_SETS = KSMixed, KSDouble1, KSDouble2
+
+
+type _PhaseSolutionsType = dict[PositionsType, tuple[StateOfAllRooms, StateOfAllStatues]]
+
+_phase_solutions: dict[tuple, _PhaseSolutionsType] = {}
+
+
+def _solve_phase(
+        rooms: Combination,
+        statues: Combination,
+        key_set_index: int,
+        is_doing_triumph: bool,
+        last_position: PositionsType | None,
+        /,
+        ) -> _PhaseSolutionsType:
+    """
+    Solves solo rooms and dissection of one phase for every last position
+    the phase can end in and returns solutions by these positions.
+    Every solution has the minimal total number of moves among those ending at its position.
+    Solo rooms are solved for every position they can end in,
+    so the handoff to dissection is chosen by the total number of moves.
+    The result is empty if the phase cannot be solved.
+
+    Solutions are cached, so every phase is solved at most once for every key set
+    and last position. Cached solutions are replayed before use
+    and solved again if any of them turns out to be invalid.
+    """
+    key = rooms, statues, key_set_index, is_doing_triumph, last_position
+    key_set = _KEY_SETS[key_set_index]
+    room_state = rooms.to_room_state(key_set)
+    statue_state = statues.to_statue_state(key_set)
+    solutions = _phase_solutions.get(key)
+    if solutions is not None:
+        try:
+            for rooms_solved, statues_solved in solutions.values():
+                room_state.replay(rooms_solved.moves_made, is_doing_triumph, last_position)
+                statue_state.replay(
+                    statues_solved.moves_made,
+                    is_doing_triumph,
+                    rooms_solved.last_position,
+                    )
+        except InvalidPlanError:
+            pass
+        else:
+            CACHE_LOOKUPS.inc('phases', 'hit')
+            return solutions
+
+    CACHE_LOOKUPS.inc('phases', 'miss')
+    solutions = {}
+    rooms_by_position = room_state.solve_by_last_position(is_doing_triumph, last_position)
+    for handoff, rooms_solved in rooms_by_position.items():
+        statues_by_position = statue_state.solve_by_last_position(is_doing_triumph, handoff)
+        for position, statues_solved in statues_by_position.items():
+            move_count = len(rooms_solved.moves_made) + len(statues_solved.moves_made)
+            current = solutions.get(position)
+            if current is None or move_count < sum(len(s.moves_made) for s in current):
+                solutions[position] = rooms_solved, statues_solved
+
+    _phase_solutions[key] = solutions
+    return solutions
+
+
+def plan_encounter(
+        phases: Sequence[Config],
+        /,
+        patterns: Sequence[ChallengePattern] = tuple(ChallengePattern),
+        *,
+        is_doing_triumph: bool,
+        last_position: PositionsType | None,
+        ) -> EncounterPlan:
+    """
+    Plans all three phases of the challenge together and returns the plan
+    with the minimal total number of moves.
+
+    Phases are chained via the last position touched, so with triumph
+    the choice of a key set in one phase affects the next phases.
+    The best plan is found by dynamic programming over phases
+    where the state is the last position touched after a phase.
+    Every phase is solved for every last position it can end in,
+    so plans which are longer within a phase are kept if they end at a better position.
+    """
+    assert len(phases) == 3, f'challenge must have exactly 3 phases, got {len(phases)}'
+    assert patterns, 'at least one pattern must be provided'
+
+    best: EncounterPlan | None = None
+    for pattern in patterns:
+        # Maps the last position after processed phases
+        # to the minimal number of moves and respective phase plans.
+        layer: dict[PositionsType | None, tuple[int, tuple[PhasePlan, ...]]] = {
+            last_position: (0, ()),
+            }
+        for config, key_sets in zip(phases, pattern.key_set_options):
+            rooms, statues, aliases = config.encounter_data()
+            next_layer = {}
+            for position, (move_count, plans) in layer.items():
+                for key_set in key_sets:
+                    solutions = _solve_phase(
+                        rooms,
+                        statues,
+                        _KEY_SETS.index(key_set),
+                        is_doing_triumph,
+                        position,
+                        )
+                    for rooms_solved, statues_solved in solutions.values():
+                        plan = PhasePlan(
+                            key_set=key_set,
+                            rooms=rooms_solved,
+                            statues=statues_solved,
+                            aliases=aliases,
+                            )
+                        new_count = move_count + plan.move_count
+                        current = next_layer.get(plan.last_position)
+                        if current is None or new_count < current[0]:
+                            next_layer[plan.last_position] = new_count, (*plans, plan)
+
+            layer = next_layer
+
+        if layer:
+            _, plans = min(layer.values(), key=lambda v: v[0])
+            plan = EncounterPlan(pattern=pattern, phases=plans)
+            if best is None or plan.move_count < best.move_count:
+                best = plan
+
+    if best is None:
+        raise ValueError('cannot solve the challenge with any of the provided patterns')
+
+    return best
+
+
+def read_challenge_config(filepath: str, /) -> ChallengeConfig:
+    """
+    Reads challenge configuration file from provided filepath
+    and returns an instance of :class:`ChallengeConfig`.
+    """
+    with open(filepath, 'rb') as f:
+        data = tomllib.load(f)
+
+    return parse_challenge_config(data)
+
+
+def parse_challenge_config(data: Mapping, /) -> ChallengeConfig:
+    """
+    Creates an instance of :class:`ChallengeConfig` from a mapping
+    with the same structure as the challenge configuration file.
+    """
+    pattern = data.get('pattern', '')
+    if pattern == '':
+        patterns = tuple(ChallengePattern)
+    else:
+        assert pattern in ChallengePattern, (
+            f'pattern must be \'\', {ChallengePattern.MIXED_DOUBLE_MIXED.value!r} '
+            f'or {ChallengePattern.DOUBLE_MIXED_DOUBLE.value!r}'
+        )
+        patterns = ChallengePattern(pattern),
+
+    phases_data = data['phase']
+    assert isinstance(phases_data, list) and len(phases_data) == 3, \
+        'challenge must have exactly 3 phases'
+
+    common = {
+        'is_doing_triumph': data.get('is_doing_triumph', False),
+        'last_position':    data.get('last_position', ''),
+        }
+    phases = [parse_config({**phase, **common}) for phase in phases_data]
+    return ChallengeConfig(
+        phases=(phases[0], phases[1], phases[2]),
+        patterns=patterns,
+        is_doing_triumph=phases[0].is_doing_triumph,
+        last_position=phases[0].last_position,
+        )
+
+
+__all__ = (
+    'ChallengePattern',
+    'PhasePlan',
+    'EncounterPlan',
+    'ChallengeConfig',
+    'plan_encounter',
+    'read_challenge_config',
+    'parse_challenge_config',
+    )
@@ -0,0 +1,139 @@
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from .players import AliasMappingType
+from .shapes import Shape2D, Shape3D
+from .states import *
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class CollectStep:
+    position: PositionsType
+    alias: str
+    shape: Shape2D
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class PassStep:
+    position: PositionsType
+    alias: str
+    shape: Shape2D
+    destination: PositionsType
+
+
+type RoomStepType = CollectStep | PassStep
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class RoomsPlan:
+    final_keys: tuple[Shape3D, Shape3D, Shape3D]
+    """
+    3D shapes players get in solo rooms from left to right.
+    """
+    initial_collects: tuple[CollectStep, ...]
+    """
+    Shapes players collect before the first pass.
+    """
+    steps: tuple[RoomStepType, ...]
+    """
+    Passes and collects in the order players must make them.
+    """
+    moves: tuple[PassMove, ...]
+    last_position: PositionsType
+    is_optimal: bool
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class DissectionPlan:
+    final_shapes: tuple[Shape3D, Shape3D, Shape3D]
+    """
+    3D shapes held by statues after dissection from left to right.
+    """
+    moves: tuple[DissectMove, ...]
+    last_position: PositionsType
+    is_optimal: bool
+
+
+def make_rooms_plan(
+        state: StateOfAllRooms,
+        aliases: AliasMappingType,
+        /,
+        is_optimal: bool = True,
+        ) -> RoomsPlan:
+    """
+    Creates a plan for players in solo rooms from solved rooms.
+
+    Every player collects the shape they pass first before the first pass.
+    After every pass, the player collects the next shape they will pass
+    if it is already dropped in their room, otherwise they collect it
+    right after it is passed to them.
+    """
+    destination2collect = defaultdict(deque)
+    departure2collect = defaultdict(deque)
+    for m in state.moves_made:
+        departure2collect[m.departure].appendleft(m.shape)
+
+    initial_collects = tuple(
+        CollectStep(position=position, alias=aliases[position], shape=shapes.pop())
+        for position, shapes in departure2collect.items()
+        )
+
+    steps = []
+    for m, (departure_state, _) in zip(state.moves_made, state.snapshots()):
+        steps.append(
+            PassStep(
+                position=m.departure,
+                alias=aliases[m.departure],
+                shape=m.shape,
+                destination=m.destination,
+                )
+            )
+
+        shapes = departure2collect[m.departure]
+        if shapes:
+            shape = shapes.pop()
+            if shape in departure_state:
+                steps.append(
+                    CollectStep(position=m.departure, alias=aliases[m.departure], shape=shape)
+                    )
+            else:
+                destination2collect[m.departure].appendleft(shape)
+
+        shapes = destination2collect[m.destination]
+        if shapes:
+            shape = shapes.pop()
+            steps.append(
+                CollectStep(position=m.destination, alias=aliases[m.destination], shape=shape)
+                )
+
+    return RoomsPlan(
+        final_keys=(state.left.current_key, state.middle.current_key, state.right.current_key),
+        initial_collects=initial_collects,
+        steps=tuple(steps),
+        moves=state.moves_made,
+        last_position=state.last_position,
+        is_optimal=is_optimal,
+        )
+
+
+def make_dissection_plan(state: StateOfAllStatues, /, is_optimal: bool = True) -> DissectionPlan:
+    """
+    Creates a plan for dissection from solved statues.
+    """
+    return DissectionPlan(
+        final_shapes=(state.left.shape_held, state.middle.shape_held, state.right.shape_held),
+        moves=state.moves_made,
+        last_position=state.last_position,
+        is_optimal=is_optimal,
+        )
+
+
+__all__ = (
+    'CollectStep',
+    'PassStep',
+    'RoomStepType',
+    'RoomsPlan',
+    'DissectionPlan',
+    'make_rooms_plan',
+    'make_dissection_plan',
+    )
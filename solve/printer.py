@@ -1,6 +1,7 @@
-from collections import defaultdict, deque
+from typing import assert_never
 
 from .players import AliasMappingType
+from .plans import *
 from .states import StateOfAllRooms, StateOfAllStatues
 
 
@@ -14,45 +15,39 @@ def print_pass_moves(
     Prints pass moves to the console.
     If ``interactive`` is ``True``, prompts the user before continuing.
     """
-    print('--- FINAL SHAPES FROM LEFT TO RIGHT ---')
-    print(state.left.current_key, state.middle.current_key, state.right.current_key)
+    print_rooms_plan(make_rooms_plan(state, aliases), interactive)
+
 
-    destination2collect = defaultdict(deque)
-    departure2collect = defaultdict(deque)
-    for m in state.moves_made:
-        departure2collect[m.departure].appendleft(m.shape)
+def print_rooms_plan(plan: RoomsPlan, /, interactive: bool) -> None:
+    """
+    Prints steps of the plan for solo rooms to the console.
+    If ``interactive`` is ``True``, prompts the user before continuing.
+    """
+    print('--- FINAL SHAPES FROM LEFT TO RIGHT ---')
+    print(*plan.final_keys)
 
     initial_msg = ', '.join(
-        f'Player {aliases[position]} collects {shapes.pop()}'
-        for position, shapes in departure2collect.items()
+        f'Player {step.alias} collects {step.shape}'
+        for step in plan.initial_collects
         )
 
     print_move = input if interactive else print
     print('--- STEPS IN SOLO ROOMS ---')
     print_move(initial_msg)
-    for m in state.moves_made:
-        print_move(
-            f'Player {aliases[m.departure]}: '
-            f'pass {m.shape} to {m.destination}'
-            )
-
-        shapes = departure2collect[m.departure]
-        if shapes:
-            shape = shapes.pop()
-            if shape in m.departure_state:
-                print_move(f'Player {aliases[m.departure]}: collect {shape}')
-            else:
-                destination2collect[m.departure].appendleft(shape)
-
-        shapes = destination2collect[m.destination]
-        if shapes:
-            print_move(f'Player {aliases[m.destination]}: collect {shapes.pop()}')
+    for step in plan.steps:
+        match step:
+            case PassStep():
+                print_move(f'Player {step.alias}: pass {step.shape} to {step.destination}')
+            case CollectStep():
+                print_move(f'Player {step.alias}: collect {step.shape}')
+            case unknown:
+                assert_never(unknown)
 
     print(
         '--- SOLO ROOMS ARE DONE ---\n'
         'All player in the solo rooms must collect two shapes and wait\n'
         '--- LAST POSITION ---\n'
-        f'{state.last_position}'
+        f'{plan.last_position}'
         )
 
 
@@ -61,20 +56,28 @@ def print_dissect_moves(state: StateOfAllStatues, /, interactive: bool) -> None:
     Prints dissect moves to the console.
     If ``interactive`` is ``True``, prompts the user before continuing.
     """
+    print_dissection_plan(make_dissection_plan(state), interactive)
+
+
+def print_dissection_plan(plan: DissectionPlan, /, interactive: bool) -> None:
+    """
+    Prints steps of the plan for dissection to the console.
+    If ``interactive`` is ``True``, prompts the user before continuing.
+    """
     print('--- FINAL SHAPES FROM LEFT TO RIGHT ---')
-    print(state.left.shape_held, state.middle.shape_held, state.right.shape_held)
+    print(*plan.final_shapes)
 
     print_move = input if interactive else print
     print('--- STEPS FOR DISSECTION ---')
-    for m in state.moves_made:
+    for m in plan.moves:
         print_move(f'Dissect {m.shape} from {m.destination}')
 
     print(
         '--- DISSECTION IS DONE ---\n'
         'All players in the solo rooms must leave them\n'
         '--- LAST POSITION ---\n'
-        f'{state.last_position}'
+        f'{plan.last_position}'
         )
 
 
-__all__ = 'print_pass_moves', 'print_dissect_moves'
+__all__ = 'print_pass_moves', 'print_rooms_plan', 'print_dissect_moves', 'print_dissection_plan'
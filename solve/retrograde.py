@@ -0,0 +1,104 @@
+from .database import StateSpaceDatabase
+from .states import *
+
+
+def distance_to_goal[T: StateWithAllPositions](
+        database: StateSpaceDatabase,
+        state: T,
+        /,
+        is_doing_triumph: bool,
+        last_position_touched: str | None,
+        ) -> int | None:
+    """
+    Returns the minimal number of cycles required to finish the given state
+    or ``None`` if it cannot be finished.
+    Distances are precomputed in the database by a backward search from all done states,
+    so this function requires no search.
+    If the state has moves made, its last position is used instead of ``last_position_touched``.
+    """
+    section = database.section(type(state))
+    node_id = section.find(state)
+    if node_id is None:
+        raise ValueError(f'state {state} is not present in the database')
+
+    last_position = state.last_position if state.moves_made else last_position_touched
+    return section.distance(node_id, is_doing_triumph, last_position)
+
+
+def next_best_state[T: StateWithAllPositions](
+        database: StateSpaceDatabase,
+        state: T,
+        /,
+        is_doing_triumph: bool,
+        last_position_touched: str | None,
+        ) -> T | None:
+    """
+    Returns the next state after an optimal cycle of moves from the given state
+    or ``None`` if the given state is already done.
+    Raises :class:`ValueError` if the given state cannot be finished.
+    """
+    distance = distance_to_goal(database, state, is_doing_triumph, last_position_touched)
+    if distance is None:
+        raise ValueError(f'cannot solve encounter with initial {state}')
+
+    if distance == 0:
+        return None
+
+    check_first_position = is_doing_triumph and last_position_touched and not state.moves_made
+    for next_state in state.next_states(is_doing_triumph):
+        if check_first_position and last_position_touched == next_state.first_position: continue
+
+        if distance_to_goal(database, next_state, is_doing_triumph, None) == distance - 1:
+            return next_state
+
+    raise ValueError(f'database does not match transitions of {state}')
+
+
+def next_best_moves[T: StateWithAllPositions](
+        database: StateSpaceDatabase,
+        state: T,
+        /,
+        is_doing_triumph: bool,
+        last_position_touched: str | None,
+        ) -> tuple[PMove, ...]:
+    """
+    Returns moves of an optimal cycle from the given state.
+    This is a single :class:`PassMove` for rooms and a pair of :class:`DissectMove` for statues.
+    The result is empty if the given state is already done.
+    """
+    next_state = next_best_state(database, state, is_doing_triumph, last_position_touched)
+    if next_state is None:
+        return ()
+
+    return next_state.moves_made[len(state.moves_made):]
+
+
+def solve_by_table[T: StateWithAllPositions](
+        database: StateSpaceDatabase,
+        state: T,
+        /,
+        is_doing_triumph: bool,
+        last_position_touched: str | None,
+        ) -> T:
+    """
+    Makes optimal moves starting from the given state until it is done,
+    then returns that done state.
+    Works like :meth:`StateWithAllPositions.solve`, but requires no search.
+    """
+    while (next_state := next_best_state(
+            database,
+            state,
+            is_doing_triumph,
+            last_position_touched,
+            )) is not None:
+        state = next_state
+
+    return state
+
+
+__all__ = (
+    'distance_to_goal',
+    'next_best_state',
+    'next_best_moves',
+    'solve_by_table',
+    )
@@ -0,0 +1,236 @@
+from collections.abc import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Self
+
+from .api import EncounterSolution
+from .config import Config, PartialConfig
+from .engines import SearchStats, get_engine
+from .key_sets import KeySetType
+from .metrics import submit_with_metrics
+from .plans import *
+from .states import *
+
+type _FieldValueType = Any
+type _FutureType = Future[tuple[SearchResult, SearchStats]]
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class Decision:
+    field: str
+    """
+    Name of the config field whose callout resolves this ambiguity,
+    e.g., ``'inner_shapes'``, ``'player2'`` or ``'held_shapes'``.
+    """
+    branches: dict[_FieldValueType, 'Decision | EncounterSolution']
+    """
+    Maps every possible value of the field to the next decision or to the solution.
+    """
+
+    @property
+    def fields(self, /) -> tuple[str, ...]:
+        """
+        Names of all fields whose callouts can still change the solution
+        in the order they are called out.
+        """
+        fields = {self.field: None}
+        for branch in self.branches.values():
+            if isinstance(branch, Decision):
+                fields.update(dict.fromkeys(branch.fields))
+
+        return tuple(fields)
+
+    @property
+    def solution_count(self, /) -> int:
+        """
+        The number of distinct solutions in this tree.
+        """
+        solutions = []
+        stack: list[Decision | EncounterSolution] = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Decision):
+                stack.extend(node.branches.values())
+            elif node not in solutions:
+                solutions.append(node)
+
+        return len(solutions)
+
+
+def _field_value(config: Config, field: str, /) -> _FieldValueType:
+    if field.startswith('player'):
+        player = config.players[int(field.removeprefix('player')) - 1]
+        return player.their_shape, player.other_shape
+
+    return getattr(config, field)
+
+
+def _build_decision(
+        solutions: list[tuple[Config, EncounterSolution]],
+        fields: tuple[str, ...],
+        /,
+        ) -> Decision | EncounterSolution:
+    first = solutions[0][1]
+    if all(solution == first for _, solution in solutions):
+        return first
+
+    for i, field in enumerate(fields):
+        groups: dict[_FieldValueType, list[tuple[Config, EncounterSolution]]] = {}
+        for config, solution in solutions:
+            groups.setdefault(_field_value(config, field), []).append((config, solution))
+
+        if len(groups) > 1:
+            return Decision(
+                field=field,
+                branches={
+                    value: _build_decision(group, fields[i + 1:])
+                    for value, group in groups.items()
+                    },
+                )
+
+    raise AssertionError('solutions differ, but all fields are known')
+
+
+class Speculator:
+    """
+    Solves all encounters consistent with a partial config in background processes,
+    so the solution is ready by the time the last callout is made.
+
+    Solo rooms are solved once for every combination and key set,
+    dissection is solved for every combination, key set and possible last position.
+    """
+    __slots__ = '_executor', '_do_rooms', '_do_dissect', '_rooms', '_statues'
+
+    def __init__(self, /, do_rooms: bool, do_dissect: bool, *, workers: int = 1) -> None:
+        assert do_rooms or do_dissect, 'at least one encounter part must be requested'
+        self._executor = ProcessPoolExecutor(workers)
+        self._do_rooms = do_rooms
+        self._do_dissect = do_dissect
+        # Searches are keyed by binary representations of initial states.
+        self._rooms: dict[bytes, _FutureType] = {}
+        self._statues: dict[tuple[bytes, PositionsType | None], _FutureType] = {}
+
+    def __enter__(self, /) -> Self:
+        return self
+
+    def __exit__(self, /, *args) -> None:
+        self.close()
+
+    def close(self, /) -> None:
+        """
+        Cancels pending searches and stops background processes.
+        """
+        self._executor.shutdown(cancel_futures=True)
+
+    def _handoff_positions(self, config: Config, /) -> Iterable[PositionsType | None]:
+        """
+        Returns possible positions touched last before dissection.
+        """
+        if not config.is_doing_triumph:
+            return None,
+
+        if self._do_rooms:
+            return ALL_POSITIONS
+
+        return config.last_position,
+
+    def submit(self, partial: PartialConfig, /) -> int:
+        """
+        Starts solving all encounters consistent with the partial config
+        which are not being solved yet.
+        Returns the number of consistent encounters.
+        """
+        count = 0
+        for config in partial.completions():
+            count += 1
+            engine = get_engine(config.engine)
+            room_state, statue_state, _ = self._initial_states(config)
+            if self._do_rooms:
+                key = room_state.to_bytes()
+                if key not in self._rooms:
+                    self._rooms[key] = submit_with_metrics(
+                        self._executor,
+                        engine.search,
+                        room_state,
+                        config.is_doing_triumph,
+                        config.last_position,
+                        )
+
+            if self._do_dissect:
+                for position in self._handoff_positions(config):
+                    key = statue_state.to_bytes(), position
+                    if key in self._statues: continue
+
+                    # Handoffs which cannot be solved fail only when requested.
+                    self._statues[key] = submit_with_metrics(
+                        self._executor,
+                        engine.search,
+                        statue_state,
+                        config.is_doing_triumph,
+                        position,
+                        )
+
+        return count
+
+    def _initial_states(
+            self,
+            config: Config,
+            /,
+            ) -> tuple[StateOfAllRooms, StateOfAllStatues, KeySetType]:
+        rooms, statues, _ = config.encounter_data()
+        key_set = config.key_set(
+            rooms=rooms if self._do_rooms else None,
+            statues=statues if self._do_dissect else None,
+            )
+        return rooms.to_room_state(key_set), statues.to_statue_state(key_set), key_set
+
+    def is_ready(self, partial: PartialConfig, /) -> bool:
+        """
+        Whether all encounters consistent with the partial config are solved.
+        """
+        return all(future.done() for future in self._futures(partial))
+
+    def _futures(self, partial: PartialConfig, /) -> Iterable[_FutureType]:
+        for config in partial.completions():
+            room_state, statue_state, _ = self._initial_states(config)
+            if self._do_rooms:
+                yield self._rooms[room_state.to_bytes()]
+
+            if self._do_dissect:
+                for position in self._handoff_positions(config):
+                    yield self._statues[statue_state.to_bytes(), position]
+
+    def solution(self, config: Config, /) -> EncounterSolution:
+        """
+        Returns the solution of the encounter waiting until it is solved.
+        The encounter must be consistent with a partial config submitted earlier.
+        """
+        _, _, aliases = config.encounter_data()
+        room_state, statue_state, key_set = self._initial_states(config)
+        last_position = config.last_position
+        rooms_plan = None
+        if self._do_rooms:
+            result, _ = self._rooms[room_state.to_bytes()].result()
+            rooms_plan = make_rooms_plan(result.state, aliases, result.is_optimal)
+            last_position = rooms_plan.last_position
+
+        dissection_plan = None
+        if self._do_dissect:
+            position = last_position if config.is_doing_triumph else None
+            result, _ = self._statues[statue_state.to_bytes(), position].result()
+            dissection_plan = make_dissection_plan(result.state, result.is_optimal)
+
+        return EncounterSolution(key_set=key_set, rooms=rooms_plan, dissection=dissection_plan)
+
+    def decision_tree(self, partial: PartialConfig, /) -> Decision | EncounterSolution:
+        """
+        Returns the tree of callouts which are still required to choose the solution,
+        waiting until all consistent encounters are solved.
+        Callouts are checked in the order they are made,
+        callouts which do not change the solution are skipped.
+        """
+        solutions = [(config, self.solution(config)) for config in partial.completions()]
+        return _build_decision(solutions, partial.missing_fields)
+
+
+__all__ = 'Decision', 'Speculator'
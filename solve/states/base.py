@@ -1,6 +1,15 @@
-from collections.abc import Iterator
+import multiprocessing
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass
+from heapq import nsmallest
 from inspect import signature
-from typing import Literal, Protocol, Self, TypeGuard
+from itertools import permutations
+from operator import attrgetter
+from threading import Event
+from time import monotonic
+from typing import Any, Literal, Protocol, Self, TypeGuard
 
 from ..multiset import Multiset
 from ..shapes import Shape2D
@@ -13,6 +22,16 @@ type PositionsType = Literal['left', 'middle', 'right']
 ALL_POSITIONS = {LEFT: None, MIDDLE: None, RIGHT: None}
 _POSITIONS_MSG = f'{LEFT!r}, {MIDDLE!r} or {RIGHT!r}'
 
+POSITION_ORDERS = tuple(
+    (*order, (order.index(0), order.index(1), order.index(2)))
+    for order in permutations(range(3))
+    )
+"""
+All orders of position indexes.
+Each order is followed by the inverse order
+which places states in order ``(i1, i2, i3)`` back to left, middle and right.
+"""
+
 
 def is_position(s: str, /) -> TypeGuard[PositionsType]:
     """
@@ -39,7 +58,7 @@ class State:
     """
     Base class for any state.
     """
-    __slots__ = 'position', 'own_shape', 'shapes_to_receive'
+    __slots__ = 'position', 'own_shape', 'shapes_to_receive', 'is_done', 'remaining_shapes', '_key'
 
     def __init_subclass__(cls, /) -> None:
         cls.__all_slots__ = slots = frozenset(
@@ -79,18 +98,28 @@ class State:
         self.position = position
         self.own_shape = own_shape
         self.shapes_to_receive = shapes_to_receive
+        # Derived fields are computed once, subclasses must set is_done.
+        self.remaining_shapes = shapes_to_receive.total
+        self._key = None
 
     @property
-    def is_done(self, /) -> bool:
+    def shapes_available(self, /) -> Multiset[Shape2D]:
         """
-        Whether this state is done.
+        The multiset of shapes which are present in this state.
         """
         raise NotImplementedError
 
     @property
-    def shapes_available(self, /) -> Multiset[Shape2D]:
+    def missing_shapes(self, /) -> int:
         """
-        The multiset of shapes which are present in this state.
+        The number of shapes which must be present in this state to be done, but they are not.
+        """
+        raise NotImplementedError
+
+    @property
+    def final_shapes(self, /) -> Multiset[Shape2D]:
+        """
+        The multiset of shapes which must be present in this state to be done.
         """
         raise NotImplementedError
 
@@ -103,6 +132,25 @@ class State:
         """
         return shape in self.shapes_to_receive
 
+    def to_bytes(self, /) -> bytes:
+        """
+        Returns bytes representing this state except its position.
+        """
+        raise NotImplementedError
+
+    @property
+    def key(self, /) -> tuple[PositionsType, bytes]:
+        """
+        The position and the binary representation of this state.
+        States with equal keys are interchangeable.
+        The key is computed once, and its hash is cached.
+        """
+        key = self._key
+        if key is None:
+            key = self._key = self.position, self.to_bytes()
+
+        return key
+
     def __repr__(self, /) -> str:
         positional = ', '.join(f'{getattr(self, attr)!r}' for attr in self.__positional_slots__)
         keyword = ', '.join(f'{attr}={getattr(self, attr)!r}' for attr in self.__keyword_slots__)
@@ -110,6 +158,177 @@ class State:
         return f'{self.__class__.__name__}({args})'
 
 
+class TransitionTable[S: State, T]:
+    """
+    A table of transitions between pairs of position states.
+
+    States are interned, i.e., only one instance of equal states is used,
+    so the table is keyed by identity of states and lookup costs nothing beyond hashing a tuple.
+    Rows for a pair of states are built on the first lookup and reused afterward.
+    """
+    __slots__ = '_build', '_states', '_rows', 'lookups', 'misses'
+
+    def __init__(self, build: Callable[[S, S], Iterable[T]], /) -> None:
+        """
+        :param build: A function which receives interned pair of states
+          and yields rows of transitions between them.
+          All states in rows must be interned via :meth:`intern`.
+        """
+        self._build = build
+        self._states: dict[tuple, S] = {}
+        self._rows: dict[tuple[S, S], tuple[T, ...]] = {}
+        self.lookups = 0
+        """
+        The number of lookups of rows in this process.
+        """
+        self.misses = 0
+        """
+        The number of lookups which built rows.
+        """
+
+    def intern(self, state: S, /) -> S:
+        """
+        Returns the interned instance of the given state.
+        """
+        return self._states.setdefault(state.key, state)
+
+    def get(self, key: tuple, /) -> S | None:
+        """
+        Returns the interned state with the given key or ``None`` if there is no such state.
+        """
+        return self._states.get(key)
+
+    def __getitem__(self, pair: tuple[S, S], /) -> tuple[T, ...]:
+        self.lookups += 1
+        rows = self._rows.get(pair)
+        if rows is None:
+            # States may be not interned, if they are created outside transition tables.
+            s1, s2 = pair
+            pair = s1, s2 = self.intern(s1), self.intern(s2)
+            rows = self._rows.get(pair)
+            if rows is None:
+                self.misses += 1
+                rows = self._rows[pair] = tuple(self._build(s1, s2))
+
+        return rows
+
+    def __len__(self, /) -> int:
+        return len(self._rows)
+
+
+class SearchCancelled(Exception):
+    """
+    Raised when a search is cancelled via :class:`CancellationToken`.
+    """
+
+
+class InvalidPlanError(ValueError):
+    """
+    Raised when replayed moves are not legal or do not finish the encounter.
+    """
+
+
+class TruncatedSearchError(ValueError):
+    """
+    Raised when a search with limited frontier finds no done state.
+    Dropped states might lead to one, so the search may succeed with a larger frontier.
+    """
+
+
+class InfeasibleStateError(ValueError):
+    """
+    Raised when a state is rejected without searching,
+    see :meth:`StateWithAllPositions.infeasibility_reason`.
+    """
+
+
+class CancellationToken:
+    """
+    A token to cancel searches from any thread.
+    """
+    __slots__ = '_event',
+
+    def __init__(self, /) -> None:
+        self._event = Event()
+
+    @property
+    def is_cancelled(self, /) -> bool:
+        """
+        Whether this token is cancelled.
+        """
+        return self._event.is_set()
+
+    def cancel(self, /) -> None:
+        """
+        Cancels all searches which use this token.
+        """
+        self._event.set()
+
+
+ANYTIME_MAX_FRONTIER = 300
+"""
+The maximum number of states kept in the quick search made before a search with deadline.
+The quick search ignores the deadline, so this value bounds its time.
+"""
+
+
+PARALLEL_MIN_FRONTIER = 2000
+"""
+The minimum number of states in a cycle to expand them in worker processes.
+Smaller cycles are expanded in the main process, because sending states costs more.
+"""
+
+_SHARDS_PER_WORKER = 4
+_POLL_INTERVAL = 0.1
+
+_stop_expansion: Any = None
+
+
+def _init_expansion_worker(stop_event: Any, /) -> None:
+    global _stop_expansion
+    _stop_expansion = stop_event
+
+
+def _expand_shard(states: list['StateWithAllPositions'], is_doing_triumph: bool, /) -> list:
+    """
+    Expands a shard of states in a worker process dropping duplicates.
+    If a done state is found, returns only it and tells other workers to stop.
+    """
+    unique_states = {}
+    for state in states:
+        if _stop_expansion.is_set(): return []
+
+        for next_state in state.next_states(is_doing_triumph):
+            if next_state.is_done:
+                _stop_expansion.set()
+                return [next_state]
+
+            unique_states.setdefault(next_state.frontier_key(is_doing_triumph), next_state)
+
+    return list(unique_states.values())
+
+
+ALL_VARIANTS = (False, None), (True, LEFT), (True, MIDDLE), (True, RIGHT)
+"""
+Pairs of ``is_doing_triumph`` and ``last_position_touched`` which are solved by default
+in :meth:`StateWithAllPositions.solve_variants`.
+"""
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class SearchResult[T]:
+    state: T
+    is_optimal: bool
+    """
+    Whether the state is proven to be solved with the minimal number of moves.
+    It is ``False`` if some states were dropped during search to limit the frontier.
+    """
+    expanded: int = 0
+    """
+    The number of states whose next states were generated during the search.
+    """
+
+
 class StateWithAllPositions[S: State, M: PMove]:
     """
     Base class for holding states of positions and moves made.
@@ -121,6 +340,23 @@ class StateWithAllPositions[S: State, M: PMove]:
     The maximum number of cycles to solve states of this type.
     """
 
+    transition_table: TransitionTable[S, Any]
+    """
+    The table of transitions between states of positions used by :meth:`next_states`.
+    """
+
+    max_shapes_per_cycle: int
+    """
+    The maximum number of required shapes which can be received in one cycle.
+    """
+
+    moves_per_cycle: int
+    """
+    The number of moves made in one cycle.
+    """
+
+    _solvable_initial_keys: frozenset[tuple] | None = None
+
     def __init__(self, /, left: S, middle: S, right: S, moves_made: tuple[M, ...] = ()) -> None:
         self.left = left
         self.middle = middle
@@ -168,11 +404,378 @@ class StateWithAllPositions[S: State, M: PMove]:
         """
         raise NotImplementedError
 
+    @property
+    def remaining_shapes(self, /) -> int:
+        """
+        The total number of shapes which states in all positions must receive.
+        """
+        return self.left.remaining_shapes + self.middle.remaining_shapes + self.right.remaining_shapes
+
+    @property
+    def rank(self, /) -> tuple[int, int]:
+        """
+        Estimation of how far this state is from being done; lower is closer.
+        States are compared by the remaining number of shapes to receive at first,
+        then by the number of shapes missing in all positions.
+        """
+        missing_shapes = (
+            self.left.missing_shapes
+            + self.middle.missing_shapes
+            + self.right.missing_shapes
+        )
+        return self.remaining_shapes, missing_shapes
+
+    def apply_cycle(self, moves: Sequence[M], /) -> Self:
+        """
+        Makes moves of one cycle and returns the new state.
+        Raises :class:`InvalidPlanError` if the moves are not legal in this state.
+        """
+        raise NotImplementedError
+
+    def replay(
+            self,
+            moves: Sequence[M],
+            /,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            ) -> Self:
+        """
+        Makes the given moves starting from this state without any search
+        and returns the final state.
+
+        Raises :class:`InvalidPlanError` if any move is not legal,
+        if any cycle starts at the position touched last while doing triumph
+        or if the final state is not done.
+        """
+        n = self.moves_per_cycle
+        if len(moves) % n:
+            raise InvalidPlanError(f'the number of moves must be a multiple of {n}, got {len(moves)}')
+
+        last_position = self.last_position if self.moves_made else last_position_touched
+        state = self
+        for i in range(0, len(moves), n):
+            cycle = moves[i:i + n]
+            if is_doing_triumph and last_position == cycle[0].destination:
+                raise InvalidPlanError(
+                    f'cycle {i // n + 1} starts at {last_position}, '
+                    f'which was touched last'
+                    )
+
+            state = state.apply_cycle(cycle)
+            last_position = cycle[-1].destination
+
+        if not state.is_done:
+            raise InvalidPlanError(f'moves do not finish the encounter, the final state is {state}')
+
+        return state
+
+    def frontier_key(self, /, is_doing_triumph: bool) -> tuple:
+        """
+        Returns a key which is equal for states with the same future.
+        Such states have the same states in all positions
+        and the same last position if ``is_doing_triumph`` is ``True``.
+        """
+        key = self.left.key, self.middle.key, self.right.key
+        if is_doing_triumph and self.moves_made:
+            key += self.last_position,
+
+        return key
+
+    @classmethod
+    def initial_states(cls, /) -> Iterator[Self]:
+        """
+        Yields initial states for all valid combinations and key sets.
+        """
+        raise NotImplementedError
+
+    def infeasibility_reason(self, /) -> str | None:
+        """
+        Returns the reason why this state cannot be solved
+        or ``None`` if it may be solved.
+
+        All valid initial states are known to be solvable with and without triumph
+        for any last position. Other states are checked against invariants of moves:
+        moves only rearrange shapes between positions,
+        and every cycle gives at most :attr:`max_shapes_per_cycle` required shapes.
+        """
+        cls = self.__class__
+        if not self.moves_made:
+            solvable_keys = cls.__dict__.get('_solvable_initial_keys')
+            if solvable_keys is None:
+                solvable_keys = cls._solvable_initial_keys = frozenset(
+                    s.frontier_key(False)
+                    for s in cls.initial_states()
+                    )
+
+            if self.frontier_key(False) in solvable_keys:
+                return None
+
+        states = self.left, self.middle, self.right
+        available = sum((s.shapes_available for s in states), Multiset())
+        final = sum((s.final_shapes for s in states), Multiset())
+        if available != final:
+            return f'shapes {available} cannot be rearranged into required shapes {final}'
+
+        min_cycles = -(-self.remaining_shapes // self.max_shapes_per_cycle)
+        if min_cycles > self.max_cycles:
+            return (
+                f'{self.remaining_shapes} shapes must be received, '
+                f'which requires at least {min_cycles} cycles '
+                f'while at most {self.max_cycles} cycles are allowed'
+            )
+
+        return None
+
     def solve(self, /, is_doing_triumph: bool, last_position_touched: str | None) -> Self:
         """
         Makes moves starting from this state until one of the next states is done,
         then returns that done state.
         """
+        return self.search(is_doing_triumph, last_position_touched).state
+
+    def solve_by_last_position(
+            self,
+            /,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            ) -> dict[PositionsType, Self]:
+        """
+        Returns done states with the minimal number of moves among those
+        which end at the same last position, by these positions.
+        Positions which cannot be last are absent, so the result is empty
+        if this state cannot be solved.
+
+        Unlike :meth:`solve`, the search continues after the first done state
+        until done states for all positions are found or :attr:`max_cycles` cycles are made.
+        Done states are not expanded.
+        """
+        if self.infeasibility_reason() is not None:
+            return {}
+
+        check_first_position = is_doing_triumph and last_position_touched
+        states = [self]
+        results = {}
+        for cycle in range(self.max_cycles):
+            unique_states = {}
+            for state in states:
+                for next_state in state.next_states(is_doing_triumph):
+                    if cycle == 0 and check_first_position \
+                            and last_position_touched == next_state.first_position:
+                        continue
+
+                    if next_state.is_done:
+                        results.setdefault(next_state.last_position, next_state)
+                    else:
+                        # Keys include the last position even without triumph,
+                        # otherwise states ending at other positions would be dropped.
+                        unique_states.setdefault(next_state.frontier_key(True), next_state)
+
+            if len(results) == len(ALL_POSITIONS):
+                break
+
+            states = list(unique_states.values())
+
+        return results
+
+    def solve_variants(
+            self,
+            variants: Iterable[tuple[bool, str | None]] = ALL_VARIANTS,
+            /,
+            ) -> dict[tuple[bool, str | None], Self]:
+        """
+        Solves this state for every pair of ``is_doing_triumph`` and ``last_position_touched``
+        in one search and returns done states by these pairs.
+        Every done state is found with the minimal number of moves.
+        Variants with triumph share all states except those after the first cycle.
+        Raises :class:`ValueError` if any variant cannot be solved.
+        """
+        return self.solve_many({
+            variant: (self, *variant)
+            for variant in variants
+            })
+
+    @classmethod
+    def solve_many[K](cls, problems: Mapping[K, tuple[Self, bool, str | None]], /) -> dict[K, Self]:
+        """
+        Solves several problems in one breadth-first search and returns done states by their keys.
+        Every problem is an initial state, ``is_doing_triumph`` and ``last_position_touched``.
+        Every done state is found with the minimal number of moves.
+
+        Every state in the search is tagged with the problems whose rules
+        the moves leading to it follow. States with the same future are expanded once
+        for all their problems, and a problem stops being expanded once it is solved.
+        Raises :class:`ValueError` if any problem cannot be solved.
+        """
+        # Maps frontier keys to states with these keys by problems.
+        # Problems with and without triumph have different moves, so their keys differ.
+        frontier: dict[tuple, dict[K, Self]] = {}
+        first_states = {}
+        for problem, (state, is_doing_triumph, position) in problems.items():
+            next_states = first_states.get((id(state), is_doing_triumph))
+            if next_states is None:
+                next_states = first_states[id(state), is_doing_triumph] = \
+                    list(state.next_states(is_doing_triumph))
+
+            for next_state in next_states:
+                if is_doing_triumph and position and position == next_state.first_position:
+                    continue
+
+                key = is_doing_triumph, next_state.frontier_key(is_doing_triumph)
+                frontier.setdefault(key, {}).setdefault(problem, next_state)
+
+        results = {}
+        for _ in range(cls.max_cycles - 1):
+            next_frontier = {}
+            for (is_doing_triumph, _), problem_states in frontier.items():
+                representative = next(iter(problem_states.values()))
+                moves_before = len(representative.moves_made)
+                for next_state in representative.next_states(is_doing_triumph):
+                    key = is_doing_triumph, next_state.frontier_key(is_doing_triumph)
+                    new_moves = next_state.moves_made[moves_before:]
+                    for problem, state in problem_states.items():
+                        if state is representative:
+                            child = next_state
+                        else:
+                            child = cls(
+                                next_state.left,
+                                next_state.middle,
+                                next_state.right,
+                                (*state.moves_made, *new_moves),
+                                )
+
+                        if child.is_done:
+                            results.setdefault(problem, child)
+                        else:
+                            next_frontier.setdefault(key, {}).setdefault(problem, child)
+
+            # Solutions found on this cycle are optimal for their problems,
+            # so solved problems are not expanded anymore.
+            if len(results) == len(problems):
+                return {problem: results[problem] for problem in problems}
+
+            frontier = {}
+            for key, problem_states in next_frontier.items():
+                problem_states = {
+                    problem: state
+                    for problem, state in problem_states.items()
+                    if problem not in results
+                    }
+                if problem_states:
+                    frontier[key] = problem_states
+
+        unsolved = ', '.join(
+            f'{state} {is_doing_triumph, position}'
+            for problem, (state, is_doing_triumph, position) in problems.items()
+            if problem not in results
+            )
+        raise ValueError(f'cannot solve encounters within {cls.max_cycles} cycles: {unsolved}')
+
+    def search(
+            self,
+            /,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            *,
+            max_frontier: int | None = None,
+            deadline: float | None = None,
+            cancellation: CancellationToken | None = None,
+            workers: int = 1,
+            ) -> SearchResult[Self]:
+        """
+        Makes moves starting from this state until one of the next states is done,
+        then returns that done state.
+
+        If ``max_frontier`` is specified, at most this number of states is kept for every cycle.
+        States with the lowest number of remaining shapes are preferred.
+        In such case the result is not necessarily optimal, see :attr:`SearchResult.is_optimal`,
+        and :class:`TruncatedSearchError` is raised if dropped states were required to finish.
+
+        If ``deadline`` is specified, the search stops when :func:`time.monotonic`
+        reaches this value. In such case a quick search with limited frontier is done first
+        regardless of the deadline, since the limited frontier bounds its time,
+        and its result is returned if the complete search does not finish in time.
+        Raises :class:`TimeoutError` if there is no result at the deadline.
+
+        If ``cancellation`` is specified, the search stops as soon as the token is cancelled
+        raising :class:`SearchCancelled`.
+
+        Raises :class:`ValueError` without searching
+        if :meth:`infeasibility_reason` tells that this state cannot be solved.
+
+        If ``workers`` is greater than 1, duplicate states are dropped on every cycle
+        and every large cycle is split into shards
+        which are expanded in this number of processes and merged before the next cycle.
+        Processes are started only when the first large cycle is reached.
+        Workers stop as soon as any of them finds a done state.
+        """
+        assert max_frontier is None or max_frontier > 0, \
+            f'max_frontier must be a positive integer, got {max_frontier!r}'
+        assert workers > 0, f'workers must be a positive integer, got {workers!r}'
+
+        reason = self.infeasibility_reason()
+        if reason is not None:
+            raise InfeasibleStateError(f'cannot solve encounter with initial {self}: {reason}')
+
+        if deadline is None or max_frontier is not None:
+            return self._search(
+                is_doing_triumph,
+                last_position_touched,
+                max_frontier,
+                deadline,
+                cancellation,
+                workers,
+                )
+
+        try:
+            quick_result = self._search(
+                is_doing_triumph,
+                last_position_touched,
+                ANYTIME_MAX_FRONTIER,
+                None,
+                cancellation,
+                workers,
+                )
+        except TruncatedSearchError:
+            # Limited search can fail even if the complete one succeeds.
+            quick_result = None
+        else:
+            if quick_result.is_optimal:
+                return quick_result
+
+        try:
+            result = self._search(
+                is_doing_triumph,
+                last_position_touched,
+                None,
+                deadline,
+                cancellation,
+                workers,
+                )
+        except TimeoutError:
+            if quick_result is None:
+                raise
+
+            return quick_result
+
+        if quick_result is None:
+            return result
+
+        return SearchResult(
+            state=result.state,
+            is_optimal=result.is_optimal,
+            expanded=result.expanded + quick_result.expanded,
+            )
+
+    def _search(
+            self,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            max_frontier: int | None,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            workers: int,
+            /,
+            ) -> SearchResult[Self]:
         # region First cycle
         if is_doing_triumph and last_position_touched:
             states = [
@@ -185,21 +788,143 @@ class StateWithAllPositions[S: State, M: PMove]:
 
         # endregion
 
-        for _ in range(self.max_cycles - 1):
-            states = [
-                next_state
-                for state in states
-                for next_state in state.next_states(is_doing_triumph)
-                ]
-            for state in states:
-                if state.is_done:
-                    return state
-        else:
-            raise ValueError(
+        with ExitStack() as stack:
+            executor = stop_expansion = None
+            is_optimal = True
+            expanded = 1
+            for _ in range(self.max_cycles - 1):
+                # Parallel search drops duplicates on every cycle like engine dedup-bfs,
+                # so the states expanded do not depend on the number of workers.
+                if workers > 1 or (max_frontier is not None and len(states) > max_frontier):
+                    # States with the same positions are interchangeable,
+                    # so drop duplicates before dropping anything useful.
+                    unique_states = {}
+                    for state in states:
+                        unique_states.setdefault(state.frontier_key(is_doing_triumph), state)
+
+                    states = list(unique_states.values())
+
+                if max_frontier is not None and len(states) > max_frontier:
+                    is_optimal = False
+                    states = nsmallest(max_frontier, states, key=attrgetter('rank'))
+
+                expanded += len(states)
+                if workers > 1 and len(states) >= PARALLEL_MIN_FRONTIER:
+                    if executor is None:
+                        # Workers are started only once a cycle is large enough,
+                        # since starting them costs more than small searches, e.g., of dissection.
+                        stop_expansion = multiprocessing.Event()
+                        executor = stack.enter_context(ProcessPoolExecutor(
+                            workers,
+                            initializer=_init_expansion_worker,
+                            initargs=(stop_expansion,),
+                            ))
+
+                    states = self._expand_in_parallel(
+                        executor,
+                        workers,
+                        stop_expansion,
+                        states,
+                        is_doing_triumph,
+                        deadline,
+                        cancellation,
+                        )
+                elif deadline is None and cancellation is None:
+                    states = [
+                        next_state
+                        for state in states
+                        for next_state in state.next_states(is_doing_triumph)
+                        ]
+                else:
+                    next_states = []
+                    for state in states:
+                        if cancellation is not None and cancellation.is_cancelled:
+                            raise SearchCancelled(f'search from initial {self} is cancelled')
+
+                        if deadline is not None and monotonic() >= deadline:
+                            raise TimeoutError(f'search from initial {self} reached the deadline')
+
+                        next_states.extend(state.next_states(is_doing_triumph))
+
+                    states = next_states
+
+                for state in states:
+                    if state.is_done:
+                        return SearchResult(state=state, is_optimal=is_optimal, expanded=expanded)
+
+        if not is_optimal:
+            raise TruncatedSearchError(
                 f'cannot solve encounter with initial {self} '
-                f'within {self.max_cycles} cycles'
+                f'within {self.max_cycles} cycles keeping at most {max_frontier} states'
                 )
 
+        raise ValueError(
+            f'cannot solve encounter with initial {self} '
+            f'within {self.max_cycles} cycles'
+            )
+
+    def _expand_in_parallel(
+            self,
+            executor: Executor,
+            workers: int,
+            stop_expansion: Any,
+            states: list[Self],
+            is_doing_triumph: bool,
+            deadline: float | None,
+            cancellation: CancellationToken | None,
+            /,
+            ) -> list[Self]:
+        """
+        Expands states in worker processes and concatenates results.
+        Duplicates are dropped only within every shard,
+        duplicates among shards are dropped on the next cycle.
+        If a done state is found, returns only it.
+        """
+        shard_size = -(-len(states) // (workers * _SHARDS_PER_WORKER))
+        pending = {
+            executor.submit(_expand_shard, states[i:i + shard_size], is_doing_triumph)
+            for i in range(0, len(states), shard_size)
+            }
+        next_states = []
+        try:
+            while pending:
+                done, pending = wait(pending, _POLL_INTERVAL, FIRST_COMPLETED)
+                if cancellation is not None and cancellation.is_cancelled:
+                    raise SearchCancelled(f'search from initial {self} is cancelled')
+
+                if deadline is not None and monotonic() >= deadline:
+                    raise TimeoutError(f'search from initial {self} reached the deadline')
+
+                for future in done:
+                    shard_states = future.result()
+                    # Workers return a done state alone.
+                    if len(shard_states) == 1 and shard_states[0].is_done:
+                        return shard_states
+
+                    next_states.extend(shard_states)
+        finally:
+            if pending:
+                # Tell workers to skip the rest of the cycle.
+                stop_expansion.set()
+
+        return next_states
+
+    def to_bytes(self, /) -> bytes:
+        """
+        Returns a compact binary representation of this state and moves made.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def from_bytes(cls, data: bytes, /) -> Self:
+        """
+        Restores a state from the result of :meth:`to_bytes`.
+        """
+        raise NotImplementedError
+
+    def __reduce__(self, /) -> tuple[Callable[[bytes], Self], tuple[bytes]]:
+        return self.__class__.from_bytes, (self.to_bytes(),)
+
     def __repr__(self, /) -> str:
         return (
             f'{self.__class__.__name__}('
@@ -220,5 +945,15 @@ __all__ = (
     'is_position',
     'State',
     'PMove',
+    'POSITION_ORDERS',
+    'TransitionTable',
+    'SearchCancelled',
+    'InvalidPlanError',
+    'TruncatedSearchError',
+    'InfeasibleStateError',
+    'CancellationToken',
+    'PARALLEL_MIN_FRONTIER',
+    'ALL_VARIANTS',
+    'SearchResult',
     'StateWithAllPositions',
     )
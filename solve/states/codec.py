@@ -0,0 +1,57 @@
+from ..multiset import Multiset
+from ..shapes import *
+from .base import ALL_POSITIONS, PositionsType
+
+CODE_TO_SHAPE2D = circle, triangle, square
+CODE_TO_SHAPE3D = sphere, pyramid, cube, cone, cylinder, prism
+CODE_TO_POSITION: tuple[PositionsType, ...] = tuple(ALL_POSITIONS)
+
+SHAPE2D_TO_CODE = {s: i for i, s in enumerate(CODE_TO_SHAPE2D)}
+SHAPE3D_TO_CODE = {s: i for i, s in enumerate(CODE_TO_SHAPE3D)}
+POSITION_TO_CODE = {p: i for i, p in enumerate(CODE_TO_POSITION)}
+
+_COUNT_BITS = 2
+_COUNT_MASK = (1 << _COUNT_BITS) - 1
+
+CODE_TO_MULTISET = tuple(
+    Multiset(
+        shape
+        for i, shape in enumerate(CODE_TO_SHAPE2D)
+        for _ in range((code >> (_COUNT_BITS * i)) & _COUNT_MASK)
+        )
+    for code in range(1 << (_COUNT_BITS * len(CODE_TO_SHAPE2D)))
+    )
+"""
+Multisets of 2D shapes by their codes.
+Multisets are shared, so they must not be modified.
+"""
+
+
+def multiset_to_code(multiset: Multiset[Shape2D], /) -> int:
+    """
+    Returns a code of a multiset of 2D shapes.
+    Each shape must be present at most 3 times.
+    """
+    counts = [0] * len(CODE_TO_SHAPE2D)
+    for shape in multiset.elements():
+        counts[SHAPE2D_TO_CODE[shape]] += 1
+
+    code = 0
+    for i, count in enumerate(counts):
+        assert count <= _COUNT_MASK, \
+            f'{CODE_TO_SHAPE2D[i]} must be present at most {_COUNT_MASK} times, got {count}'
+        code |= count << (_COUNT_BITS * i)
+
+    return code
+
+
+__all__ = (
+    'CODE_TO_SHAPE2D',
+    'CODE_TO_SHAPE3D',
+    'CODE_TO_POSITION',
+    'CODE_TO_MULTISET',
+    'SHAPE2D_TO_CODE',
+    'SHAPE3D_TO_CODE',
+    'POSITION_TO_CODE',
+    'multiset_to_code',
+    )
@@ -1,11 +1,11 @@
 from collections import Counter
-from collections.abc import Iterator
-from dataclasses import dataclass
-from itertools import permutations
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass, field
 from typing import Self
 
 from .base import *
-from ..key_sets import KSMixed, KeySetType
+from .codec import *
+from ..key_sets import *
 from ..multiset import Multiset
 from ..shapes import Shape2D, Shape3D
 
@@ -32,30 +32,92 @@ class RoomState(State):
         # To remove a shadow X, the room must receive shape X.
         # For example, circle room must receive triangle and square to remove both shadows.
         if shapes_to_receive is None:
-            # This rooms must receive KSMixed[own_shape].terms in any case.
-            # In addition, this room must receive any other shape from final_dropping_shapes
-            # unless it is already present in dropping_shapes.
-            # Take union (not sum!) between
-            # "must receive in any case" and "must receive to be done".
-            # Unions of multisets takes the highest count of elements instead of summing count,
-            # ex. {triangle, circle} | {triangle, triangle} = {triangle, circle, triangle}.
-            shapes_to_receive = KSMixed[own_shape].terms \
-                                | (final_dropping_shapes - dropping_shapes)
+            shapes_to_receive = self.initial_shapes_to_receive(
+                own_shape,
+                dropping_shapes,
+                final_dropping_shapes,
+                )
 
         super().__init__(
             position=position,
             own_shape=own_shape,
             shapes_to_receive=shapes_to_receive,
             )
+        self.is_done = self.remaining_shapes == 0 and dropping_shapes == final_dropping_shapes
 
-    @property
-    def is_done(self, /) -> bool:
-        return not self.shapes_to_receive and self.dropping_shapes == self.final_dropping_shapes
+    @staticmethod
+    def initial_shapes_to_receive(
+            own_shape: Shape2D,
+            dropping_shapes: Multiset[Shape2D],
+            final_dropping_shapes: Multiset[Shape2D],
+            /,
+            ) -> Multiset[Shape2D]:
+        """
+        Returns shapes which a room must receive before any pass is made.
+        """
+        # This rooms must receive KSMixed[own_shape].terms in any case.
+        # In addition, this room must receive any other shape from final_dropping_shapes
+        # unless it is already present in dropping_shapes.
+        # Take union (not sum!) between
+        # "must receive in any case" and "must receive to be done".
+        # Unions of multisets takes the highest count of elements instead of summing count,
+        # ex. {triangle, circle} | {triangle, triangle} = {triangle, circle, triangle}.
+        return KSMixed[own_shape].terms | (final_dropping_shapes - dropping_shapes)
+
+    @classmethod
+    def create(
+            cls,
+            position: PositionsType,
+            own_shape: Shape2D,
+            dropping_shapes: Multiset[Shape2D],
+            final_dropping_shapes: Multiset[Shape2D],
+            shapes_to_receive: Multiset[Shape2D],
+            /,
+            ) -> Self:
+        """
+        Creates a state from trusted fields, only slots are assigned.
+        Unlike the constructor, arguments are not validated.
+        """
+        new = object.__new__(cls)
+        new.position = position
+        new.own_shape = own_shape
+        new.dropping_shapes = dropping_shapes
+        new.final_dropping_shapes = final_dropping_shapes
+        new.shapes_to_receive = shapes_to_receive
+        new.remaining_shapes = remaining_shapes = shapes_to_receive.total
+        new.is_done = remaining_shapes == 0 and dropping_shapes == final_dropping_shapes
+        new._key = None
+        return new
+
+    def _replace(
+            self,
+            /,
+            dropping_shapes: Multiset[Shape2D],
+            shapes_to_receive: Multiset[Shape2D],
+            ) -> Self:
+        """
+        Creates a state with the same position and goal, but with other shapes.
+        """
+        return type(self).create(
+            self.position,
+            self.own_shape,
+            dropping_shapes,
+            self.final_dropping_shapes,
+            shapes_to_receive,
+            )
 
     @property
     def shapes_available(self, /) -> Multiset[Shape2D]:
         return self.dropping_shapes
 
+    @property
+    def missing_shapes(self, /) -> int:
+        return (self.final_dropping_shapes - self.dropping_shapes).total
+
+    @property
+    def final_shapes(self, /) -> Multiset[Shape2D]:
+        return self.final_dropping_shapes
+
     @property
     def current_key(self, /) -> Shape3D:
         """
@@ -72,37 +134,149 @@ class RoomState(State):
         Transfers a shape from this room to the other.
         Returns two new room states, new self state and new other state.
         """
-        new_self = RoomState(
-            self.position,
-            self.own_shape,
-            dropping_shapes=self.dropping_shapes.remove_copy(shape),
-            final_dropping_shapes=self.final_dropping_shapes,
-            shapes_to_receive=self.shapes_to_receive,
+        new_self = self._replace(self.dropping_shapes.remove_copy(shape), self.shapes_to_receive)
+        new_other = other._replace(
+            other.dropping_shapes.add_copy(shape),
+            other.shapes_to_receive.remove_copy(shape),
             )
-        new_other = RoomState(
-            other.position,
-            other.own_shape,
-            dropping_shapes=other.dropping_shapes.add_copy(shape),
-            final_dropping_shapes=other.final_dropping_shapes,
-            shapes_to_receive=other.shapes_to_receive.remove_copy(shape),
+        return new_self, new_other
+
+    def unpass_shape(self, shape: Shape2D, other: Self, /) -> [Self, Self]:
+        """
+        Reverts :meth:`pass_shape` which transferred a shape from this room to the other.
+        Returns two new room states, new self state and new other state.
+        """
+        new_self = self._replace(self.dropping_shapes.add_copy(shape), self.shapes_to_receive)
+        new_other = other._replace(
+            other.dropping_shapes.remove_copy(shape),
+            other.shapes_to_receive.add_copy(shape),
             )
         return new_self, new_other
 
+    def to_bytes(self, /) -> bytes:
+        """
+        Returns 4 bytes representing this state except its position.
+        """
+        return bytes((
+            SHAPE2D_TO_CODE[self.own_shape],
+            multiset_to_code(self.dropping_shapes),
+            multiset_to_code(self.final_dropping_shapes),
+            multiset_to_code(self.shapes_to_receive),
+            ))
+
+    @classmethod
+    def from_bytes(cls, position: PositionsType, data: bytes, /) -> Self:
+        """
+        Restores a state in the given position from the result of :meth:`to_bytes`.
+        """
+        own_shape, dropping_shapes, final_dropping_shapes, shapes_to_receive = data
+        return cls.create(
+            position,
+            CODE_TO_SHAPE2D[own_shape],
+            CODE_TO_MULTISET[dropping_shapes],
+            CODE_TO_MULTISET[final_dropping_shapes],
+            CODE_TO_MULTISET[shapes_to_receive],
+            )
+
 
 @dataclass(frozen=True, kw_only=True, slots=True)
 class PassMove:
+    """
+    Moves are flyweights: there is only one instance for every code,
+    use :meth:`from_code` or :meth:`get` to obtain it.
+    States of rooms after a move are not stored,
+    see :meth:`StateOfAllRooms.snapshots` to restore them.
+    """
     departure: PositionsType
     shape: Shape2D
     destination: PositionsType
-    # States AFTER move is done
-    departure_state: RoomState
-    destination_state: RoomState
+    code: int = field(init=False, repr=False, compare=False)
+    """
+    Numeric code of this move in range [0, 27).
+    """
+
+    def __post_init__(self, /) -> None:
+        code = (POSITION_TO_CODE[self.departure] * 3 + SHAPE2D_TO_CODE[self.shape]) * 3 \
+            + POSITION_TO_CODE[self.destination]
+        object.__setattr__(self, 'code', code)
+
+    @classmethod
+    def from_code(cls, code: int, /) -> Self:
+        """
+        Returns the move with the given numeric code.
+        """
+        return _pass_moves[code]
+
+    @classmethod
+    def get(cls, departure: PositionsType, shape: Shape2D, destination: PositionsType, /) -> Self:
+        """
+        Returns the move of the shape from departure to destination.
+        """
+        return _pass_moves[
+            (POSITION_TO_CODE[departure] * 3 + SHAPE2D_TO_CODE[shape]) * 3
+            + POSITION_TO_CODE[destination]
+            ]
+
+    def __reduce__(self, /) -> tuple[Callable[[int], 'PassMove'], tuple[int]]:
+        # Keep moves interned in other processes.
+        return PassMove.from_code, (self.code,)
+
+
+def _create_pass_move(code: int, /) -> PassMove:
+    code, destination = divmod(code, 3)
+    departure, shape = divmod(code, 3)
+    return PassMove(
+        departure=CODE_TO_POSITION[departure],
+        shape=CODE_TO_SHAPE2D[shape],
+        destination=CODE_TO_POSITION[destination],
+        )
+
+
+_pass_moves = tuple(map(_create_pass_move, range(27)))
+assert all(m.code == code for code, m in enumerate(_pass_moves))
+
+
+def _build_pass_rows(
+        s1: RoomState,
+        s2: RoomState,
+        /,
+        ) -> Iterator[tuple[PassMove, RoomState, RoomState]]:
+    """
+    Yields all pass moves from room ``s1`` to room ``s2``
+    alongside new states of these rooms.
+    """
+    # Do nothing if either state is done.
+    if s1.is_done or s2.is_done: return
+
+    for shape in s1.shapes_available:
+        if s2.is_shape_required(shape):
+            new_s1, new_s2 = s1.pass_shape(shape, s2)
+            move = PassMove.get(s1.position, shape, s2.position)
+            yield move, _pass_table.intern(new_s1), _pass_table.intern(new_s2)
+
+
+_pass_table = TransitionTable(_build_pass_rows)
+
+
+def _restore_room(position: PositionsType, data: bytes, /) -> RoomState:
+    """
+    Returns the interned room state with the given binary representation,
+    the state is created only if it is not interned yet.
+    """
+    state = _pass_table.get((position, data))
+    if state is None:
+        state = _pass_table.intern(RoomState.from_bytes(position, data))
+
+    return state
 
 
 class StateOfAllRooms(StateWithAllPositions[RoomState, PassMove]):
     __slots__ = ()
 
     max_cycles = 9
+    max_shapes_per_cycle = 1
+    moves_per_cycle = 1
+    transition_table = _pass_table
 
     def next_states(self, /, is_doing_triumph: bool) -> Iterator[Self]:
         """
@@ -111,33 +285,129 @@ class StateOfAllRooms(StateWithAllPositions[RoomState, PassMove]):
         ensures that next moves will not pass shape the room received shape in the last step.
         """
         last_position = self.last_position if self.moves_made else None
-        for s1, s2, s3 in permutations((self.left, self.middle, self.right)):
+        states = self.left, self.middle, self.right
+        moves_made = self.moves_made
+        for i1, i2, i3, (j1, j2, j3) in POSITION_ORDERS:
+            s2 = states[i2]
             # Do not pass shape to the room which was a receiver in the last move.
             if is_doing_triumph and last_position == s2.position: continue
-            # Do nothing if either state is done.
-            if s1.is_done or s2.is_done: continue
-
-            for shape in s1.shapes_available:
-                if s2.is_shape_required(shape):
-                    new_s1, new_s2 = s1.pass_shape(shape, s2)
-                    move = PassMove(
-                        departure=s1.position,
-                        shape=shape,
-                        destination=s2.position,
-                        departure_state=new_s1,
-                        destination_state=new_s2,
-                        )
-                    kwargs = {
-                        s1.position:  new_s1,
-                        s2.position:  new_s2,
-                        s3.position:  s3,
-                        'moves_made': (*self.moves_made, move),
-                        }
-                    yield StateOfAllRooms(**kwargs)
+
+            s3 = states[i3]
+            for move, new_s1, new_s2 in _pass_table[states[i1], s2]:
+                new_states = new_s1, new_s2, s3
+                yield StateOfAllRooms(
+                    new_states[j1],
+                    new_states[j2],
+                    new_states[j3],
+                    (*moves_made, move),
+                    )
+
+    def apply_cycle(self, moves: Sequence[PassMove], /) -> Self:
+        move, = moves
+        states = [self.left, self.middle, self.right]
+        i1 = POSITION_TO_CODE[move.departure]
+        i2 = POSITION_TO_CODE[move.destination]
+        if i1 != i2:
+            for made_move, new_s1, new_s2 in _pass_table[states[i1], states[i2]]:
+                if made_move.shape == move.shape:
+                    states[i1] = new_s1
+                    states[i2] = new_s2
+                    return StateOfAllRooms(*states, (*self.moves_made, made_move))
+
+        raise InvalidPlanError(
+            f'cannot pass {move.shape} from {move.departure} to {move.destination} in {self}'
+            )
+
+    @classmethod
+    def initial_states(cls, /) -> Iterator[Self]:
+        # Combinations are built from states, so they are imported here.
+        from ..combo import iter_combinations
+
+        for combination in iter_combinations():
+            for key_set in (KSMixed, KSDouble1, KSDouble2):
+                yield combination.to_room_state(key_set)
+
+    @classmethod
+    def from_shapes(
+            cls,
+            inner_shapes: Sequence[Shape2D],
+            other_shapes: Sequence[Shape2D],
+            key_set: KeySetType,
+            /,
+            ) -> Self:
+        """
+        Creates the initial state of all solo rooms from shapes from left to right.
+        Unlike :func:`init_rooms`, arguments are not validated.
+        """
+        intern = _pass_table.intern
+        create = RoomState.create
+        initial_shapes_to_receive = RoomState.initial_shapes_to_receive
+        states = []
+        for position, inner, other in zip(ALL_POSITIONS, inner_shapes, other_shapes):
+            dropping_shapes = Multiset((inner, other))
+            final_dropping_shapes = key_set[inner].terms
+            shapes_to_receive = initial_shapes_to_receive(
+                inner,
+                dropping_shapes,
+                final_dropping_shapes,
+                )
+            state = create(position, inner, dropping_shapes, final_dropping_shapes, shapes_to_receive)
+            states.append(intern(state))
+
+        return cls(*states)
+
+    def to_bytes(self, /) -> bytes:
+        """
+        Returns a compact binary representation of this state and moves made.
+        It consists of 4 bytes per room and 1 byte per move.
+        """
+        moves = bytes(m.code for m in self.moves_made)
+        return self.left.to_bytes() + self.middle.to_bytes() + self.right.to_bytes() + moves
+
+    @classmethod
+    def from_bytes(cls, data: bytes, /) -> Self:
+        """
+        Restores a state from the result of :meth:`to_bytes`.
+        """
+        return cls(
+            _restore_room(LEFT, data[0:4]),
+            _restore_room(MIDDLE, data[4:8]),
+            _restore_room(RIGHT, data[8:12]),
+            tuple(map(PassMove.from_code, data[12:])),
+            )
+
+    def snapshots(self, /) -> list[tuple[RoomState, RoomState]]:
+        """
+        Returns states of the departure and the destination rooms
+        right after every move made.
+        States are restored by reverting moves one by one starting from this state.
+        """
+        states = {LEFT: self.left, MIDDLE: self.middle, RIGHT: self.right}
+        snapshots = []
+        for move in reversed(self.moves_made):
+            departure_state = states[move.departure]
+            destination_state = states[move.destination]
+            snapshots.append((departure_state, destination_state))
+            states[move.departure], states[move.destination] = \
+                departure_state.unpass_shape(move.shape, destination_state)
+
+        snapshots.reverse()
+        return snapshots
 
     # Required for correct type hinting in stupid PyCharm...
     def solve(self, /, is_doing_triumph: bool, last_position_touched: str | None) -> Self: ...
-    del solve
+    def search(
+            self,
+            /,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            *,
+            max_frontier: int | None = None,
+            deadline: float | None = None,
+            cancellation: CancellationToken | None = None,
+            workers: int = 1,
+            ) -> SearchResult[Self]: ...
+    del solve, search
 
 
 def init_rooms(
@@ -152,6 +422,7 @@ def init_rooms(
         ) -> StateOfAllRooms:
     """
     A convenience function to specify the initial state of all solo rooms.
+    Arguments are validated, see :meth:`StateOfAllRooms.from_shapes` for a faster variant.
     """
     shapes = (
         left_inner_shape,
@@ -166,25 +437,10 @@ def init_rooms(
     c = Counter(shapes)
     assert all(v == 2 for v in c.values()), f'the number of all 2D shapes must be 2, got {c}'
 
-    return StateOfAllRooms(
-        left=RoomState(
-            LEFT,
-            left_inner_shape,
-            dropping_shapes=Multiset((left_inner_shape, left_other_shape)),
-            final_dropping_shapes=key_set[left_inner_shape].terms,
-            ),
-        middle=RoomState(
-            MIDDLE,
-            middle_inner_shape,
-            dropping_shapes=Multiset((middle_inner_shape, middle_other_shape)),
-            final_dropping_shapes=key_set[middle_inner_shape].terms,
-            ),
-        right=RoomState(
-            RIGHT,
-            right_inner_shape,
-            dropping_shapes=Multiset((right_inner_shape, right_other_shape)),
-            final_dropping_shapes=key_set[right_inner_shape].terms,
-            ),
+    return StateOfAllRooms.from_shapes(
+        (left_inner_shape, middle_inner_shape, right_inner_shape),
+        (left_other_shape, middle_other_shape, right_other_shape),
+        key_set,
         )
 
 
@@ -1,11 +1,12 @@
 from collections import Counter
-from collections.abc import Iterator
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
-from itertools import chain, permutations, product
+from itertools import chain, product
 from typing import Self
 
 from .base import *
-from ..key_sets import KeySetType
+from .codec import *
+from ..key_sets import *
 from ..multiset import Multiset
 from ..shapes import *
 
@@ -15,6 +16,21 @@ class DissectMove:
     shape: Shape2D
     destination: PositionsType
 
+    @property
+    def code(self, /) -> int:
+        """
+        Numeric code of this move in range [0, 9).
+        """
+        return SHAPE2D_TO_CODE[self.shape] * 3 + POSITION_TO_CODE[self.destination]
+
+    @classmethod
+    def from_code(cls, code: int, /) -> Self:
+        """
+        Creates a move from its numeric code.
+        """
+        shape, destination = divmod(code, 3)
+        return cls(shape=CODE_TO_SHAPE2D[shape], destination=CODE_TO_POSITION[destination])
+
 
 class StatueState(State):
     __slots__ = 'shape_held', 'final_shape_held'
@@ -40,15 +56,58 @@ class StatueState(State):
             own_shape=own_shape,
             shapes_to_receive=shapes_to_receive,
             )
+        # 3D shapes are singletons.
+        self.is_done = shape_held is final_shape_held
 
-    @property
-    def is_done(self, /) -> bool:
-        return self.shape_held == self.final_shape_held
+    @classmethod
+    def create(
+            cls,
+            position: PositionsType,
+            own_shape: Shape2D,
+            shape_held: Shape3D,
+            final_shape_held: Shape3D,
+            shapes_to_receive: Multiset[Shape2D],
+            /,
+            ) -> Self:
+        """
+        Creates a state from trusted fields, only slots are assigned.
+        Unlike the constructor, arguments are not validated.
+        """
+        new = object.__new__(cls)
+        new.position = position
+        new.own_shape = own_shape
+        new.shape_held = shape_held
+        new.final_shape_held = final_shape_held
+        new.shapes_to_receive = shapes_to_receive
+        new.remaining_shapes = shapes_to_receive.total
+        new.is_done = shape_held is final_shape_held
+        new._key = None
+        return new
+
+    def _replace(self, /, shape_held: Shape3D, shapes_to_receive: Multiset[Shape2D]) -> Self:
+        """
+        Creates a state with the same position and goal, but with other shapes.
+        """
+        return type(self).create(
+            self.position,
+            self.own_shape,
+            shape_held,
+            self.final_shape_held,
+            shapes_to_receive,
+            )
 
     @property
     def shapes_available(self, /) -> Multiset[Shape2D]:
         return self.shape_held.terms
 
+    @property
+    def missing_shapes(self, /) -> int:
+        return (self.final_shape_held.terms - self.shape_held.terms).total
+
+    @property
+    def final_shapes(self, /) -> Multiset[Shape2D]:
+        return self.final_shape_held.terms
+
     def dissect(self, shape1: Shape2D, other: Self, shape2: Shape2D, /) -> [Self, Self]:
         """
         Dissects this statue with one shape and other statue with other shape
@@ -56,62 +115,224 @@ class StatueState(State):
         """
         # Use discard, because one of the states is allowed
         # to not require swapped shape.
-        new_self = StatueState(
-            self.position,
-            self.own_shape,
-            shape_held=self.shape_held - shape1 + shape2,
-            final_shape_held=self.final_shape_held,
-            shapes_to_receive=self.shapes_to_receive.discard_copy(shape2),
+        new_self = self._replace(
+            self.shape_held - shape1 + shape2,
+            self.shapes_to_receive.discard_copy(shape2),
             )
-        new_other = StatueState(
-            other.position,
-            other.own_shape,
-            shape_held=other.shape_held - shape2 + shape1,
-            final_shape_held=other.final_shape_held,
-            shapes_to_receive=other.shapes_to_receive.discard_copy(shape1),
+        new_other = other._replace(
+            other.shape_held - shape2 + shape1,
+            other.shapes_to_receive.discard_copy(shape1),
             )
 
         return new_self, new_other
 
+    def to_bytes(self, /) -> bytes:
+        """
+        Returns 4 bytes representing this state except its position.
+        """
+        return bytes((
+            SHAPE2D_TO_CODE[self.own_shape],
+            SHAPE3D_TO_CODE[self.shape_held],
+            SHAPE3D_TO_CODE[self.final_shape_held],
+            multiset_to_code(self.shapes_to_receive),
+            ))
+
+    @classmethod
+    def from_bytes(cls, position: PositionsType, data: bytes, /) -> Self:
+        """
+        Restores a state in the given position from the result of :meth:`to_bytes`.
+        """
+        own_shape, shape_held, final_shape_held, shapes_to_receive = data
+        return cls.create(
+            position,
+            CODE_TO_SHAPE2D[own_shape],
+            CODE_TO_SHAPE3D[shape_held],
+            CODE_TO_SHAPE3D[final_shape_held],
+            CODE_TO_MULTISET[shapes_to_receive],
+            )
+
+
+type _DissectRowType = tuple[DissectMove, DissectMove, StatueState, StatueState, frozenset, bool]
+
+
+def _build_dissect_rows(s1: StatueState, s2: StatueState, /) -> Iterator[_DissectRowType]:
+    """
+    Yields all dissect moves between statues ``s1`` and ``s2``
+    alongside new states of these statues, the swap made
+    and whether this swap does not change statues.
+    """
+    # Do nothing if either state is done.
+    if s1.is_done or s2.is_done: return
+
+    for shape1, shape2 in product(s1.shapes_available, s2.shapes_available):
+        # Only check for s1 with shape2 because
+        # players can start with all doubles
+        # and must finish with doubles in different statues.
+        # Condition for s2 with shape1 will be done in other permutation.
+        if s1.is_shape_required(shape2):
+            new_s1, new_s2 = s1.dissect(shape1, s2, shape2)
+            yield (
+                DissectMove(shape=shape1, destination=s1.position),
+                DissectMove(shape=shape2, destination=s2.position),
+                _dissect_table.intern(new_s1),
+                _dissect_table.intern(new_s2),
+                frozenset(((s1.position, shape1), (s2.position, shape2))),
+                shape1 == shape2,
+                )
+
+
+_dissect_table = TransitionTable(_build_dissect_rows)
+
+
+def _restore_statue(position: PositionsType, data: bytes, /) -> StatueState:
+    """
+    Returns the interned statue state with the given binary representation,
+    the state is created only if it is not interned yet.
+    """
+    state = _dissect_table.get((position, data))
+    if state is None:
+        state = _dissect_table.intern(StatueState.from_bytes(position, data))
+
+    return state
+
 
 class StateOfAllStatues(StateWithAllPositions[StatueState, DissectMove]):
     __slots__ = ()
 
     max_cycles = 4
+    max_shapes_per_cycle = 2
+    moves_per_cycle = 2
+    transition_table = _dissect_table
 
     def next_states(self, /, is_doing_triumph: bool) -> Iterator[Self]:
         """
         Yields all possible next states.
         If argument ``is_doing_triumph`` is ``True``,
         ensures that next moves will not start with the statue dissected last in the last move.
+
+        Every distinct resulting configuration is yielded only once.
+        Swaps which do not change statues or revert the last swap are skipped.
         """
-        last_position = self.last_position if self.moves_made else None
-        for s1, s2, s3 in permutations((self.left, self.middle, self.right)):
+        moves_made = self.moves_made
+        if moves_made:
+            m1, m2 = moves_made[-2:]
+            last_position = m2.destination
+            # Swap which returns both statues to their shapes before the last swap.
+            undo = frozenset(((m1.destination, m2.shape), (m2.destination, m1.shape)))
+        else:
+            last_position = None
+            undo = None
+
+        states = self.left, self.middle, self.right
+        seen = set()
+        for i1, i2, i3, (j1, j2, j3) in POSITION_ORDERS:
+            s1 = states[i1]
             # Do not dissect shape from the statue which was dissected in the last move.
             if is_doing_triumph and last_position == s1.position: continue
-            # Do nothing if either state is done.
-            if s1.is_done or s2.is_done: continue
-
-            for shape1, shape2 in product(s1.shapes_available, s2.shapes_available):
-                # Only check for s1 with shape2 because
-                # players can start with all doubles
-                # and must finish with doubles in different statues.
-                # Condition for s2 with shape1 will be done in other permutation.
-                if s1.is_shape_required(shape2):
-                    new_s1, new_s2 = s1.dissect(shape1, s2, shape2)
-                    move1 = DissectMove(shape=shape1, destination=s1.position)
-                    move2 = DissectMove(shape=shape2, destination=s2.position)
-                    kwargs = {
-                        s1.position:  new_s1,
-                        s2.position:  new_s2,
-                        s3.position:  s3,
-                        'moves_made': (*self.moves_made, move1, move2),
-                        }
-                    yield StateOfAllStatues(**kwargs)
+
+            s3 = states[i3]
+            for move1, move2, new_s1, new_s2, swap, is_idle in _dissect_table[s1, states[i2]]:
+                if not is_doing_triumph:
+                    # Swapping equal shapes changes nothing, reverting the last swap
+                    # leads to the state solved one cycle earlier.
+                    # With triumph such swaps change the last position, so they are kept.
+                    if is_idle or swap == undo: continue
+
+                new_states = new_s1, new_s2, s3
+                left = new_states[j1]
+                middle = new_states[j2]
+                right = new_states[j3]
+                # Swap from s1 side and the same swap from s2 side give the same statues,
+                # but they differ by the last position, so both are kept.
+                key = left, middle, right, move2.destination
+                if key in seen: continue
+                seen.add(key)
+
+                yield StateOfAllStatues(left, middle, right, (*moves_made, move1, move2))
+
+    def apply_cycle(self, moves: Sequence[DissectMove], /) -> Self:
+        move1, move2 = moves
+        states = [self.left, self.middle, self.right]
+        i1 = POSITION_TO_CODE[move1.destination]
+        i2 = POSITION_TO_CODE[move2.destination]
+        if i1 != i2:
+            for made1, made2, new_s1, new_s2, _, _ in _dissect_table[states[i1], states[i2]]:
+                if made1.shape == move1.shape and made2.shape == move2.shape:
+                    states[i1] = new_s1
+                    states[i2] = new_s2
+                    return StateOfAllStatues(*states, (*self.moves_made, made1, made2))
+
+        raise InvalidPlanError(
+            f'cannot dissect {move1.shape} from {move1.destination} '
+            f'and {move2.shape} from {move2.destination} in {self}'
+            )
+
+    @classmethod
+    def initial_states(cls, /) -> Iterator[Self]:
+        # Combinations are built from states, so they are imported here.
+        from ..combo import iter_combinations
+
+        for combination in iter_combinations():
+            for key_set in (KSMixed, KSDouble1, KSDouble2):
+                yield combination.to_statue_state(key_set)
+
+    @classmethod
+    def from_shapes(
+            cls,
+            inner_shapes: Sequence[Shape2D],
+            held_shapes: Sequence[Shape3D],
+            key_set: KeySetType,
+            /,
+            ) -> Self:
+        """
+        Creates the initial state of all statues from shapes from left to right.
+        Unlike :func:`init_statues`, arguments are not validated.
+        """
+        intern = _dissect_table.intern
+        create = StatueState.create
+        states = []
+        for position, inner, held in zip(ALL_POSITIONS, inner_shapes, held_shapes):
+            final_shape_held = key_set[inner]
+            states.append(
+                intern(create(position, inner, held, final_shape_held, final_shape_held.terms))
+                )
+
+        return cls(*states)
+
+    def to_bytes(self, /) -> bytes:
+        """
+        Returns a compact binary representation of this state and moves made.
+        It consists of 4 bytes per statue and 1 byte per move.
+        """
+        moves = bytes(m.code for m in self.moves_made)
+        return self.left.to_bytes() + self.middle.to_bytes() + self.right.to_bytes() + moves
+
+    @classmethod
+    def from_bytes(cls, data: bytes, /) -> Self:
+        """
+        Restores a state from the result of :meth:`to_bytes`.
+        """
+        return cls(
+            _restore_statue(LEFT, data[0:4]),
+            _restore_statue(MIDDLE, data[4:8]),
+            _restore_statue(RIGHT, data[8:12]),
+            tuple(DissectMove.from_code(code) for code in data[12:]),
+            )
 
     # Required for correct type hinting in stupid PyCharm...
     def solve(self, /, is_doing_triumph: bool, last_position_touched: str | None) -> Self: ...
-    del solve
+    def search(
+            self,
+            /,
+            is_doing_triumph: bool,
+            last_position_touched: str | None,
+            *,
+            max_frontier: int | None = None,
+            deadline: float | None = None,
+            cancellation: CancellationToken | None = None,
+            workers: int = 1,
+            ) -> SearchResult[Self]: ...
+    del solve, search
 
 
 def init_statues(
@@ -126,6 +347,7 @@ def init_statues(
         ) -> StateOfAllStatues:
     """
     A convenience function to specify the initial state of all statues in the main room.
+    Arguments are validated, see :meth:`StateOfAllStatues.from_shapes` for a faster variant.
     """
     inner = left_inner_shape, middle_inner_shape, right_inner_shape
     assert all(isinstance(s, Shape2D) for s in inner), f'all inner shapes must be 2D'
@@ -140,26 +362,7 @@ def init_statues(
     assert all(v == 2 for v in c2.values()), \
         f'the number of all 2D terms of held 3D shapes must be 2, got {c2}'
 
-    return StateOfAllStatues(
-        left=StatueState(
-            LEFT,
-            left_inner_shape,
-            shape_held=left_held_shape,
-            final_shape_held=key_set[left_inner_shape],
-            ),
-        middle=StatueState(
-            MIDDLE,
-            middle_inner_shape,
-            shape_held=middle_held_shape,
-            final_shape_held=key_set[middle_inner_shape],
-            ),
-        right=StatueState(
-            RIGHT,
-            right_inner_shape,
-            shape_held=right_held_shape,
-            final_shape_held=key_set[right_inner_shape],
-            ),
-        )
+    return StateOfAllStatues.from_shapes(inner, held, key_set)
 
 
 __all__ = 'DissectMove', 'StateOfAllStatues', 'init_statues'
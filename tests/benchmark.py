@@ -0,0 +1,154 @@
+"""
+Benchmarks of the solver.
+Run ``python -m tests.benchmark`` from the root of the project.
+"""
+import os
+from argparse import ArgumentParser
+from itertools import permutations, product
+from time import perf_counter
+
+from solve.key_sets import *
+from solve.combo import Combination
+from solve.engines import DeduplicatedEngine, get_engine
+from solve.states import ALL_VARIANTS, StateOfAllStatues
+from .combos import all_combinations
+
+key_sets = {
+    'KSMixed':   KSMixed,
+    'KSDouble1': KSDouble1,
+    'KSDouble2': KSDouble2,
+    }
+
+
+def count_raw_dissect_moves(state: StateOfAllStatues, /, is_doing_triumph: bool) -> int:
+    """
+    Counts dissect moves from the given state without any pruning.
+    """
+    last_position = state.last_position if state.moves_made else None
+    count = 0
+    for s1, s2, _ in permutations((state.left, state.middle, state.right)):
+        if is_doing_triumph and last_position == s1.position: continue
+        if s1.is_done or s2.is_done: continue
+
+        for _, shape2 in product(s1.shapes_available, s2.shapes_available):
+            if s1.is_shape_required(shape2):
+                count += 1
+
+    return count
+
+
+def benchmark_dissect_branching() -> None:
+    """
+    Prints the average branching factor of dissection search
+    with and without pruning of redundant dissect moves.
+    """
+    print('--- DISSECTION BRANCHING FACTOR ---')
+    print(f'{'key set':<10} {'triumph':<8} {'nodes':>8} {'raw':>8} {'pruned':>8} {'reduction':>10}')
+    for ks_name, ks in key_sets.items():
+        for with_triumph in (False, True):
+            nodes = raw = pruned = 0
+            for combo in all_combinations.values():
+                states = [combo.to_statue_state(ks)]
+                for _ in range(StateOfAllStatues.max_cycles):
+                    next_states = []
+                    for state in states:
+                        if state.is_done: continue
+
+                        children = list(state.next_states(with_triumph))
+                        nodes += 1
+                        raw += count_raw_dissect_moves(state, with_triumph)
+                        pruned += len(children)
+                        next_states.extend(children)
+
+                    states = next_states
+
+            print(
+                f'{ks_name:<10} {with_triumph!s:<8} {nodes:>8} '
+                f'{raw / nodes:>8.2f} {pruned / nodes:>8.2f} '
+                f'{1 - pruned / raw:>10.1%}'
+                )
+
+
+def benchmark_parallel_search(max_workers: int, /) -> None:
+    """
+    Prints time of the deepest room searches
+    and the speedup of parallel expansion for different numbers of workers.
+    Parallel search drops duplicate states on every cycle,
+    so it is compared with the serial search of engine dedup-bfs which does the same.
+    """
+    print('--- PARALLEL ROOM SEARCH ---')
+    combo = all_combinations['0[03]-3[34]-4[40]']
+    state = combo.to_room_state(KSDouble1)
+    serial_engine = get_engine(DeduplicatedEngine.name)
+    print(f'{'workers':<8} {'triumph':<8} {'expanded':>9} {'seconds':>8} {'speedup':>8}')
+    for with_triumph in (False, True):
+        # Transition tables are filled during the first search, so it is not measured.
+        serial_engine.search(state, with_triumph, None)
+        start = perf_counter()
+        _, stats = serial_engine.search(state, with_triumph, None)
+        serial_time = perf_counter() - start
+        print(f'{1:<8} {with_triumph!s:<8} {stats.expanded:>9} {serial_time:>8.2f} {1:>8.2f}')
+        workers = 2
+        while workers <= max_workers:
+            start = perf_counter()
+            result = state.search(with_triumph, None, workers=workers)
+            elapsed = perf_counter() - start
+            print(
+                f'{workers:<8} {with_triumph!s:<8} {result.expanded:>9} {elapsed:>8.2f} '
+                f'{serial_time / elapsed:>8.2f}'
+                )
+            workers *= 2
+
+
+def benchmark_variants() -> None:
+    """
+    Prints time of solving all variants of triumph and last position
+    via separate searches and via one search.
+    """
+    print('--- ALL VARIANTS OF TRIUMPH ---')
+    print(f'{'part':<10} {'key set':<10} {'separate':>9} {'together':>9} {'speedup':>8}')
+    parts = {
+        'rooms':      Combination.to_room_state,
+        'dissection': Combination.to_statue_state,
+        }
+    for part, create_state in parts.items():
+        for ks_name, ks in key_sets.items():
+            separate_time = together_time = 0
+            for combo in all_combinations.values():
+                state = create_state(combo, ks)
+                start = perf_counter()
+                for with_triumph, last_position in ALL_VARIANTS:
+                    state.solve(with_triumph, last_position)
+
+                separate_time += perf_counter() - start
+                start = perf_counter()
+                state.solve_variants(ALL_VARIANTS)
+                together_time += perf_counter() - start
+
+            print(
+                f'{part:<10} {ks_name:<10} {separate_time:>9.2f} {together_time:>9.2f} '
+                f'{separate_time / together_time:>8.2f}'
+                )
+
+
+def main() -> None:
+    parser = ArgumentParser(prog='python -m tests.benchmark', description='Benchmarks of the solver')
+    parser.add_argument(
+        '-w',
+        '--max-workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='The maximum number of processes used by parallel search. '
+             'Powers of 2 up to this number are measured. '
+             'Defaults to the number of CPUs.',
+        )
+    args = parser.parse_args()
+    benchmark_dissect_branching()
+    print()
+    benchmark_variants()
+    print()
+    benchmark_parallel_search(args.max_workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from solve.api import *
+from solve.engines import AUTO_ENGINE, get_engine
+from solve.metrics import REGISTRY, SOLVE_SECONDS
+from solve.players import Player
+from solve.shapes import *
+from solve.states import LEFT, MIDDLE, RIGHT
+
+
+class TestApi(TestCase):
+    encounter = dict(
+        inner_shapes=(square, circle, triangle),
+        held_shapes=(cube, sphere, pyramid),
+        players=(
+            Player(alias='A', their_shape=triangle, other_shape=square),
+            Player(alias='B', their_shape=square, other_shape=circle),
+            Player(alias='C', their_shape=circle, other_shape=triangle),
+            ),
+        )
+
+    def test_solve(self, /) -> None:
+        for key_set in ('mixed', 'double'):
+            for last_position in (None, LEFT, MIDDLE, RIGHT):
+                with self.subTest(key_set=key_set, last_position=last_position):
+                    solution = solve_encounter(
+                        **self.encounter,
+                        key_set=key_set,
+                        is_doing_triumph=last_position is not None,
+                        last_position=last_position,
+                        engine='bfs',
+                        )
+                    rooms = solution.rooms
+                    dissection = solution.dissection
+                    final_keys = tuple(solution.key_set[s] for s in self.encounter['inner_shapes'])
+                    self.assertEqual(final_keys, rooms.final_keys)
+                    self.assertEqual(final_keys, dissection.final_shapes)
+
+                    passes = [s for s in rooms.steps if isinstance(s, PassStep)]
+                    self.assertEqual(len(rooms.moves), len(passes))
+                    # Every player collects every shape they pass.
+                    collects = [s for s in rooms.steps if isinstance(s, CollectStep)]
+                    collects += rooms.initial_collects
+                    self.assertCountEqual(
+                        [(m.departure, m.shape) for m in rooms.moves],
+                        [(s.position, s.shape) for s in collects],
+                        )
+                    if last_position is not None:
+                        self.assertNotEqual(last_position, rooms.moves[0].destination)
+                        self.assertNotEqual(rooms.last_position, dissection.moves[0].destination)
+
+    def test_default_engine(self, /) -> None:
+        # The same engine is used as by the script with the default configuration.
+        name = get_engine(AUTO_ENGINE).name
+        REGISTRY.reset()
+        solve_encounter(**self.encounter)
+        self.assertEqual(1, SOLVE_SECONDS.count('rooms', 'mixed', name))
+        self.assertEqual(1, SOLVE_SECONDS.count('dissection', 'mixed', name))
+
+    def test_invalid(self, /) -> None:
+        with self.assertRaises(AssertionError):
+            solve_encounter(**self.encounter | {'inner_shapes': (square, square, triangle)})
+
+        with self.assertRaises(AssertionError):
+            solve_encounter(**self.encounter | {'held_shapes': (cube, cube, pyramid)})
+
+        with self.assertRaises(AssertionError):
+            solve_encounter(**self.encounter, key_set='triple')
@@ -0,0 +1,76 @@
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from solve.batch import *
+from solve.config import Config, config_to_dict
+from solve.generator import generate_configs
+
+_CSV_HEADER = (
+    'key_set,inner_shapes,held_shapes,is_doing_triumph,'
+    'player1_alias,player1_their_shape,player1_other_shape,'
+    'player2_alias,player2_their_shape,player2_other_shape,'
+    'player3_alias,player3_their_shape,player3_other_shape\n'
+    )
+_CSV_ROW = 'mixed,4 0 3,24 23 20,false,A,3,4,B,4,0,C,0,3\n'
+
+
+class TestBatch(TestCase):
+    def test_read_jsonl(self, /) -> None:
+        file = StringIO('{"key_set": "mixed"}\n\n{bad json\n[1]\n')
+        records = list(read_jsonl(file))
+        self.assertEqual(3, len(records))
+        self.assertEqual({'key_set': 'mixed'}, records[0])
+        self.assertIsInstance(records[1], InvalidRecord)
+        self.assertEqual(3, records[1].line)
+        self.assertIn('JSONDecodeError', records[1].error)
+        self.assertEqual([1], records[2])
+
+    def test_read_csv(self, /) -> None:
+        file = StringIO(
+            _CSV_HEADER + _CSV_ROW + 'mixed,abc,,,,,,,,,,,\n' + _CSV_ROW
+            + _CSV_ROW.replace('false', 'yes')
+            )
+        records = list(read_csv(file))
+        self.assertEqual(4, len(records))
+        self.assertEqual(records[0], records[2])
+        self.assertEqual([4, 0, 3], records[0]['inner_shapes'])
+        self.assertEqual({'alias': 'A', 'their_shape': 3, 'other_shape': 4}, records[0]['player1'])
+        self.assertFalse(records[0]['is_doing_triumph'])
+        self.assertEqual(InvalidRecord(line=3, error=records[1].error), records[1])
+        self.assertIn('ValueError', records[1].error)
+        self.assertEqual(5, records[3].line)
+        self.assertIn('is_doing_triumph', records[3].error)
+
+    def test_solve_batch(self, /) -> None:
+        configs = [config_to_dict(config) for config in generate_configs(6, 0, engine='bfs')]
+        records = [
+            configs[0],
+            InvalidRecord(line=2, error='ValueError: test'),
+            {'key_set': 'unknown'},
+            [1],
+            configs[0] | {'engine': 'unknown'},
+            *configs[1:],
+            ]
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                results = list(solve_batch(records, True, True, workers=workers))
+                self.assertEqual(list(range(len(records))), [r['index'] for r in results])
+                self.assertEqual('line 2: ValueError: test', results[1]['error'])
+                for result in results[2:5]:
+                    self.assertIn('error', result)
+
+                for result in (results[0], *results[5:]):
+                    self.assertNotIn('error', result)
+                    self.assertIn('rooms', result)
+                    self.assertIn('dissection', result)
+
+    def test_solve_record(self, /) -> None:
+        record = config_to_dict(next(generate_configs(1, 0, engine='bfs')))
+        self.assertIsInstance(parse_record(record), Config)
+        with self.assertRaises(InvalidRecordError):
+            parse_record(record | {'inner_shapes': [0, 0, 3]})
+
+        # Errors which are not caused by the record are not hidden.
+        with patch('solve.batch.solve_config', side_effect=TypeError('test')):
+            self.assertRaises(TypeError, solve_record, record, True, True)
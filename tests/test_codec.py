@@ -0,0 +1,45 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase
+
+from solve.states import *
+
+
+def _expanded_states() -> list[StateWithAllPositions]:
+    states = []
+    for cls in (StateOfAllRooms, StateOfAllStatues):
+        for state in cls.initial_states():
+            states.append(state)
+            for next_state in state.next_states(True):
+                states.append(next_state)
+                states.extend(next_state.next_states(True))
+
+    return states
+
+
+def _echo[T](value: T, /) -> T:
+    return value
+
+
+class TestCodec(TestCase):
+    def test_roundtrip(self, /) -> None:
+        for state in _expanded_states():
+            data = state.to_bytes()
+            restored = type(state).from_bytes(data)
+            with self.subTest(state=state):
+                self.assertEqual(data, restored.to_bytes())
+                self.assertEqual(repr(state), repr(restored))
+                self.assertEqual(state.moves_made, restored.moves_made)
+                self.assertEqual(state.is_done, restored.is_done)
+                if state.moves_made:
+                    self.assertEqual(state.last_position, restored.last_position)
+                self.assertEqual(data, pickle.loads(pickle.dumps(state)).to_bytes())
+
+    def test_process_pool(self, /) -> None:
+        states = _expanded_states()[::7]
+        with ProcessPoolExecutor(2) as executor:
+            for state, restored in zip(states, executor.map(_echo, states, chunksize=64)):
+                with self.subTest(state=state):
+                    self.assertIsNot(state, restored)
+                    self.assertEqual(state.to_bytes(), restored.to_bytes())
+                    self.assertEqual(repr(state), repr(restored))
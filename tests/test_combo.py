@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from solve.combo import *
+from solve.combo import code_to_best_ks, index_to_best_ks
+from solve.shapes import circle, square, triangle
+from .combos import all_combinations
+
+
+class TestCombo(TestCase):
+    def test_iter_combinations(self, /) -> None:
+        combinations = list(iter_combinations())
+        self.assertEqual(COMBINATION_COUNT, len(combinations))
+        self.assertCountEqual(all_combinations, [c.code for c in combinations])
+        self.assertEqual(list(range(COMBINATION_COUNT)), [c.index for c in combinations])
+
+    def test_index(self, /) -> None:
+        indexes = set()
+        for code, combination in all_combinations.items():
+            with self.subTest(code=code):
+                index = combination.index
+                self.assertIsNotNone(index)
+                indexes.add(index)
+                restored = Combination.from_index(index)
+                self.assertEqual(combination, restored)
+                self.assertEqual(code, restored.code)
+                self.assertIs(code_to_best_ks.get(code), index_to_best_ks[index])
+
+        self.assertEqual(set(range(COMBINATION_COUNT)), indexes)
+
+    def test_invalid_index(self, /) -> None:
+        invalid = Combination(
+            left=Node.from_inner_and_other(circle, circle),
+            middle=Node.from_inner_and_other(circle, triangle),
+            right=Node.from_inner_and_other(square, square),
+            )
+        self.assertIsNone(invalid.index)
+        with self.assertRaises(AssertionError):
+            Combination.from_index(COMBINATION_COUNT)
@@ -0,0 +1,128 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from solve.combo import iter_combinations
+from solve.database import *
+from solve.database import _DISTANCE_COLUMNS
+from solve.engines import *
+from solve.key_sets import *
+from solve.states import *
+
+
+class TestDatabase(TestCase):
+    @classmethod
+    def setUpClass(cls, /) -> None:
+        cls.directory = TemporaryDirectory()
+        cls.filepath = os.path.join(cls.directory.name, 'state-space.db')
+        build_database(cls.filepath)
+
+    @classmethod
+    def tearDownClass(cls, /) -> None:
+        cls.directory.cleanup()
+
+    def test_shortest_path(self, /) -> None:
+        with StateSpaceDatabase(self.filepath) as database:
+            for combination in list(iter_combinations())[::9]:
+                for state in (
+                        combination.to_room_state(KSDouble2),
+                        combination.to_statue_state(KSMixed),
+                        ):
+                    self._check(database.section(type(state)), state)
+
+    def test_max_cycles(self, /) -> None:
+        state = next(iter(iter_combinations())).to_statue_state(KSMixed)
+        with StateSpaceDatabase(self.filepath) as database:
+            section = database.section(type(state))
+            node_id = section.find(state)
+            cycles = section.distance(node_id, False, None)
+            self.assertGreater(cycles, 0)
+            with patch.object(type(state), 'max_cycles', cycles):
+                labels, _ = section.shortest_path(node_id, False, None)
+                self.assertEqual(cycles, len(labels))
+
+            with patch.object(type(state), 'max_cycles', cycles - 1):
+                self.assertIsNone(section.shortest_path(node_id, False, None))
+
+    def test_engines(self, /) -> None:
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        get_engine.cache_clear()
+        try:
+            self.assertIsInstance(get_engine(AUTO_ENGINE), TableEngine)
+            engines = [get_engine(name) for name in engine_names()]
+            for combination in list(iter_combinations())[::12]:
+                for state in (
+                        combination.to_room_state(KSMixed),
+                        combination.to_statue_state(KSDouble1),
+                        ):
+                    for is_doing_triumph, last_position in ((False, None), (True, RIGHT)):
+                        expected = state.solve(is_doing_triumph, last_position)
+                        for engine in engines:
+                            with self.subTest(
+                                    state=state,
+                                    triumph=is_doing_triumph,
+                                    engine=engine.name,
+                                    ):
+                                result, stats = engine.search(
+                                    state,
+                                    is_doing_triumph,
+                                    last_position,
+                                    )
+                                self.assertEqual(engine.name, stats.engine)
+                                self.assertEqual(
+                                    len(expected.moves_made),
+                                    len(result.state.moves_made),
+                                    )
+                                state.replay(
+                                    result.state.moves_made,
+                                    is_doing_triumph,
+                                    last_position,
+                                    )
+        finally:
+            get_engine.cache_clear()
+            os.chdir(cwd)
+
+    def test_invalid_plans(self, /) -> None:
+        with open(self.filepath, 'rb') as f:
+            data = bytearray(f.read())
+
+        with StateSpaceDatabase(self.filepath) as database:
+            distances = _DISTANCE_COLUMNS * database.statues.node_count
+
+        # Done statues are not at zero distance anymore, so no plan can be followed.
+        data[-distances:] = bytes([1]) * distances
+        cwd = os.getcwd()
+        with TemporaryDirectory() as directory:
+            os.chdir(directory)
+            get_engine.cache_clear()
+            try:
+                with open(DEFAULT_DATABASE_FILEPATH, 'wb') as f:
+                    f.write(data)
+
+                self.assertTrue(TableEngine.is_available())
+                self.assertRaises(DatabaseVersionError, TableEngine)
+                with self.assertWarns(UserWarning):
+                    self.assertIsInstance(select_engine(), ReferenceEngine)
+
+                with open(DEFAULT_DATABASE_FILEPATH, 'rb') as f:
+                    self.assertEqual(data, f.read())
+            finally:
+                get_engine.cache_clear()
+                os.chdir(cwd)
+
+    def _check(self, section: StateSpaceSection, state: StateWithAllPositions, /) -> None:
+        node_id = section.find(state)
+        self.assertIsNotNone(node_id)
+        for is_doing_triumph, last_position in ((False, None), (True, None), (True, 'middle')):
+            with self.subTest(state=state, triumph=is_doing_triumph, last=last_position):
+                labels, _ = section.shortest_path(node_id, is_doing_triumph, last_position)
+                moves = [m for label in labels for m in section.label_moves(label)]
+                solved = state.replay(moves, is_doing_triumph, last_position)
+                expected = state.solve(is_doing_triumph, last_position)
+                self.assertEqual(len(expected.moves_made), len(solved.moves_made))
+                self.assertEqual(
+                    section.distance(node_id, is_doing_triumph, last_position),
+                    len(labels),
+                    )
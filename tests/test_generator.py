@@ -0,0 +1,28 @@
+import tomllib
+from itertools import islice
+from unittest import TestCase
+
+from solve.config import KeySetName, config_to_dict, parse_config, validate_config
+from solve.generator import *
+
+
+class TestGenerator(TestCase):
+    def test_valid(self, /) -> None:
+        for config in generate_configs(1000, 0):
+            validate_config(config)
+            self.assertEqual(config, parse_config(config_to_dict(config)))
+            self.assertEqual(config, parse_config(tomllib.loads(config_to_toml(config))))
+
+    def test_seed(self, /) -> None:
+        self.assertEqual(list(generate_configs(100, 1)), list(generate_configs(100, 1)))
+        self.assertNotEqual(list(generate_configs(100, 1)), list(generate_configs(100, 2)))
+
+    def test_all_encounters(self, /) -> None:
+        configs = generate_configs(
+            None,
+            3,
+            key_set_name=KeySetName.MIXED,
+            is_doing_triumph=False,
+            )
+        encounters = {(c.inner_shapes, c.held_shapes, c.players) for c in islice(configs, 20_000)}
+        self.assertEqual(ENCOUNTER_COUNT, len(encounters))
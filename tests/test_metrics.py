@@ -0,0 +1,77 @@
+from concurrent.futures import ProcessPoolExecutor
+from time import sleep
+from unittest import TestCase
+
+from solve.combo import iter_combinations
+from solve.engines import get_engine
+from solve.key_sets import KSMixed
+from solve.metrics import *
+
+
+def _fail() -> None:
+    CACHE_LOOKUPS.inc('test', 'miss')
+    raise ValueError('test')
+
+
+class TestMetrics(TestCase):
+    def setUp(self, /) -> None:
+        REGISTRY.reset()
+
+    def test_render(self, /) -> None:
+        counter = Counter('test_total', 'Test.', ('label',))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        self.assertEqual(['test_total{label="a\\"b"} 3'], counter.render())
+
+        histogram = Histogram('test_seconds', 'Test.', (), buckets=(1, 2))
+        histogram.observe(1)
+        histogram.observe(3)
+        self.assertEqual(
+            [
+                'test_seconds_bucket{le="1"} 1',
+                'test_seconds_bucket{le="2"} 1',
+                'test_seconds_bucket{le="+Inf"} 2',
+                'test_seconds_sum 4',
+                'test_seconds_count 2',
+                ],
+            histogram.render(),
+            )
+
+    def test_search(self, /) -> None:
+        combination = next(iter(iter_combinations()))
+        state = combination.to_statue_state(KSMixed)
+        table = state.transition_table
+        lookups = table.lookups
+        misses = table.misses
+        _, stats = get_engine('bfs').search(state, False, None)
+        self.assertEqual(1, SOLVE_SECONDS.count('dissection', 'mixed', 'bfs'))
+        self.assertEqual(stats.expanded, NODES_EXPANDED.value('dissection'))
+        self.assertLess(0, stats.expanded)
+
+        # Rows may be built by earlier tests, so deltas of the table are compared.
+        misses = table.misses - misses
+        lookups = table.lookups - lookups
+        self.assertLess(0, lookups)
+        self.assertEqual(misses, CACHE_LOOKUPS.value('transitions', 'miss'))
+        self.assertEqual(lookups - misses, CACHE_LOOKUPS.value('transitions', 'hit'))
+
+    def test_workers(self, /) -> None:
+        combination = next(iter(iter_combinations()))
+        state = combination.to_statue_state(KSMixed)
+        with ProcessPoolExecutor(1) as executor:
+            submit_with_metrics(executor, get_engine('bfs').search, state, False, None).result()
+            future = submit_with_metrics(executor, _fail)
+            self.assertRaises(ValueError, future.result)
+
+        self.assertEqual(1, SOLVE_SECONDS.count('dissection', 'mixed', 'bfs'))
+        self.assertEqual(1, CACHE_LOOKUPS.value('test', 'miss'))
+
+    def test_cancel(self, /) -> None:
+        with self.assertNoLogs('concurrent.futures'):
+            with ProcessPoolExecutor(1) as executor:
+                futures = [submit_with_metrics(executor, sleep, 0.2) for _ in range(4)]
+                for future in futures:
+                    self.assertTrue(future.cancel())
+
+        for future in futures:
+            self.assertTrue(future.cancelled())
@@ -1,9 +1,9 @@
 from collections.abc import Callable
 from unittest import TestCase
 
-from solve.combo import Combination
+from solve.combo import Combination, find_best_double_key, get_best_double_key
 from solve.key_sets import *
-from solve.states import LEFT, MIDDLE, RIGHT, StateWithAllPositions
+from solve.states import ALL_VARIANTS, StateWithAllPositions
 from . import move_count_dissection, move_count_rooms
 from .combos import all_combinations
 
@@ -21,21 +21,24 @@ class TestMoveCount(TestCase):
         key_sets = KSMixed, KSDouble1, KSDouble2
         key_set_names = 'KSMixed', 'KSDouble1', 'KSDouble2'
         move_numbers = move_count_mixed, move_count_double1, move_count_double2
-        solve_args = (False, None), (True, LEFT), (True, MIDDLE), (True, RIGHT)
         for ks, ks_name, mapping in zip(key_sets, key_set_names, move_numbers):
             for code, combo in all_combinations.items():
                 expected_move_count = mapping[code]
                 state = create_state(combo, ks)
-                for with_triumph, last_position in solve_args:
+                # All variants solved together must give the same move counts.
+                solved_variants = state.solve_variants(ALL_VARIANTS)
+                for with_triumph, last_position in ALL_VARIANTS:
                     solved = state.solve(with_triumph, last_position)
-                    actual_move_count = len(solved.moves_made)
+                    solved_variant = solved_variants[with_triumph, last_position]
                     with self.subTest(
                             ks=ks_name,
                             code=code,
                             with_triumph=with_triumph,
                             last_position=last_position,
                             ):
-                        self.assertEqual(expected_move_count, actual_move_count)
+                        self.assertEqual(expected_move_count, len(solved.moves_made))
+                        self.assertEqual(expected_move_count, len(solved_variant.moves_made))
+                        state.replay(solved_variant.moves_made, with_triumph, last_position)
 
     def test_rooms(self, /) -> None:
         self._test_all(
@@ -52,3 +55,16 @@ class TestMoveCount(TestCase):
             move_count_double1=move_count_dissection.number_of_moves_double1,
             move_count_double2=move_count_dissection.number_of_moves_double2,
             )
+
+    def test_best_double_key(self, /) -> None:
+        for code, combination in all_combinations.items():
+            for rooms, statues in ((combination, None), (None, combination)):
+                with self.subTest(
+                        code=code,
+                        rooms=rooms is not None,
+                        statues=statues is not None,
+                        ):
+                    self.assertIs(
+                        get_best_double_key(rooms=rooms, statues=statues),
+                        find_best_double_key(rooms=rooms, statues=statues),
+                        )
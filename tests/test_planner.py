@@ -0,0 +1,112 @@
+from functools import cache
+from unittest import TestCase
+
+from solve.combo import Combination
+from solve.generator import generate_configs
+from solve.key_sets import *
+from solve.planner import *
+from solve.states import *
+
+
+@cache
+def _exhaustive(
+        combination: Combination,
+        key_set_index: int,
+        is_rooms: bool,
+        last_position: PositionsType | None,
+        /,
+        ) -> dict[PositionsType, int]:
+    """
+    Returns the minimal number of moves by last positions searching all move sequences
+    without merging states.
+    """
+    key_set = (KSMixed, KSDouble1, KSDouble2)[key_set_index]
+    if is_rooms:
+        state = combination.to_room_state(key_set)
+    else:
+        state = combination.to_statue_state(key_set)
+
+    results = {}
+    states = [state]
+    for cycle in range(state.max_cycles):
+        next_states = []
+        for s in states:
+            for next_state in s.next_states(True):
+                if cycle == 0 and last_position == next_state.first_position: continue
+
+                if next_state.is_done:
+                    results.setdefault(next_state.last_position, len(next_state.moves_made))
+                else:
+                    next_states.append(next_state)
+
+        if len(results) == len(ALL_POSITIONS):
+            break
+
+        states = next_states
+
+    return results
+
+
+def _brute_force(
+        phases: list[tuple[Combination, Combination]],
+        key_set_options: tuple[tuple[KeySetType, ...], ...],
+        last_position: PositionsType | None,
+        /,
+        ) -> int | None:
+    if not phases:
+        return 0
+
+    (rooms, statues), *other_phases = phases
+    best = None
+    for key_set in key_set_options[0]:
+        index = (KSMixed, KSDouble1, KSDouble2).index(key_set)
+        for handoff, rooms_count in _exhaustive(rooms, index, True, last_position).items():
+            for position, statues_count in _exhaustive(statues, index, False, handoff).items():
+                rest = _brute_force(other_phases, key_set_options[1:], position)
+                if rest is None: continue
+
+                total = rooms_count + statues_count + rest
+                if best is None or total < best:
+                    best = total
+
+    return best
+
+
+class TestPlanner(TestCase):
+    def test_brute_force(self, /) -> None:
+        configs = list(generate_configs(6, 0, is_doing_triumph=True))
+        for i in range(0, len(configs), 3):
+            phases = configs[i:i + 3]
+            for last_position in (None, MIDDLE):
+                with self.subTest(phases=i, last_position=last_position):
+                    plan = plan_encounter(
+                        phases,
+                        is_doing_triumph=True,
+                        last_position=last_position,
+                        )
+                    combinations = [config.encounter_data()[:2] for config in phases]
+                    expected = min(
+                        count
+                        for pattern in ChallengePattern
+                        if (count := _brute_force(
+                            combinations,
+                            pattern.key_set_options,
+                            last_position,
+                            )) is not None
+                        )
+                    self.assertEqual(expected, plan.move_count)
+
+                    position = last_position
+                    for config, phase in zip(phases, plan.phases):
+                        rooms, statues, _ = config.encounter_data()
+                        rooms.to_room_state(phase.key_set).replay(
+                            phase.rooms.moves_made,
+                            True,
+                            position,
+                            )
+                        statues.to_statue_state(phase.key_set).replay(
+                            phase.statues.moves_made,
+                            True,
+                            phase.rooms.last_position,
+                            )
+                        position = phase.last_position
@@ -0,0 +1,75 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from solve.combo import Combination
+from solve.database import *
+from solve.key_sets import *
+from solve.retrograde import *
+from solve.states import LEFT, MIDDLE, RIGHT
+from . import move_count_dissection, move_count_rooms
+from .combos import all_combinations
+
+
+class TestRetrograde(TestCase):
+    @classmethod
+    def setUpClass(cls, /) -> None:
+        cls.directory = TemporaryDirectory()
+        filepath = os.path.join(cls.directory.name, 'state-space.db')
+        build_database(filepath)
+        cls.database = StateSpaceDatabase(filepath)
+
+    @classmethod
+    def tearDownClass(cls, /) -> None:
+        cls.database.close()
+        cls.directory.cleanup()
+
+    def _test_all(self, create_state, move_counts, /) -> None:
+        key_sets = KSMixed, KSDouble1, KSDouble2
+        solve_args = (False, None), (True, LEFT), (True, MIDDLE), (True, RIGHT)
+        for ks, mapping in zip(key_sets, move_counts):
+            for code, combo in all_combinations.items():
+                state = create_state(combo, ks)
+                n = state.moves_per_cycle
+                for with_triumph, last_position in solve_args:
+                    with self.subTest(
+                            ks=ks,
+                            code=code,
+                            with_triumph=with_triumph,
+                            last_position=last_position,
+                            ):
+                        # Move counts are the same as of state.solve, see test_move_count.
+                        solved = solve_by_table(self.database, state, with_triumph, last_position)
+                        self.assertEqual(mapping[code], len(solved.moves_made))
+                        state.replay(solved.moves_made, with_triumph, last_position)
+                        self.assertEqual(
+                            mapping[code],
+                            n * distance_to_goal(self.database, state, with_triumph, last_position),
+                            )
+                        self.assertEqual(
+                            solved.moves_made[:n],
+                            next_best_moves(self.database, state, with_triumph, last_position),
+                            )
+                        database = self.database
+                        self.assertEqual(0, distance_to_goal(database, solved, with_triumph, None))
+                        self.assertEqual((), next_best_moves(database, solved, with_triumph, None))
+
+    def test_rooms(self, /) -> None:
+        self._test_all(
+            Combination.to_room_state,
+            (
+                move_count_rooms.number_of_moves_mixed,
+                move_count_rooms.number_of_moves_double1,
+                move_count_rooms.number_of_moves_double2,
+                ),
+            )
+
+    def test_dissection(self, /) -> None:
+        self._test_all(
+            Combination.to_statue_state,
+            (
+                move_count_dissection.number_of_moves_mixed,
+                move_count_dissection.number_of_moves_double1,
+                move_count_dissection.number_of_moves_double2,
+                ),
+            )
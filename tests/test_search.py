@@ -0,0 +1,189 @@
+import os
+from contextlib import redirect_stdout
+from dataclasses import replace
+from io import StringIO
+from tempfile import TemporaryDirectory
+from time import monotonic
+from unittest import TestCase
+from unittest.mock import patch
+
+from solve.__main__ import EncounterParts, main
+from solve.combo import iter_combinations
+from solve.config import KeySetName
+from solve.engines import get_engine
+from solve.generator import config_to_toml, generate_configs
+from solve.key_sets import *
+from solve.shapes import *
+from solve.states import *
+
+
+class _ShortRooms(StateOfAllRooms):
+    __slots__ = ()
+
+    max_cycles = 1
+
+
+class TestSearch(TestCase):
+    def test_rank(self, /) -> None:
+        for combination in iter_combinations():
+            state = combination.to_room_state(KSMixed)
+            solved = state.solve(False, None)
+            with self.subTest(state=state):
+                self.assertEqual(state.remaining_shapes, state.rank[0])
+                self.assertEqual((0, 0), solved.rank)
+                self.assertLess(solved.rank, state.rank)
+
+    def test_max_frontier(self, /) -> None:
+        truncated = found = 0
+        for combination in iter_combinations():
+            state = combination.to_room_state(KSMixed)
+            expected = state.search(True, None)
+            self.assertTrue(expected.is_optimal)
+            with self.subTest(state=state):
+                try:
+                    result = state.search(True, None, max_frontier=5)
+                except TruncatedSearchError:
+                    truncated += 1
+                    continue
+
+                found += 1
+                self.assertFalse(result.is_optimal)
+                self.assertLessEqual(len(expected.state.moves_made), len(result.state.moves_made))
+                state.replay(result.state.moves_made, True, None)
+
+                result = state.search(True, None, max_frontier=10 ** 9)
+                self.assertTrue(result.is_optimal)
+                self.assertEqual(expected.state.moves_made, result.state.moves_made)
+
+        self.assertLess(0, truncated)
+        self.assertLess(0, found)
+
+    def test_deadline(self, /) -> None:
+        state = next(iter(iter_combinations())).to_room_state(KSDouble1)
+        # The complete search is not started, the quick result is returned.
+        result = state.search(True, None, deadline=monotonic())
+        self.assertFalse(result.is_optimal)
+        state.replay(result.state.moves_made, True, None)
+
+        # Without quick search there is no result at the deadline.
+        self.assertRaises(
+            TimeoutError,
+            state.search,
+            False,
+            None,
+            max_frontier=10 ** 9,
+            deadline=monotonic(),
+            )
+
+    def test_cancellation(self, /) -> None:
+        state = next(iter(iter_combinations())).to_room_state(KSDouble1)
+        token = CancellationToken()
+        token.cancel()
+        self.assertRaises(SearchCancelled, state.search, False, None, cancellation=token)
+        self.assertRaises(
+            SearchCancelled,
+            state.search,
+            False,
+            None,
+            deadline=monotonic() + 60,
+            cancellation=token,
+            )
+
+    def test_workers(self, /) -> None:
+        # Large cycles are expanded in workers even in short searches.
+        with patch('solve.states.base.PARALLEL_MIN_FRONTIER', 10):
+            for combination in list(iter_combinations())[::9]:
+                state = combination.to_room_state(KSMixed)
+                for is_doing_triumph, last_position in ((False, None), (True, LEFT)):
+                    with self.subTest(state=state, triumph=is_doing_triumph):
+                        expected = state.search(is_doing_triumph, last_position)
+                        result = state.search(is_doing_triumph, last_position, workers=2)
+                        self.assertTrue(result.is_optimal)
+                        self.assertEqual(
+                            len(expected.state.moves_made),
+                            len(result.state.moves_made),
+                            )
+                        state.replay(result.state.moves_made, is_doing_triumph, last_position)
+
+        # Workers are not started if all cycles are small.
+        state = next(iter(iter_combinations())).to_statue_state(KSMixed)
+        with patch('solve.states.base.ProcessPoolExecutor', side_effect=AssertionError):
+            result = state.search(True, None, workers=2)
+
+        self.assertEqual(len(state.solve(True, None).moves_made), len(result.state.moves_made))
+
+    def test_main_timeout(self, /) -> None:
+        with self.assertRaises(SystemExit) as context:
+            main(
+                os.path.join(os.path.dirname(__file__), '..', 'config-template.toml'),
+                EncounterParts.SOLO_ROOMS,
+                interactive=False,
+                time_limit=0,
+                engine_name='dedup-bfs',
+                )
+
+        self.assertIn('No solution was found', context.exception.code)
+
+    def test_main_handoff(self, /) -> None:
+        def run(config, encounter_part: EncounterParts) -> str:
+            filepath = os.path.join(directory, 'config.toml')
+            with open(filepath, 'w') as f:
+                f.write(config_to_toml(config))
+
+            with redirect_stdout(StringIO()) as output:
+                main(filepath, encounter_part, interactive=False)
+
+            return output.getvalue()
+
+        engine = get_engine('bfs')
+        configs = generate_configs(
+            6,
+            0,
+            key_set_name=KeySetName.MIXED,
+            is_doing_triumph=True,
+            engine='bfs',
+            )
+        with TemporaryDirectory() as directory:
+            for config in configs:
+                with self.subTest(config=config):
+                    rooms, _, _ = config.encounter_data()
+                    rooms_result, _ = engine.search(
+                        rooms.to_room_state(KSMixed),
+                        True,
+                        config.last_position,
+                        )
+                    # Dissection solved after rooms are solved.
+                    handoff_config = replace(
+                        config,
+                        last_position=rooms_result.state.last_position,
+                        )
+                    self.assertEqual(
+                        run(config, EncounterParts.SOLO_ROOMS) + '\n\n'
+                        + run(handoff_config, EncounterParts.DISSECTION),
+                        run(config, EncounterParts.BOTH),
+                        )
+
+    def test_infeasibility_reason(self, /) -> None:
+        for cls in (StateOfAllRooms, StateOfAllStatues):
+            for state in cls.initial_states():
+                self.assertIsNone(state.infeasibility_reason())
+                next_state = next(iter(state.next_states(False)))
+                self.assertIsNone(next_state.infeasibility_reason())
+
+        infeasible_states = (
+            StateOfAllRooms.from_shapes(
+                (circle, circle, triangle),
+                (triangle, square, square),
+                KSMixed,
+                ),
+            StateOfAllStatues.from_shapes((circle, triangle, square), (cube, cube, cube), KSMixed),
+            )
+        for state in infeasible_states:
+            with self.subTest(state=state):
+                self.assertIn('cannot be rearranged', state.infeasibility_reason())
+                self.assertRaises(InfeasibleStateError, state.search, False, None)
+
+        state = next(iter(next(StateOfAllRooms.initial_states()).next_states(False)))
+        state = _ShortRooms(state.left, state.middle, state.right, state.moves_made)
+        self.assertIn('at most 1 cycles', state.infeasibility_reason())
+        self.assertRaises(InfeasibleStateError, state.search, False, None)
@@ -0,0 +1,41 @@
+import tomllib
+from unittest import TestCase
+
+from solve.api import EncounterSolution, solve_encounter_config
+from solve.config import parse_config, parse_partial_config
+from solve.speculation import Decision, Speculator
+
+
+class TestSpeculation(TestCase):
+    def test_completions(self, /) -> None:
+        with open('config-template.toml', 'rb') as f:
+            data = tomllib.load(f)
+
+        config = parse_config(data)
+        self.assertEqual([config], list(parse_partial_config(data).completions()))
+
+        aliases = {f'player{i}': {'alias': data[f'player{i}']['alias']} for i in (1, 2, 3)}
+        configs = list(parse_partial_config(aliases).completions())
+        self.assertEqual(6 ** 4, len(configs))
+        self.assertEqual(36, len({c.encounter_data()[0] for c in configs}))
+        self.assertEqual(36, len({c.encounter_data()[1] for c in configs}))
+        self.assertIn(config, configs)
+
+    def test_speculator(self, /) -> None:
+        with open('config-template.toml', 'rb') as f:
+            data = tomllib.load(f)
+
+        data |= {'engine': 'bfs', 'is_doing_triumph': True, 'last_position': 'middle'}
+        config = parse_config(data)
+        partial = parse_partial_config({**data, 'held_shapes': [], 'player3': {'alias': 'C'}})
+        with Speculator(True, True, workers=2) as speculator:
+            self.assertEqual(6, speculator.submit(partial))
+            tree = speculator.decision_tree(partial)
+            self.assertIsInstance(tree, Decision)
+            self.assertEqual(('held_shapes',), tree.fields)
+            self.assertEqual(6, len(tree.branches))
+
+            solution = speculator.solution(config)
+            self.assertIsInstance(solution, EncounterSolution)
+            self.assertEqual(solve_encounter_config(config), solution)
+            self.assertEqual(solution, tree.branches[config.held_shapes])
@@ -0,0 +1,258 @@
+import pickle
+from collections.abc import Iterator
+from itertools import permutations, product
+from unittest import TestCase
+
+from solve.combo import iter_combinations
+from solve.key_sets import *
+from solve.multiset import Multiset
+from solve.states import *
+from solve.states.rooms import RoomState
+from solve.states.statues import StatueState
+
+
+def _sample_pairs[T: StateWithAllPositions](state_type: type[T], /) -> Iterator[tuple]:
+    """
+    Yields pairs of different position states of initial states
+    and states after the first cycle.
+    """
+    for initial in state_type.initial_states():
+        for state in (initial, *initial.next_states(False)):
+            yield from permutations((state.left, state.middle, state.right), 2)
+
+
+class _Room(RoomState):
+    __slots__ = ()
+
+
+def _fields(state: State, /) -> dict:
+    """
+    Returns values of all slots of the state except the cached key.
+    """
+    return {name: getattr(state, name) for name in state.__all_slots__ if name != '_key'}
+
+
+def _rebuild(state: State, /) -> State:
+    """
+    Creates the same state via the validating constructor.
+    """
+    if isinstance(state, RoomState):
+        return RoomState(
+            state.position,
+            state.own_shape,
+            dropping_shapes=state.dropping_shapes,
+            final_dropping_shapes=state.final_dropping_shapes,
+            shapes_to_receive=state.shapes_to_receive,
+            )
+
+    return StatueState(
+        state.position,
+        state.own_shape,
+        shape_held=state.shape_held,
+        final_shape_held=state.final_shape_held,
+        shapes_to_receive=state.shapes_to_receive,
+        )
+
+
+def _raw_next_statues(
+        state: StateOfAllStatues,
+        /,
+        is_doing_triumph: bool,
+        last_position_touched: str | None,
+        ) -> list[StateOfAllStatues]:
+    """
+    Returns all next states of statues without any pruning.
+    """
+    last_position = state.last_position if state.moves_made else last_position_touched
+    next_states = []
+    for s1, s2, s3 in permutations((state.left, state.middle, state.right)):
+        if is_doing_triumph and last_position == s1.position: continue
+        if s1.is_done or s2.is_done: continue
+
+        for shape1, shape2 in product(s1.shapes_available, s2.shapes_available):
+            if not s1.is_shape_required(shape2): continue
+
+            new_s1, new_s2 = s1.dissect(shape1, s2, shape2)
+            by_position = {s.position: s for s in (new_s1, new_s2, s3)}
+            moves = (
+                DissectMove(shape=shape1, destination=s1.position),
+                DissectMove(shape=shape2, destination=s2.position),
+                )
+            next_states.append(StateOfAllStatues(
+                by_position[LEFT],
+                by_position[MIDDLE],
+                by_position[RIGHT],
+                (*state.moves_made, *moves),
+                ))
+
+    return next_states
+
+
+def _raw_moves_by_last_position(
+        state: StateOfAllStatues,
+        /,
+        is_doing_triumph: bool,
+        last_position_touched: str | None,
+        ) -> dict[str, int]:
+    """
+    Returns the minimal numbers of moves to finish at every last position
+    searching over all next states without pruning.
+    """
+    states = [state]
+    results = {}
+    for _ in range(state.max_cycles):
+        unique_states = {}
+        for s in states:
+            for next_state in _raw_next_statues(s, is_doing_triumph, last_position_touched):
+                if next_state.is_done:
+                    results.setdefault(next_state.last_position, len(next_state.moves_made))
+                else:
+                    unique_states.setdefault(next_state.frontier_key(True), next_state)
+
+        states = list(unique_states.values())
+
+    return results
+
+
+class TestStates(TestCase):
+    def test_dissect_pruning(self, /) -> None:
+        for combination in iter_combinations():
+            for key_set in (KSMixed, KSDouble1, KSDouble2):
+                state = combination.to_statue_state(key_set)
+                for is_doing_triumph, last_position in ((False, None), (True, None), (True, LEFT)):
+                    with self.subTest(
+                            state=state,
+                            triumph=is_doing_triumph,
+                            last_position=last_position,
+                            ):
+                        pruned = state.solve_by_last_position(is_doing_triumph, last_position)
+                        self.assertEqual(
+                            _raw_moves_by_last_position(state, is_doing_triumph, last_position),
+                            {p: len(s.moves_made) for p, s in pruned.items()},
+                            )
+
+    def test_pass_moves(self, /) -> None:
+        for code in range(27):
+            move = PassMove.from_code(code)
+            with self.subTest(move=move):
+                self.assertEqual(code, move.code)
+                self.assertIs(move, PassMove.get(move.departure, move.shape, move.destination))
+                self.assertIs(move, pickle.loads(pickle.dumps(move)))
+
+        state = next(iter(iter_combinations())).to_room_state(KSMixed).solve(True, None)
+        restored = pickle.loads(pickle.dumps(state))
+        for move, restored_move in zip(state.moves_made, restored.moves_made, strict=True):
+            self.assertIs(move, restored_move)
+
+    def test_pass_table(self, /) -> None:
+        table = StateOfAllRooms.transition_table
+        for s1, s2 in _sample_pairs(StateOfAllRooms):
+            expected = []
+            if not (s1.is_done or s2.is_done):
+                for shape in s1.shapes_available:
+                    if s2.is_shape_required(shape):
+                        new_s1, new_s2 = s1.pass_shape(shape, s2)
+                        move = PassMove(departure=s1.position, shape=shape, destination=s2.position)
+                        expected.append((move, new_s1.key, new_s2.key))
+
+            rows = table[s1, s2]
+            self.assertEqual(expected, [(m, new_s1.key, new_s2.key) for m, new_s1, new_s2 in rows])
+            for _, new_s1, new_s2 in rows:
+                self.assertIs(new_s1, table.intern(new_s1))
+                self.assertIs(new_s2, table.intern(new_s2))
+
+    def test_dissect_table(self, /) -> None:
+        table = StateOfAllStatues.transition_table
+        for s1, s2 in _sample_pairs(StateOfAllStatues):
+            expected = []
+            if not (s1.is_done or s2.is_done):
+                for shape1, shape2 in product(s1.shapes_available, s2.shapes_available):
+                    if s1.is_shape_required(shape2):
+                        new_s1, new_s2 = s1.dissect(shape1, s2, shape2)
+                        expected.append((
+                            DissectMove(shape=shape1, destination=s1.position),
+                            DissectMove(shape=shape2, destination=s2.position),
+                            new_s1.key,
+                            new_s2.key,
+                            ))
+
+            rows = table[s1, s2]
+            self.assertEqual(
+                expected,
+                [(m1, m2, new_s1.key, new_s2.key) for m1, m2, new_s1, new_s2, _, _ in rows],
+                )
+            for _, _, new_s1, new_s2, _, _ in rows:
+                self.assertIs(new_s1, table.intern(new_s1))
+                self.assertIs(new_s2, table.intern(new_s2))
+
+    def test_constructors(self, /) -> None:
+        for combination in iter_combinations():
+            nodes = combination.left, combination.middle, combination.right
+            for key_set in (KSMixed, KSDouble1, KSDouble2):
+                rooms = combination.to_room_state(key_set)
+                statues = combination.to_statue_state(key_set)
+                validated_rooms = init_rooms(
+                    left_inner_shape=combination.left.inner,
+                    left_other_shape=combination.left.available[1],
+                    middle_inner_shape=combination.middle.inner,
+                    middle_other_shape=combination.middle.available[1],
+                    right_inner_shape=combination.right.inner,
+                    right_other_shape=combination.right.available[1],
+                    key_set=key_set,
+                    )
+                held = [n.available[0] + n.available[1] for n in nodes]
+                validated_statues = init_statues(
+                    left_inner_shape=combination.left.inner,
+                    left_held_shape=held[0],
+                    middle_inner_shape=combination.middle.inner,
+                    middle_held_shape=held[1],
+                    right_inner_shape=combination.right.inner,
+                    right_held_shape=held[2],
+                    key_set=key_set,
+                    )
+                # Position states are interned, so both paths give the same objects.
+                for validated, state in ((validated_rooms, rooms), (validated_statues, statues)):
+                    self.assertIs(validated.left, state.left)
+                    self.assertIs(validated.middle, state.middle)
+                    self.assertIs(validated.right, state.right)
+
+                for node, room, statue in zip(
+                        nodes,
+                        (rooms.left, rooms.middle, rooms.right),
+                        (statues.left, statues.middle, statues.right),
+                        ):
+                    with self.subTest(room=room, statue=statue):
+                        validated_room = RoomState(
+                            room.position,
+                            node.inner,
+                            dropping_shapes=Multiset(node.available),
+                            final_dropping_shapes=key_set[node.inner].terms,
+                            )
+                        self.assertEqual(_fields(validated_room), _fields(room))
+                        validated_statue = StatueState(
+                            statue.position,
+                            node.inner,
+                            shape_held=node.available[0] + node.available[1],
+                            final_shape_held=key_set[node.inner],
+                            )
+                        self.assertEqual(_fields(validated_statue), _fields(statue))
+
+                # States made by moves have the same derived fields as validated ones.
+                for state in (*rooms.next_states(False), *statues.next_states(False)):
+                    for s in (state.left, state.middle, state.right):
+                        self.assertEqual(_fields(_rebuild(s)), _fields(s))
+
+    def test_subclass_moves(self, /) -> None:
+        rooms = next(iter(iter_combinations())).to_room_state(KSMixed)
+        s1 = _Room.create(
+            rooms.left.position,
+            rooms.left.own_shape,
+            rooms.left.dropping_shapes,
+            rooms.left.final_dropping_shapes,
+            rooms.left.shapes_to_receive,
+            )
+        shape = next(s for s in s1.shapes_available if rooms.middle.is_shape_required(s))
+        new_s1, new_s2 = s1.pass_shape(shape, rooms.middle)
+        self.assertIsInstance(new_s1, _Room)
+        self.assertIs(type(new_s2), RoomState)
+        self.assertEqual(_fields(_rebuild(new_s1)), _fields(new_s1))